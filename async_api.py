@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+asyncio 接口：在线程中执行扫描、读取与排版，不阻塞事件循环。
+
+用法：
+    async for event in iter_generate_events(pipeline, title, indirs, excludes, outfile):
+        ...
+    result = await generate_code_doc_async(title=..., indirs=..., outfile=...)
+
+进度事件为 dict，stage 依次为：
+    discover：{'stage', 'file_count'}
+    render：{'stage', 'index', 'total', 'file'}（每写入一个文件一次）
+    save：{'stage', 'outfile'}
+    done：{'stage', 'result'}，result 与 generate_code_doc 的返回值一致
+开启 skip_unchanged 且输入摘要与已有输出一致时，discover 之后直接产出 done（result 中 skipped 为 True）。
+
+取消调用方任务（task.cancel()）即可取消生成：扫描会尽快停止，正在写入的文件写完后不再继续，
+也不会保存文档；若取消发生在保存阶段，保存会在后台线程中完成。
+同一次生成的各步骤在单个工作线程中依次执行，产出与同步路径（CodeDocPipeline.run）完全一致。
+分册（volume_by）与并行正文（parallel_render）由 generate_code_doc 在线程中整体执行，只产出 done 事件，
+取消后结果被丢弃，但已开始的生成会在后台执行完毕。
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath
+
+from core import (
+    BATCH_JOB_DEFAULTS, DEFAULT_INDIRS, CodeDocPipeline, StageProfiler,
+    generate_code_doc, normalize_paths
+)
+
+# generate_code_doc 中不属于 CodeDocPipeline 构造参数的选项（仅分册/并行正文使用）
+PARALLEL_OPTION_KEYS = ('volume_by', 'volume_size', 'jobs', 'parallel_render')
+
+
+async def iter_generate_events(pipeline, title, indirs=None, excludes=None, outfile='code.docx', profiler=None):
+    """
+    执行一次生成并以异步迭代器的形式产出进度事件。
+
+    Args:
+        pipeline: CodeDocPipeline 实例
+        title: 页眉标题
+        indirs: 源码目录列表；为空则为当前目录
+        excludes: 排除路径列表
+        outfile: 输出路径或可写的二进制流
+        profiler: StageProfiler 实例；为空则内部创建
+
+    Yields:
+        进度事件 dict（见模块说明）
+    """
+    loop = asyncio.get_running_loop()
+    profiler = profiler if profiler else StageProfiler()
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ccd-async')
+    writer = None
+    saving = False
+
+    def call(func, *args):
+        return loop.run_in_executor(executor, func, *args)
+
+    try:
+        indirs = [abspath(indir) for indir in (indirs or DEFAULT_INDIRS)]
+        excludes = normalize_paths(excludes or [])
+        if outfile and not hasattr(outfile, 'write'):
+            excludes = normalize_paths(excludes + [outfile])
+
+        def discover():
+            with profiler.stage('collect'):
+                return pipeline.discover(indirs, excludes, stop.is_set)
+
+        files = await call(discover)
+        yield {'stage': 'discover', 'file_count': len(files)}
+        digest, unchanged = await call(pipeline.check_unchanged, title, files, outfile, profiler)
+        if unchanged:
+            yield {
+                'stage': 'done',
+                'result': {
+                    'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict(), 'skipped': True
+                }
+            }
+            return
+        writer = await call(pipeline.create_writer, outfile, pipeline.resolve_output_format(outfile), profiler)
+        if digest and hasattr(writer, 'input_digest'):
+            writer.input_digest = digest
+        await call(writer.write_header, title)
+        for index, file in enumerate(files):
+            await call(writer.write_file, file)
+            yield {'stage': 'render', 'index': index + 1, 'total': len(files), 'file': file}
+        yield {'stage': 'save', 'outfile': outfile}
+        saving = True
+        await call(pipeline.save, writer, outfile)
+        yield {
+            'stage': 'done',
+            'result': {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict()}
+        }
+    finally:
+        stop.set()
+        if writer is not None and not saving and hasattr(writer, 'discard'):
+            # 排在当前步骤之后执行，避免与仍在写入的线程冲突
+            executor.submit(writer.discard)
+        executor.shutdown(wait=False)
+
+
+async def run_pipeline_async(pipeline, title, indirs=None, excludes=None, outfile='code.docx', profiler=None,
+                             on_progress=None):
+    """
+    CodeDocPipeline.run 的异步版本。
+
+    Args:
+        on_progress: 可选回调，接收每个进度事件
+        其余参数同 iter_generate_events
+
+    Returns:
+        dict：包含 file_count、outfile 与 stats
+    """
+    result = None
+    events = iter_generate_events(pipeline, title, indirs, excludes, outfile, profiler)
+    try:
+        async for event in events:
+            if on_progress:
+                on_progress(event)
+            if event['stage'] == 'done':
+                result = event['result']
+    finally:
+        await events.aclose()
+    return result
+
+
+async def generate_code_doc_async(on_progress=None, **kwargs):
+    """
+    generate_code_doc 的异步版本，参数与 generate_code_doc 相同（需以关键字传入），缺省值同批量任务默认值。
+
+    Args:
+        on_progress: 可选回调，接收每个进度事件
+
+    Returns:
+        dict：与 generate_code_doc 的返回值一致
+
+    Raises:
+        TypeError: 包含 generate_code_doc 不支持的参数
+    """
+    options = dict(BATCH_JOB_DEFAULTS)
+    options.update(kwargs)
+    if options.get('volume_by') or options.get('parallel_render'):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, lambda: generate_code_doc(**options))
+        if on_progress:
+            on_progress({'stage': 'done', 'result': result})
+        return result
+    title = options.pop('title')
+    indirs = options.pop('indirs')
+    excludes = options.pop('excludes')
+    outfile = options.pop('outfile')
+    profiler = options.pop('profiler', None)
+    for key in PARALLEL_OPTION_KEYS:
+        options.pop(key, None)
+    pipeline = CodeDocPipeline(**options)
+    try:
+        return await run_pipeline_async(pipeline, title, indirs, excludes, outfile, profiler, on_progress)
+    finally:
+        pipeline.close()
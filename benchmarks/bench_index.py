@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+文件索引内存基准：对比“绝对路径字符串列表”、“(路径, 大小, 修改时间, 后缀) 元组列表”与 FileIndex
+在每 10 万个文件下的内存占用（tracemalloc 统计）。
+
+用法：
+    python benchmarks/bench_index.py [--files 100000] [--per-dir 40]
+
+路径为合成数据，不访问磁盘。
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import FileIndex  # noqa: E402
+
+EXTS = ('py', 'js', 'ts', 'go', 'java', 'c', 'h', 'cpp')
+
+
+def synthetic_entries(count, per_dir):
+    base = os.path.join(os.sep, 'srv', 'monorepo', 'services')
+    for i in range(count):
+        group, folder = divmod(i // per_dir, 50)
+        directory = os.path.join(base, 'team_{:03d}'.format(group), 'module_{:02d}'.format(folder), 'src')
+        name = 'handler_{:06d}.{}'.format(i, EXTS[i % len(EXTS)])
+        yield directory, name, 1000 + i % 9000, 1700000000000000000 + i
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return data, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较文件索引的内存占用')
+    parser.add_argument('--files', type=int, default=100000, help='文件数，默认为100000')
+    parser.add_argument('--per-dir', type=int, default=40, help='每个目录的文件数，默认为40')
+    args = parser.parse_args()
+    entries = list(synthetic_entries(args.files, args.per_dir))
+
+    def build_paths():
+        return [os.path.join(directory, name) for directory, name, _, _ in entries]
+
+    def build_tuples():
+        return [
+            (os.path.join(directory, name), size, mtime, os.path.splitext(name)[1].lstrip('.'))
+            for directory, name, size, mtime in entries
+        ]
+
+    def build_index():
+        index = FileIndex()
+        for directory, name, size, mtime in entries:
+            index.add(directory, name, size, mtime)
+        return index
+
+    scale = 100000.0 / args.files
+    print('{:<28}{:>16}'.format('表示方式', '每10万文件(MB)'))
+    for label, build in (('路径字符串列表', build_paths), ('元组列表（含元数据）', build_tuples), ('FileIndex（含元数据）', build_index)):
+        _, size = measure(build)
+        print('{:<28}{:>16.2f}'.format(label, size * scale / 1048576.0))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
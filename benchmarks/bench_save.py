@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+保存阶段基准：按各压缩级别写出包含合成正文（与 CodeWriter 生成的 document.xml 结构一致）的 ZIP 包，
+比较耗时与文件大小。
+
+用法：
+    python benchmarks/bench_save.py [--lines 500000] [-j 4]
+
+不依赖 python-docx，仅测量 package_writer 的压缩与写出；结果用于选择 --compression。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from package_writer import COMPRESSION_LEVELS, ZipPackageWriter  # noqa: E402
+
+PARAGRAPH = (
+    '<w:p><w:pPr><w:spacing w:before="0" w:after="46" w:line="210" w:lineRule="exact"/></w:pPr>'
+    '<w:r><w:rPr><w:rFonts w:ascii="宋体" w:hAnsi="宋体" w:eastAsia="宋体"/><w:sz w:val="21"/></w:rPr>'
+    '<w:t xml:space="preserve">{}</w:t></w:r></w:p>'
+)
+
+
+def build_body(lines):
+    with open(os.path.join(ROOT, 'core.py'), encoding='utf-8') as fp:
+        source = [line.rstrip().replace('&', '&amp;').replace('<', '&lt;') for line in fp if line.strip()]
+    paragraphs = [PARAGRAPH.format(source[i % len(source)]) for i in range(lines)]
+    return ('<w:document><w:body>' + ''.join(paragraphs) + '</w:body></w:document>').encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较各压缩级别下保存 docx 的耗时与大小')
+    parser.add_argument('--lines', type=int, default=500000, help='合成正文的行数，默认为500000')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='并行压缩线程数，默认为CPU核数')
+    args = parser.parse_args()
+
+    body = build_body(args.lines)
+    print('正文大小：{:.1f} MB'.format(len(body) / 1048576.0))
+    print('{:<10}{:>10}{:>10}{:>12}{:>10}'.format('级别', '线程', '耗时(s)', '大小(MB)', '压缩比'))
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.docx')
+        for compression in COMPRESSION_LEVELS:
+            for jobs in sorted({1, args.jobs or os.cpu_count() or 1}):
+                start = time.perf_counter()
+                with ZipPackageWriter(path, compression=compression, jobs=jobs) as writer:
+                    writer.write_async('word/document.xml', body)
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(path)
+                with zipfile.ZipFile(path) as archive:
+                    if archive.testzip() is not None:
+                        print('{}：校验失败'.format(compression))
+                        return 1
+                print('{:<10}{:>10}{:>10.2f}{:>12.1f}{:>10.1%}'.format(
+                    compression, jobs, elapsed, size / 1048576.0, size / float(len(body))
+                ))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
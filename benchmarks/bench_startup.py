@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时基准：测量 `import core`、`cli.py --help` 与仅扫描（--dry-run）调用的墙钟时间。
+
+用法：
+    python benchmarks/bench_startup.py [-n 10] [--limit 100]
+
+超过 --limit（毫秒）的项目会以非零状态码退出，便于在 CI 中作为门禁。
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(command, repeat):
+    samples = []
+    returncode = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        samples.append((time.perf_counter() - start) * 1000.0)
+        returncode = returncode or process.returncode
+    return samples, returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(description='测量 CCD 命令行的启动耗时')
+    parser.add_argument('-n', '--repeat', type=int, default=10, help='每项重复次数，默认为10')
+    parser.add_argument('--limit', type=float, default=100.0, help='中位数耗时上限（毫秒），默认为100')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.path.join(workdir, 'main.py'), 'w') as fp:
+            fp.write('print("hello")\n')
+        cases = [
+            ('python (baseline)', [sys.executable, '-c', 'pass']),
+            ('import core', [sys.executable, '-c', 'import core']),
+            ('cli.py --help', [sys.executable, 'cli.py', '--help']),
+            ('cli.py --dry-run', [sys.executable, 'cli.py', '-i', workdir, '--dry-run', '-j', '1']),
+        ]
+        failed = False
+        for name, command in cases:
+            samples, returncode = measure(command, args.repeat)
+            median = statistics.median(samples)
+            over = median > args.limit
+            failed = failed or over or returncode != 0
+            note = ''
+            if returncode != 0:
+                note = '  (exit {})'.format(returncode)
+            elif over:
+                note = '  (over limit)'
+            print('{:<20} median {:7.1f} ms  min {:7.1f} ms{}'.format(name, median, min(samples), note))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
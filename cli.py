@@ -1,12 +1,8 @@
 # -*- coding: utf-8 -*-
-import logging
+import sys
 
 import click
 
-from core import (
-    DEFAULT_COMMENT_CHARS, DEFAULT_EXTS, DEFAULT_INDIRS, generate_code_doc
-)
-
 
 @click.command(name='ccd')
 @click.option(
@@ -20,7 +16,8 @@ from core import (
 )
 @click.option(
     '-e', '--ext', 'exts',
-    multiple=True, help='源代码后缀，可以指定多个，默认为Python源代码'
+    multiple=True,
+    help='源代码后缀，可以指定多个，默认为Python源代码；支持复合后缀（d.ts）、排除（!min.js）与完整文件名（=Dockerfile）'
 )
 @click.option(
     '-c', '--comment-char', 'comment_chars',
@@ -58,13 +55,23 @@ from core import (
 @click.option(
     '-o', '--outfile', default='code.docx',
     type=click.Path(exists=False),
-    help='输出文件（docx格式），默认为当前目录的code.docx'
+    help='输出文件（docx或pdf格式，按后缀判断），默认为当前目录的code.docx；为-时写入标准输出'
+)
+@click.option(
+    '--format', 'output_format', default=None,
+    type=click.Choice(['docx', 'pdf']),
+    help='输出格式，默认按输出文件后缀判断（写入标准输出时为docx）'
 )
 @click.option(
     '--template', 'template_path', default=None,
     type=click.Path(exists=True),
     help='docx模板文件路径'
 )
+@click.option(
+    '--font-file', default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help='输出PDF时嵌入的TrueType字体文件（.ttf/.ttc），默认按字体名在系统字体目录中查找'
+)
 @click.option(
     '--encoding', default='utf-8',
     help='源码文件编码，默认为utf-8'
@@ -77,24 +84,126 @@ from core import (
     '--keep-comment-lines', is_flag=True,
     help='保留注释行'
 )
+@click.option(
+    '--line-numbers', is_flag=True,
+    help='开启Word原生行号（仅docx输出）'
+)
+@click.option(
+    '--line-number-start', default=1, type=click.IntRange(min=1),
+    help='起始行号，默认为1'
+)
+@click.option(
+    '--line-number-restart', default='page',
+    type=click.Choice(['page', 'section', 'continuous']),
+    help='行号重新编号方式：每页/每节/连续，默认为page'
+)
+@click.option(
+    '--compression', default=None,
+    type=click.Choice(['store', 'fast', 'default', 'max']),
+    help='docx压缩级别：store不压缩最快、max文件最小；默认使用python-docx的保存方式'
+)
+@click.option(
+    '--git', 'use_git', is_flag=True,
+    help='只收录git跟踪的文件（git ls-files），忽略未跟踪的构建产物'
+)
+@click.option(
+    '--git-rev', 'git_revision', default=None,
+    help='从指定的git版本（分支、标签或提交）读取文件，无需检出；隐含--git'
+)
+@click.option(
+    '--volume-by', default=None,
+    type=click.Choice(['pages', 'lines', 'dir']),
+    help='分册输出：按页数/行数/顶层目录拆分为code-1.docx、code-2.docx等，各册并行生成'
+)
+@click.option(
+    '--volume-size', default=None, type=click.IntRange(min=1),
+    help='按页数或行数分册时每册的上限'
+)
+@click.option(
+    '--parallel-render', is_flag=True,
+    help='由多个进程并行生成正文段落后按顺序拼接（仅docx输出），适合超大项目'
+)
+@click.option(
+    '--reproducible', is_flag=True,
+    help='生成可复现的docx：固定时间戳、部件顺序与核心属性，相同输入得到逐字节相同的文件'
+)
+@click.option(
+    '--skip-unchanged', is_flag=True,
+    help='输入（文件内容与生成参数）的摘要与已有输出一致时跳过生成'
+)
 @click.option(
     '--gui', is_flag=True,
     help='启动图形界面'
 )
-@click.option('-v', '--verbose', is_flag=True, help='打印调试信息')
+@click.option(
+    '--stats', is_flag=True,
+    help='仅统计各后缀/目录的行数、字节数与估算页数，不生成文档'
+)
+@click.option(
+    '--stats-format', default='table',
+    type=click.Choice(['table', 'json']),
+    help='统计结果输出格式，默认为table'
+)
+@click.option(
+    '--dry-run', is_flag=True,
+    help='不生成文档，仅按模板页面与排版参数估算页数'
+)
+@click.option(
+    '--batch', 'batch_manifest', default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help='按清单（JSON/TOML）批量生成多个项目的文档，忽略其它生成参数'
+)
+@click.option(
+    '--serve', is_flag=True,
+    help='以本地服务模式运行（POST /generate 提交任务，返回生成的文档）'
+)
+@click.option('--host', default='127.0.0.1', help='服务监听地址，默认为127.0.0.1')
+@click.option('--port', default=8765, type=click.IntRange(min=0, max=65535), help='服务监听端口，默认为8765')
+@click.option(
+    '--socket', 'socket_path', default=None,
+    type=click.Path(dir_okay=False),
+    help='改为监听Unix socket路径（忽略--host/--port）'
+)
+@click.option(
+    '--max-jobs', default=2, type=click.IntRange(min=1),
+    help='服务模式下同时运行的任务数，默认为2'
+)
+@click.option(
+    '-j', '--jobs', default=None, type=click.IntRange(min=1),
+    help='统计、分册、并行生成正文或批量生成时的并行进程数，默认为CPU核数'
+)
+@click.option('-v', '--verbose', is_flag=True, help='打印调试信息及各阶段耗时')
+@click.option(
+    '--profile', 'profile_path', default=None,
+    type=click.Path(exists=False),
+    help='将cProfile统计结果写入指定文件（可用pstats查看）'
+)
 def main(
         title, indirs, exts,
         comment_chars, font_name,
         font_size, space_before,
         space_after, line_spacing,
-        excludes, outfile, template_path,
-        encoding, keep_blank_lines,
-        keep_comment_lines, gui, verbose
+        excludes, outfile, output_format, template_path,
+        font_file, encoding, keep_blank_lines,
+        keep_comment_lines, line_numbers,
+        line_number_start, line_number_restart, compression,
+        use_git, git_revision, volume_by, volume_size,
+        parallel_render, reproducible, skip_unchanged, gui, stats,
+        stats_format, dry_run, batch_manifest, serve,
+        host, port, socket_path, max_jobs, jobs, verbose,
+        profile_path
 ):
     if gui:
         from gui import launch_gui
         launch_gui()
         return 0
+    # core 及其依赖在解析完参数后才导入，--help/参数错误时不承担导入开销
+    import logging
+    from core import (
+        DEFAULT_COMMENT_CHARS, DEFAULT_EXTS, DEFAULT_INDIRS, collect_code_stats,
+        format_stage_summary, format_stats_table, generate_code_doc,
+        load_batch_manifest, run_batch
+    )
     if not indirs:
         indirs = DEFAULT_INDIRS
     if not exts:
@@ -103,7 +212,67 @@ def main(
         comment_chars = DEFAULT_COMMENT_CHARS
     if verbose:
         logging.basicConfig(level=logging.DEBUG)
-    generate_code_doc(
+    if serve:
+        from server import serve as run_server
+        if not verbose:
+            logging.basicConfig(level=logging.INFO)
+        run_server(host=host, port=port, socket_path=socket_path, max_jobs=max_jobs)
+        return 0
+    if batch_manifest:
+        results = run_batch(load_batch_manifest(batch_manifest), max_workers=jobs)
+        for result in results:
+            if result['ok']:
+                click.echo('[完成] {}：{} 个文件，耗时 {:.2f}s，输出 {}'.format(
+                    result['name'], result['file_count'], result['elapsed'], result['outfile']
+                ))
+                if verbose:
+                    for line in format_stage_summary(result.get('stats')):
+                        click.echo('    ' + line)
+            else:
+                click.echo('[失败] {}：{}'.format(result['name'], result['error']), err=True)
+        if not all(result['ok'] for result in results):
+            sys.exit(1)
+        return 0
+    if stats or dry_run:
+        result = collect_code_stats(
+            indirs=indirs,
+            exts=exts,
+            comment_chars=comment_chars,
+            excludes=excludes,
+            skip_blank_lines=not keep_blank_lines,
+            skip_comment_lines=not keep_comment_lines,
+            encoding=encoding,
+            font_size=font_size,
+            line_spacing=line_spacing,
+            space_before=space_before,
+            space_after=space_after,
+            template_path=template_path,
+            outfile=None if outfile == '-' else outfile,
+            jobs=jobs
+        )
+        if not stats:
+            totals = result['totals']
+            click.echo('共 {} 个文件，写入 {} 行（原始 {} 行），预计 {} 页'.format(
+                totals['files'], totals['lines'], totals['raw_lines'], totals['page_count']
+            ))
+        elif stats_format == 'json':
+            import json
+            click.echo(json.dumps(result, ensure_ascii=False, indent=2))
+        else:
+            click.echo('\n'.join(format_stats_table(result)))
+        return 0
+    if volume_by:
+        if outfile == '-':
+            raise click.UsageError('分册输出不支持写入标准输出')
+        if volume_by != 'dir' and not volume_size:
+            raise click.UsageError('按页数或行数分册时需要指定--volume-size')
+    profile = None
+    if profile_path:
+        import cProfile
+        profile = cProfile.Profile()
+        profile.enable()
+    target = click.get_binary_stream('stdout') if outfile == '-' else outfile
+    result = generate_code_doc(
         title=title,
         indirs=indirs,
         exts=exts,
@@ -114,12 +283,43 @@ def main(
         space_after=space_after,
         line_spacing=line_spacing,
         excludes=excludes,
-        outfile=outfile,
+        outfile=target,
+        output_format=output_format,
         template_path=template_path,
         skip_blank_lines=not keep_blank_lines,
         skip_comment_lines=not keep_comment_lines,
-        encoding=encoding
+        encoding=encoding,
+        font_file=font_file,
+        line_numbers=line_numbers,
+        line_number_start=line_number_start,
+        line_number_restart=line_number_restart,
+        compression=compression,
+        use_git=use_git,
+        git_revision=git_revision,
+        volume_by=volume_by,
+        volume_size=volume_size,
+        jobs=jobs,
+        parallel_render=parallel_render,
+        reproducible=reproducible,
+        skip_unchanged=skip_unchanged
     )
+    if profile:
+        profile.disable()
+        profile.dump_stats(profile_path)
+    if result.get('skipped'):
+        click.echo('输入未变化，跳过生成：{}'.format(result['outfile']), err=True)
+    elif verbose:
+        click.echo('共写入 {} 个文件：{}'.format(
+            result['file_count'], '<stdout>' if outfile == '-' else result['outfile']
+        ), err=True)
+        for volume in result.get('volumes', []):
+            click.echo('    {}：{} 个文件{}'.format(
+                volume['outfile'], volume['file_count'], '（未变化，已跳过）' if volume.get('skipped') else ''
+            ), err=True)
+        for path in result.get('removed', []):
+            click.echo('    已删除过期的分册：{}'.format(path), err=True)
+        for line in format_stage_summary(result.get('stats')):
+            click.echo(line, err=True)
     return 0
 
 
@@ -3,6 +3,9 @@ import codecs
 import logging
 import os
 import re
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 from os.path import abspath
 try:
     from os import scandir
@@ -58,43 +61,190 @@ LANGUAGE_BY_EXT = {
     'sh': 'shellscript',
     'bash': 'shellscript',
     'rb': 'ruby',
-    'pl': 'perl'
+    'pl': 'perl',
+    'd.ts': 'typescript'
 }
-COMMENT_REGEX_BY_LANG = {
-    'javascript': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'typescript': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'go': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'php': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|#.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'csharp': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'kotlin': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'swift': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'rust': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'dart': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'scala': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'sql': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|--.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'r': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*', re.MULTILINE),
-    'lua': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|--\\[\\[[\\s\\S]*?\\]\\]|--.*', re.MULTILINE),
-    'powershell': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*|<#[\\s\\S]*?#>', re.MULTILINE),
-    'yaml': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*', re.MULTILINE),
-    'java': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'c': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'cpp': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/', re.MULTILINE),
-    'python': re.compile(r'#.*|\'\'\'[\s\S]*?\'\'\'|"""[\s\S]*?"""', re.MULTILINE),
-    'html': re.compile(r'<!--[\s\S]*?-->', re.MULTILINE),
-    'xml': re.compile(r'<!--[\s\S]*?-->', re.MULTILINE),
-    'css': re.compile(r'/\*[\s\S]*?\*/', re.MULTILINE),
-    'shellscript': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end', re.MULTILINE),
-    'ruby': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end', re.MULTILINE),
-    'perl': re.compile(r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end', re.MULTILINE)
+LANGUAGE_BY_NAME = {
+    'dockerfile': 'dockerfile',
+    'makefile': 'makefile',
+    'gnumakefile': 'makefile',
+    'rakefile': 'ruby',
+    'gemfile': 'ruby',
+    'vagrantfile': 'ruby'
 }
+SHEBANG_LANGUAGES = {
+    'python': 'python',
+    'pypy': 'python',
+    'sh': 'shellscript',
+    'bash': 'shellscript',
+    'dash': 'shellscript',
+    'ksh': 'shellscript',
+    'zsh': 'shellscript',
+    'node': 'javascript',
+    'nodejs': 'javascript',
+    'perl': 'perl',
+    'ruby': 'ruby'
+}
+COMMENT_PATTERN_BY_LANG = {
+    'javascript': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'typescript': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'go': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/',
+    'php': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|#.*|/\*[\s\S]*?\*/',
+    'csharp': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'kotlin': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/',
+    'swift': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/',
+    'rust': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/',
+    'dart': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'scala': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|//.*|/\*[\s\S]*?\*/',
+    'sql': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|--.*|/\*[\s\S]*?\*/',
+    'r': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*',
+    'lua': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|--\\[\\[[\\s\\S]*?\\]\\]|--.*',
+    'powershell': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*|<#[\\s\\S]*?#>',
+    'yaml': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*',
+    'java': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'c': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'cpp': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|//.*|/\*[\s\S]*?\*/',
+    'python': r'#.*|\'\'\'[\s\S]*?\'\'\'|"""[\s\S]*?"""',
+    'html': r'<!--[\s\S]*?-->',
+    'xml': r'<!--[\s\S]*?-->',
+    'css': r'/\*[\s\S]*?\*/',
+    'shellscript': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end',
+    'ruby': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end',
+    'perl': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\'|`(?:(?:\\.|[^`\\])*)`)|#.*|=begin[\s\S]*?=end',
+    'dockerfile': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*',
+    'makefile': r'("(?:(?:\\.|[^"\\])*)"|\'(?:(?:\\.|[^\'\\])*)\')|#.*'
+}
+
+STAGE_ORDER = ['collect', 'hash', 'measure', 'decode', 'filter', 'render', 'save']
+STAGE_LABELS = {
+    'collect': '扫描文件',
+    'hash': '计算输入摘要',
+    'measure': '统计分册',
+    'decode': '读取解码',
+    'filter': '过滤行',
+    'render': '写入段落',
+    'save': '保存文档'
+}
+COUNTER_LABELS = {
+    'files': '文件数',
+    'raw_lines': '原始行数',
+    'lines': '写入行数',
+    'chars': '读取字符数'
+}
+
+DEFAULT_PAGE_SIZE = (612.0, 792.0)
+DEFAULT_PAGE_MARGINS = (72.0, 90.0, 72.0, 90.0)
+DEFAULT_TAB_STOP = 36.0
+LINE_NUMBER_RESTART = {
+    'page': 'newPage',
+    'section': 'newSection',
+    'continuous': 'continuous'
+}
+WORD_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+INPUT_DIGEST_PREFIX = 'ccd-inputs:sha256:'
+INPUT_DIGEST_VERSION = 2
 
-PYTHON_BLOCK_COMMENT = re.compile(r'\'\'\'[\s\S]*?\'\'\'|"""[\s\S]*?"""', re.MULTILINE)
-PYTHON_LINE_COMMENT = re.compile(
-    r'([rRuUfFbB]{0,2}"(?:(?:\\.|[^"\\])*)"|[rRuUfFbB]{0,2}\'(?:(?:\\.|[^\'\\])*)\')|#.*',
-    re.MULTILINE
+PYTHON_BLOCK_COMMENT_PATTERN = r'\'\'\'[\s\S]*?\'\'\'|"""[\s\S]*?"""'
+PYTHON_LINE_COMMENT_PATTERN = (
+    r'([rRuUfFbB]{0,2}"(?:(?:\\.|[^"\\])*)"|[rRuUfFbB]{0,2}\'(?:(?:\\.|[^\'\\])*)\')|#.*'
 )
 
 
+class StageProfiler(object):
+    """
+    按阶段累计耗时与计数，用于定位生成过程中的耗时环节。
+
+    阶段名约定：
+        - collect：目录扫描（collect_code_files）
+        - hash：计算输入摘要（skip_unchanged）
+        - measure：分册前统计每个文件的行数/页数（generate_volumes）
+        - decode：读取并解码文件（decode_content）
+        - filter：空行/注释过滤（filter_lines）
+        - render：写入段落（CodeWriter.write_file）
+        - save：保存文档（CodeWriter.save）
+    """
+    def __init__(self):
+        self.timings = {}
+        self.calls = {}
+        self.counters = {}
+
+    def add(self, name, elapsed):
+        """
+        累加某阶段的一次耗时（秒）。
+        """
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def count(self, name, value=1):
+        """
+        累加计数器（如文件数、行数、字符数）。
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def stage(self, name):
+        """
+        以上下文管理器的方式计时某个阶段。
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, stats):
+        """
+        累加另一份 as_dict() 结果（如工作进程返回的统计）。
+        """
+        for name, elapsed in stats.get('timings', {}).items():
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+        for name, value in stats.get('calls', {}).items():
+            self.calls[name] = self.calls.get(name, 0) + value
+        for name, value in stats.get('counters', {}).items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """
+        Returns:
+            dict：包含 timings（秒）、calls 与 counters
+        """
+        return {
+            'timings': dict(self.timings),
+            'calls': dict(self.calls),
+            'counters': dict(self.counters)
+        }
+
+
+def format_stage_summary(stats):
+    """
+    将 StageProfiler.as_dict() 的结果格式化为便于阅读的文本行。
+
+    Args:
+        stats: StageProfiler.as_dict() 的返回值
+
+    Returns:
+        文本行列表
+    """
+    if not stats:
+        return []
+    timings = stats.get('timings', {})
+    calls = stats.get('calls', {})
+    counters = stats.get('counters', {})
+    total = sum(timings.values())
+    lines = []
+    for name in STAGE_ORDER + sorted(set(timings) - set(STAGE_ORDER)):
+        if name not in timings:
+            continue
+        elapsed = timings[name]
+        percent = elapsed / total * 100 if total else 0.0
+        lines.append('{}：{:.3f}s（{:.1f}%，{} 次）'.format(
+            STAGE_LABELS.get(name, name), elapsed, percent, calls.get(name, 0)
+        ))
+    for name in sorted(counters):
+        lines.append('{}：{}'.format(COUNTER_LABELS.get(name, name), counters[name]))
+    return lines
+
+
 def del_slash(dirs):
     """
     删除目录字符串末尾的 “/”。
@@ -149,9 +299,9 @@ def normalize_paths(paths):
     return unique
 
 
-def read_gitignore_excludes(indirs):
+def iter_gitignore_excludes(indirs, should_stop=None):
     """
-    读取指定目录下的 .gitignore，并提取可解析为“静态路径”的排除项。
+    逐个目录读取 .gitignore，按目录产出可解析为“静态路径”的排除项（供后台任务分批显示）。
 
     说明：
         - 会忽略通配符/字符集等模式（如 *, ?, []）
@@ -160,25 +310,30 @@ def read_gitignore_excludes(indirs):
 
     Args:
         indirs: 源码目录列表
+        should_stop: 可选回调，返回 True 时停止遍历
 
-    Returns:
-        排除路径列表（绝对路径、去重）
+    Yields:
+        (当前目录, 该目录 .gitignore 中的排除路径列表)；没有 .gitignore 的目录产出空列表，便于统计进度
     """
-    excludes = []
     for indir in indirs:
         root = abspath(indir)
         if not os.path.isdir(root):
             continue
         for current_root, dirs, files in os.walk(root):
+            if should_stop and should_stop():
+                return
             gitignore_name = '.gitignore'
             if gitignore_name not in files:
+                yield current_root, []
                 continue
             gitignore_path = os.path.join(current_root, gitignore_name)
             try:
                 with codecs.open(gitignore_path, encoding='utf-8', errors='ignore') as fp:
                     lines = fp.readlines()
             except OSError:
+                yield current_root, []
                 continue
+            excludes = []
             for raw in lines:
                 line = raw.strip()
                 if not line:
@@ -199,25 +354,86 @@ def read_gitignore_excludes(indirs):
                 path = abspath(os.path.join(current_root, line))
                 if os.path.exists(path):
                     excludes.append(path)
+            yield current_root, excludes
+
+
+def read_gitignore_excludes(indirs, should_stop=None):
+    """
+    读取指定目录下的 .gitignore，并提取可解析为“静态路径”的排除项（规则见 iter_gitignore_excludes）。
+
+    Args:
+        indirs: 源码目录列表
+        should_stop: 可选回调，返回 True 时停止遍历
+
+    Returns:
+        排除路径列表（绝对路径、去重）
+    """
+    excludes = []
+    for _, paths in iter_gitignore_excludes(indirs, should_stop):
+        excludes.extend(paths)
     return normalize_paths(excludes)
 
 
-def is_binary_file(file_path):
+def detect_shebang_language(head):
     """
-    粗略判断文件是否为二进制文件。
+    按 shebang 行（如 #!/bin/bash、#!/usr/bin/env python3）识别脚本语言。
+
+    Args:
+        head: 文件开头的 bytes 或已解码的文本
+
+    Returns:
+        语言标识（见 SHEBANG_LANGUAGES）；没有 shebang 或解释器未知时返回空字符串
+    """
+    if isinstance(head, bytes):
+        if not head.startswith(b'#!'):
+            return ''
+        head = head[:256].decode('utf-8', 'ignore')
+    elif not head.startswith('#!'):
+        return ''
+    words = head[2:256].split('\n', 1)[0].split()
+    if not words:
+        return ''
+    interpreter = words[0].rsplit('/', 1)[-1]
+    if interpreter == 'env':
+        # 跳过 env 的选项与环境变量赋值，如 #!/usr/bin/env -S VAR=1 node
+        args = [word for word in words[1:] if not word.startswith('-') and '=' not in word]
+        if not args:
+            return ''
+        interpreter = args[0].rsplit('/', 1)[-1]
+    return SHEBANG_LANGUAGES.get(interpreter.rstrip('0123456789.'), '')
+
+
+def sniff_file(file_path):
+    """
+    读取文件开头一次，同时判断是否为二进制文件并识别 shebang。
 
     Args:
         file_path: 文件路径
 
     Returns:
-        bool：疑似二进制则为 True
+        (是否疑似二进制, shebang 语言)；无法读取时视为二进制
     """
     try:
         with open(file_path, 'rb') as fp:
             chunk = fp.read(2048)
-        return b'\x00' in chunk
     except OSError:
-        return True
+        return True, ''
+    if b'\x00' in chunk:
+        return True, ''
+    return False, detect_shebang_language(chunk)
+
+
+def is_binary_file(file_path):
+    """
+    粗略判断文件是否为二进制文件。
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        bool：疑似二进制则为 True
+    """
+    return sniff_file(file_path)[0]
 
 
 def decode_content(file_path, encoding):
@@ -239,6 +455,22 @@ def decode_content(file_path, encoding):
             data = fp.read()
     except OSError:
         return ''
+    return decode_bytes(data, encoding)
+
+
+def decode_bytes(data, encoding):
+    """
+    按编码将字节解码为字符串，规则与 decode_content 一致（用于不在磁盘上的内容，如 git 中的文件）。
+
+    Args:
+        data: 原始字节
+        encoding: 指定编码；若为 'auto' 或空则尝试多种常见编码
+
+    Returns:
+        解码后的文本内容
+    """
+    if encoding and encoding != 'auto':
+        return codecs.decode(data, encoding, 'ignore')
     for name in ('utf-8-sig', 'utf-8', 'gb18030', 'gbk'):
         try:
             return data.decode(name)
@@ -247,18 +479,196 @@ def decode_content(file_path, encoding):
     return data.decode('utf-8', errors='ignore')
 
 
+def count_lines(content):
+    """
+    统计文本行数（与按换行符 splitlines 的结果一致，但不创建列表）。
+
+    Args:
+        content: 文本内容
+
+    Returns:
+        行数
+    """
+    if not content:
+        return 0
+    count = content.count('\n')
+    if not content.endswith('\n'):
+        count += 1
+    return count
+
+
+class FileRules(object):
+    """
+    预编译的文件名规则：一次编译为后缀字典与文件名字典，之后每个文件名只需常数次字典查找。
+
+    规则写法（与 --ext 相同的列表）：
+        'py' / '.py'：包含该后缀
+        'd.ts'：复合后缀，优先于更短的后缀匹配
+        '!min.js'：排除该后缀（如排除压缩后的 .min.js，即使包含了 js）
+        '=Dockerfile'：按完整文件名包含（不区分大小写），用于无后缀的文件
+
+    匹配顺序：完整文件名 > 最长后缀 > 较短后缀。
+    languages 为被包含规则对应的语言集合，CodeFinder 据此按 shebang 包含无后缀的脚本。
+    """
+    EXCLUDED = None
+
+    def __init__(self, exts=None, language_by_suffix=None, language_by_name=None):
+        """
+        Args:
+            exts: 规则列表；为空则不包含任何文件
+            language_by_suffix/language_by_name: 语言表，为空则使用 LANGUAGE_BY_EXT / LANGUAGE_BY_NAME
+        """
+        self.language_by_suffix = language_by_suffix if language_by_suffix is not None else LANGUAGE_BY_EXT
+        self.language_by_name = language_by_name if language_by_name is not None else LANGUAGE_BY_NAME
+        self.suffixes = {}
+        self.names = {}
+        for rule in exts or []:
+            rule = rule.strip().lower()
+            if rule.startswith('='):
+                name = rule[1:]
+                if name:
+                    self.names[name] = self.language_by_name.get(name, '')
+                continue
+            excluded = rule.startswith('!')
+            suffix = rule.lstrip('!').lstrip('.')
+            if not suffix:
+                continue
+            self.suffixes[suffix] = self.EXCLUDED if excluded else self._suffix_language(suffix)
+        self.max_dots = max([suffix.count('.') + 1 for suffix in self.suffixes] or [0])
+        self.languages = set(
+            language for language in list(self.suffixes.values()) + list(self.names.values()) if language
+        )
+
+    def _suffix_language(self, suffix):
+        parts = suffix.split('.')
+        for i in range(len(parts)):
+            language = self.language_by_suffix.get('.'.join(parts[i:]))
+            if language:
+                return language
+        return ''
+
+    def match(self, name):
+        """
+        返回文件名匹配到的规则（含排除规则）。
+
+        Args:
+            name: 文件名（不含目录）
+
+        Returns:
+            完整文件名规则为 '=文件名'，后缀规则为后缀（均为小写，如 'd.ts'）；未匹配任何规则时返回 None
+        """
+        lowered = name.lower()
+        if lowered in self.names:
+            return '=' + lowered
+        suffixes = self.suffixes
+        end = len(lowered)
+        starts = []
+        for _ in range(self.max_dots):
+            end = lowered.rfind('.', 0, end)
+            if end < 0:
+                break
+            starts.append(end + 1)
+        for start in reversed(starts):
+            suffix = lowered[start:]
+            if suffix in suffixes:
+                return suffix
+        return None
+
+    def classify(self, name):
+        """
+        判断文件名是否被包含。
+
+        Args:
+            name: 文件名（不含目录）
+
+        Returns:
+            被包含时返回语言标识（未知语言为空字符串）；不被包含时返回 None
+        """
+        rule = self.match(name)
+        if rule is None:
+            return None
+        if rule[0] == '=':
+            return self.names[rule[1:]]
+        return self.suffixes[rule]
+
+    def is_code(self, name):
+        return self.classify(name) is not None
+
+
+@lru_cache(maxsize=64)
+def compile_file_rules(exts):
+    """
+    编译并缓存文件名规则（同一组规则在进程内只编译一次）。
+
+    Args:
+        exts: 规则元组（见 FileRules）
+
+    Returns:
+        FileRules
+    """
+    return FileRules(exts)
+
+
+@lru_cache(maxsize=1)
+def get_language_rules():
+    """
+    返回按 LANGUAGE_BY_EXT / LANGUAGE_BY_NAME 编译的语言识别规则。
+    """
+    return FileRules(
+        list(LANGUAGE_BY_EXT) + ['=' + name for name in LANGUAGE_BY_NAME]
+    )
+
+
 def get_language_by_extension(file_path):
     """
-    根据文件后缀推断语言标识。
+    根据文件后缀（含复合后缀）或完整文件名推断语言标识。
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        语言字符串（未识别返回空字符串）
+    """
+    return get_language_rules().classify(os.path.basename(file_path)) or ''
+
+
+def detect_language(file_path, content=None):
+    """
+    推断文件语言：先按文件名，未识别时按内容开头的 shebang（只检查已读取的内容，不再读文件）。
 
     Args:
         file_path: 文件路径
+        content: 已解码的文件内容，可为空
 
     Returns:
         语言字符串（未识别返回空字符串）
     """
-    ext = os.path.splitext(file_path)[1].lower().lstrip('.')
-    return LANGUAGE_BY_EXT.get(ext, '')
+    language = get_language_by_extension(file_path)
+    if not language and content:
+        language = detect_shebang_language(content)
+    return language
+
+
+@lru_cache(maxsize=None)
+def get_comment_regex(language):
+    """
+    按语言获取注释正则（首次使用时编译并缓存，避免导入模块时编译全部规则）。
+
+    Args:
+        language: 语言标识；'python-block'/'python-line' 为 Python 专用的两段规则
+
+    Returns:
+        编译后的正则；未知语言返回 None
+    """
+    if language == 'python-block':
+        pattern = PYTHON_BLOCK_COMMENT_PATTERN
+    elif language == 'python-line':
+        pattern = PYTHON_LINE_COMMENT_PATTERN
+    else:
+        pattern = COMMENT_PATTERN_BY_LANG.get(language)
+    if not pattern:
+        return None
+    return re.compile(pattern, re.MULTILINE)
 
 
 def strip_comments(content, language):
@@ -277,12 +687,12 @@ def strip_comments(content, language):
         去除注释后的文本
     """
     if language == 'python':
-        content = PYTHON_BLOCK_COMMENT.sub('', content)
+        content = get_comment_regex('python-block').sub('', content)
         def replacer(match):
             group = match.group(1)
             return group if group else ''
-        return PYTHON_LINE_COMMENT.sub(replacer, content)
-    pattern = COMMENT_REGEX_BY_LANG.get(language)
+        return get_comment_regex('python-line').sub(replacer, content)
+    pattern = get_comment_regex(language)
     if not pattern:
         return content
     if language in ('html', 'xml', 'css'):
@@ -325,6 +735,135 @@ def filter_lines(content, language, skip_blank_lines, skip_comment_lines, commen
     return lines
 
 
+def read_code_lines(file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, profiler=None):
+    """
+    读取并过滤单个源码文件（decode_content + filter_lines），按阶段计入 profiler。
+
+    Args:
+        file: 文件路径
+        encoding/skip_blank_lines/skip_comment_lines/comment_chars: 同 filter_lines
+        profiler: StageProfiler 实例，可为空
+
+    Returns:
+        (过滤后的行列表, 字符数, 原始行数)
+    """
+    profiler = profiler if profiler else StageProfiler()
+    with profiler.stage('decode'):
+        content = decode_content(file, encoding)
+    language = detect_language(file, content)
+    with profiler.stage('filter'):
+        lines = filter_lines(content, language, skip_blank_lines, skip_comment_lines, comment_chars)
+    return lines, len(content), count_lines(content)
+
+
+class FileIndex(object):
+    """
+    紧凑的文件索引，用于百万级文件的目录树。
+
+    - 目录路径驻留为编号，每个文件只保存目录编号
+    - 文件名以 UTF-8 连续存放在一个 bytearray 中，按结束偏移访问
+    - 大小、修改时间（纳秒）与后缀编号存放在 array 列中
+    - 语言（由文件名或扫描时读取的 shebang 识别）同样驻留为编号，后续阶段无需再次识别
+
+    每 10 万个文件的内存占用见 benchmarks/bench_index.py。
+    """
+    def __init__(self):
+        from array import array
+        self.dirs = []
+        self._dir_ids = {}
+        self.exts = []
+        self._ext_ids = {}
+        self.languages = []
+        self._language_ids = {}
+        self._names = bytearray()
+        self._name_ends = array('Q')
+        self.dir_ids = array('I')
+        self.ext_ids = array('I')
+        self.language_ids = array('H')
+        self.sizes = array('q')
+        self.mtimes = array('q')
+
+    def __len__(self):
+        return len(self.dir_ids)
+
+    def __iter__(self):
+        for i in range(len(self.dir_ids)):
+            yield self.path(i)
+
+    def __getitem__(self, i):
+        return self.path(i)
+
+    def add(self, directory, name, size=-1, mtime_ns=-1, language=''):
+        """
+        追加一个文件；size/mtime_ns 未知时为 -1，language 未识别时为空字符串。
+
+        Returns:
+            文件在索引中的编号
+        """
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        ext = os.path.splitext(name)[1].lower().lstrip('.')
+        ext_id = self._ext_ids.get(ext)
+        if ext_id is None:
+            ext_id = self._ext_ids[ext] = len(self.exts)
+            self.exts.append(ext)
+        language_id = self._language_ids.get(language)
+        if language_id is None:
+            language_id = self._language_ids[language] = len(self.languages)
+            self.languages.append(language)
+        self._names += name.encode('utf-8', 'surrogateescape')
+        self._name_ends.append(len(self._names))
+        self.dir_ids.append(dir_id)
+        self.ext_ids.append(ext_id)
+        self.language_ids.append(language_id)
+        self.sizes.append(size)
+        self.mtimes.append(mtime_ns)
+        return len(self.dir_ids) - 1
+
+    def name(self, i):
+        start = self._name_ends[i - 1] if i else 0
+        return self._names[start:self._name_ends[i]].decode('utf-8', 'surrogateescape')
+
+    def directory(self, i):
+        return self.dirs[self.dir_ids[i]]
+
+    def path(self, i):
+        return os.path.join(self.dirs[self.dir_ids[i]], self.name(i))
+
+    def ext(self, i):
+        return self.exts[self.ext_ids[i]]
+
+    def language(self, i):
+        return self.languages[self.language_ids[i]]
+
+    def paths(self):
+        """
+        Returns:
+            全部文件的绝对路径列表（按加入顺序）
+        """
+        return list(self)
+
+    def total_size(self):
+        return sum(size for size in self.sizes if size > 0)
+
+    def memory_size(self):
+        """
+        Returns:
+            索引自身占用的近似字节数（不含解释器共享的小对象）
+        """
+        import sys
+        columns = (
+            self._names, self._name_ends, self.dir_ids, self.ext_ids, self.language_ids, self.sizes, self.mtimes
+        )
+        size = sum(sys.getsizeof(column) for column in columns)
+        for values in (self.dirs, self.exts, self.languages):
+            size += sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+        ids = (self._dir_ids, self._ext_ids, self._language_ids)
+        return size + sum(sys.getsizeof(value) for value in ids)
+
+
 class CodeFinder(object):
     """
     递归扫描目录，收集指定后缀的代码文件。
@@ -334,25 +873,47 @@ class CodeFinder(object):
         - 指定的目录名/文件名
         - excludes 命中的文件或目录
         - 疑似二进制文件
+
+    无后缀的脚本按 shebang 识别语言：语言属于已包含的后缀（如包含 py 时的 #!/usr/bin/env python3）即被包含。
+    visited_dirs/sniffed_files 设为列表时，扫描会记录遍历过的目录，以及读取过内容的文件（是否收录取决于内容）
+    与读取前的 (大小, 修改时间)，供缓存校验使用。
     """
-    def __init__(self, exts=None, skip_dir_names=None, skip_file_names=None):
+    def __init__(self, exts=None, skip_dir_names=None, skip_file_names=None, should_stop=None):
         """
         Args:
-            exts: 后缀列表（如 ['py', 'js']），默认为 ['py']
+            exts: 后缀规则列表（如 ['py', 'd.ts', '!min.js', '=Dockerfile']，见 FileRules），默认为 ['py']
             skip_dir_names: 需要跳过的目录名列表
             skip_file_names: 需要跳过的文件名列表
+            should_stop: 可选回调，返回 True 时停止扫描并返回已找到的文件（用于取消任务）
         """
         self.exts = exts if exts else ['py']
+        self.rules = compile_file_rules(tuple(self.exts))
         self.skip_dir_names = skip_dir_names if skip_dir_names else []
         self.skip_file_names = skip_file_names if skip_file_names else []
+        self.should_stop = should_stop
+        self.visited_dirs = None
+        self.sniffed_files = None
 
     def is_code(self, file):
-        lowered = file.lower()
-        for ext in self.exts:
-            ext = ext.lower().lstrip('.')
-            if lowered.endswith('.' + ext):
-                return True
-        return False
+        return self.rules.is_code(file)
+
+    def classify(self, name, shebang=''):
+        """
+        判断文件是否被包含并返回其语言。
+
+        Args:
+            name: 文件名（不含目录）
+            shebang: 文件开头 shebang 识别出的语言（见 sniff_file）
+
+        Returns:
+            语言标识（未知为空字符串）；不被包含时返回 None
+        """
+        language = self.rules.classify(name)
+        if language is None:
+            if shebang and '.' not in name and shebang in self.rules.languages:
+                return shebang
+            return None
+        return language or shebang
 
     @staticmethod
     def is_hidden_file(file):
@@ -388,19 +949,23 @@ class CodeFinder(object):
                 break
         return should_be_excluded
 
-    def find(self, indir, excludes=None):
+    def iter_entries(self, indir, excludes=None):
         """
-        查找目录下所有符合后缀的代码文件。
+        递归遍历目录，逐个产出符合条件的代码文件。
 
         Args:
-            indir: 需要扫描的目录
+            indir: 需要扫描的目录（绝对路径）
             excludes: 排除文件或目录（绝对路径）
 
-        Returns:
-            代码文件列表（绝对路径）
+        Yields:
+            (所在目录, os.DirEntry, 文件绝对路径, 语言标识)
         """
-        files = []
-        for entry in scandir(indir):
+        if self.should_stop and self.should_stop():
+            return
+        if self.visited_dirs is not None:
+            self.visited_dirs.append(indir)
+        # 排序后遍历（先直接文件、后子目录，各自按名称），输出顺序不依赖文件系统
+        for entry in sorted(scandir(indir), key=_entry_order_key):
             entry_name = entry.name
             entry_path = abspath(entry.path)
             if self.is_hidden_file(entry_name):
@@ -412,16 +977,63 @@ class CodeFinder(object):
             if self.should_be_excluded(entry_path, excludes):
                 continue
             if entry.is_file():
-                if is_binary_file(entry_path):
+                # 文件名不匹配且不可能按 shebang 收录的文件无需读取
+                if self.rules.classify(entry_name) is None and ('.' in entry_name or not self.rules.languages):
+                    continue
+                if self.sniffed_files is not None:
+                    # 在读取内容之前记录，扫描期间被修改的文件在下次校验时不会命中
+                    try:
+                        stat = entry.stat()
+                        self.sniffed_files.append((entry_path, (stat.st_size, stat.st_mtime_ns)))
+                    except OSError:
+                        self.sniffed_files.append((entry_path, None))
+                is_binary, shebang = sniff_file(entry_path)
+                if is_binary:
                     continue
-                if self.is_code(entry_name):
-                    files.append(entry_path)
+                language = self.classify(entry_name, shebang)
+                if language is not None:
+                    yield indir, entry, entry_path, language
                 continue
-            for file in self.find(entry_path, excludes=excludes):
-                files.append(file)
+            for item in self.iter_entries(entry_path, excludes=excludes):
+                yield item
+
+    def find(self, indir, excludes=None):
+        """
+        查找目录下所有符合后缀的代码文件。
+
+        Args:
+            indir: 需要扫描的目录
+            excludes: 排除文件或目录（绝对路径）
+
+        Returns:
+            代码文件列表（绝对路径）
+        """
+        files = [path for _, _, path, _ in self.iter_entries(abspath(indir), excludes)]
         logger.debug('在%s目录下找到%d个代码文件.', indir, len(files))
         return files
 
+    def find_index(self, indir, excludes=None, index=None):
+        """
+        与 find 相同，但结果写入紧凑的 FileIndex，并记录文件大小、修改时间与语言。
+
+        Args:
+            indir: 需要扫描的目录
+            excludes: 排除文件或目录（绝对路径）
+            index: 追加写入的 FileIndex；为空则新建
+
+        Returns:
+            FileIndex
+        """
+        if index is None:
+            index = FileIndex()
+        for directory, entry, _, language in self.iter_entries(abspath(indir), excludes):
+            try:
+                stat = entry.stat()
+                index.add(directory, entry.name, stat.st_size, stat.st_mtime_ns, language)
+            except OSError:
+                index.add(directory, entry.name, language=language)
+        return index
+
 
 class CodeWriter(object):
     """
@@ -432,6 +1044,10 @@ class CodeWriter(object):
         - 字体、字号、段前/段后/行距
         - 空行/注释过滤（与 filter_lines 一致）
         - docx 模板
+        - Word 原生行号（节属性 w:lnNumType，不改动每行文本）
+        - 保存时的压缩级别（见 package_writer）
+        - 拼接预先序列化的段落 XML（append_xml，用于多进程并行生成正文）
+        - 可复现输出（reproducible）：固定 ZIP 时间戳与部件顺序、规范化核心属性，相同输入得到逐字节相同的文档
     """
     def __init__(
             self, font_name='宋体',
@@ -439,7 +1055,9 @@ class CodeWriter(object):
             space_after=2.3, line_spacing=10.5,
             command_chars=None, document=None,
             template_path=None, skip_blank_lines=True,
-            skip_comment_lines=True, encoding='utf-8'
+            skip_comment_lines=True, encoding='utf-8',
+            profiler=None, line_reader=None,
+            compression=None, reproducible=False
     ):
         Document, Pt, WD_PARAGRAPH_ALIGNMENT = load_docx_dependencies()
         self.font_name = font_name
@@ -451,9 +1069,16 @@ class CodeWriter(object):
         self.skip_blank_lines = skip_blank_lines
         self.skip_comment_lines = skip_comment_lines
         self.encoding = encoding
+        self.profiler = profiler if profiler else StageProfiler()
+        self.line_reader = line_reader if line_reader else read_code_lines
+        self.compression = compression
+        self.reproducible = reproducible
+        self.input_digest = None
         self._Pt = Pt
         self._WD_PARAGRAPH_ALIGNMENT = WD_PARAGRAPH_ALIGNMENT
         self.document = document if document else create_document(template_path, Document)
+        self._fragments = []
+        self._fragment_marker = None
 
     @staticmethod
     def is_blank_line(line):
@@ -486,26 +1111,125 @@ class CodeWriter(object):
         """
         将单个文件内容按行追加到文档中。
         """
-        content = decode_content(file, self.encoding)
-        language = get_language_by_extension(file)
-        lines = filter_lines(
-            content, language,
+        profiler = self.profiler
+        lines, chars, raw_lines = self.line_reader(
+            file, self.encoding,
             self.skip_blank_lines,
             self.skip_comment_lines,
-            self.command_chars
+            self.command_chars,
+            profiler
         )
-        for line in lines:
-            paragraph = self.document.add_paragraph()
-            paragraph.paragraph_format.space_before = self._Pt(self.space_before)
-            paragraph.paragraph_format.space_after = self._Pt(self.space_after)
-            paragraph.paragraph_format.line_spacing = self._Pt(self.line_spacing)
-            run = paragraph.add_run(line.rstrip())
-            run.font.name = self.font_name
-            run.font.size = self._Pt(self.font_size)
+        with profiler.stage('render'):
+            for line in lines:
+                paragraph = self.document.add_paragraph()
+                paragraph.paragraph_format.space_before = self._Pt(self.space_before)
+                paragraph.paragraph_format.space_after = self._Pt(self.space_after)
+                paragraph.paragraph_format.line_spacing = self._Pt(self.line_spacing)
+                run = paragraph.add_run(line.rstrip())
+                run.font.name = self.font_name
+                run.font.size = self._Pt(self.font_size)
+        profiler.count('files')
+        profiler.count('chars', chars)
+        profiler.count('raw_lines', raw_lines)
+        profiler.count('lines', len(lines))
+        return self
+
+    def set_line_numbers(self, start=1, restart='page', count_by=1, distance=None):
+        """
+        为文档所有节开启 Word 原生行号，由 Word 在排版时编号，写入每行时无额外开销。
+
+        Args:
+            start: 起始行号
+            restart: 重新编号方式：'page'（每页）、'section'（每节）或 'continuous'（连续）
+            count_by: 行号间隔，如 5 表示每 5 行显示一次
+            distance: 行号与正文的距离（磅）；为空则由 Word 决定
+
+        Raises:
+            ValueError: restart 取值不合法
+        """
+        if restart not in LINE_NUMBER_RESTART:
+            raise ValueError('不支持的行号编号方式：{}'.format(restart))
+        from docx.oxml import OxmlElement
+        from docx.oxml.ns import qn
+        for section in self.document.sections:
+            sect_pr = section._sectPr
+            for existing in sect_pr.findall(qn('w:lnNumType')):
+                sect_pr.remove(existing)
+            ln_num_type = OxmlElement('w:lnNumType')
+            ln_num_type.set(qn('w:countBy'), str(count_by))
+            # Word 会在 w:start 的基础上加 1 显示
+            if start != 1:
+                ln_num_type.set(qn('w:start'), str(start - 1))
+            ln_num_type.set(qn('w:restart'), LINE_NUMBER_RESTART[restart])
+            if distance is not None:
+                ln_num_type.set(qn('w:distance'), str(int(round(distance * 20))))
+            sect_pr.insert_element_before(
+                ln_num_type,
+                'w:pgNumType', 'w:cols', 'w:formProt', 'w:vAlign', 'w:noEndnote',
+                'w:titlePg', 'w:textDirection', 'w:bidi', 'w:rtlGutter', 'w:docGrid',
+                'w:printerSettings', 'w:sectPrChange'
+            )
+        return self
+
+    def append_xml(self, fragment):
+        """
+        追加预先序列化的段落 XML（UTF-8 bytes，见 ParagraphXmlTemplate），保存时按追加顺序拼接进正文。
+
+        拼接位置为第一次调用时正文的末尾，之后仍可通过 write_file 继续追加段落（位于拼接内容之后）。
+        """
+        if self._fragment_marker is None:
+            import uuid
+            self._fragment_marker = 'ccd-fragments-{}'.format(uuid.uuid4().hex)
+            self.document.add_paragraph(self._fragment_marker)
+        self._fragments.append(fragment)
+        return self
+
+    def _spliced_document_xml(self):
+        blob = self.document.part.blob
+        marker = blob.find(self._fragment_marker.encode('ascii'))
+        start = max(blob.rfind(b'<w:p>', 0, marker), blob.rfind(b'<w:p ', 0, marker))
+        end = blob.find(b'</w:p>', marker) + len(b'</w:p>')
+        return b''.join([blob[:start]] + self._fragments + [blob[end:]])
+
+    def normalize_core_properties(self):
+        """
+        将核心属性中的创建/修改时间固定为可复现时间（见 package_writer.reproducible_date_time），修订号置为 1。
+        """
+        import datetime
+        from package_writer import reproducible_date_time
+        stamp = datetime.datetime(*reproducible_date_time())
+        properties = self.document.core_properties
+        properties.created = stamp
+        properties.modified = stamp
+        if properties.last_printed is not None:
+            properties.last_printed = stamp
+        properties.revision = 1
         return self
 
     def save(self, file):
-        self.document.save(file)
+        """
+        保存文档；设置了 compression 时由 package_writer 按指定级别写出，正文在后台线程并行压缩。
+        通过 append_xml 追加过段落、开启 reproducible 或设置了 input_digest 时总是由 package_writer 写出
+        （未设置 compression 时按 'default'）；input_digest 写入 ZIP 注释，供 read_input_digest 读取。
+
+        Args:
+            file: 输出路径或可写的二进制流（ZIP 顺序写出，流无需支持 seek）
+        """
+        with self.profiler.stage('save'):
+            if self._fragment_marker is None and not (self.compression or self.reproducible or self.input_digest):
+                self.document.save(file)
+                return
+            from package_writer import save_document
+            if self.reproducible:
+                self.normalize_core_properties()
+            blobs = {}
+            if self._fragment_marker is not None:
+                blobs[self.document.part.partname] = self._spliced_document_xml()
+            save_document(
+                self.document, file, compression=self.compression or 'default', blobs=blobs,
+                reproducible=self.reproducible,
+                comment=(INPUT_DIGEST_PREFIX + self.input_digest).encode('ascii') if self.input_digest else b''
+            )
 
 
 def load_docx_dependencies():
@@ -527,17 +1251,102 @@ def load_docx_dependencies():
         raise RuntimeError('未检测到可用的python-docx，请安装python-docx并卸载docx包') from exc
 
 
-def create_document(template_path, Document):
-    """
-    创建 docx 文档对象。
+_TEMPLATES = {}
 
-    Args:
-        template_path: 模板文件路径；为空则创建空文档
-        Document: python-docx 的 Document 类
-    """
-    if template_path:
-        return Document(template_path)
-    return Document()
+
+class TemplateInfo(object):
+    """
+    已读取的 docx 模板：文件内容、正文最后一节的页面设置，以及首次使用时解析的 python-docx 文档对象。
+
+    Attributes:
+        path: 模板绝对路径
+        data: 模板文件的 bytes
+        page_size: (页宽, 页高)，单位为磅
+        margins: (上, 右, 下, 左)，单位为磅
+    """
+    def __init__(self, path, data):
+        import threading
+        import zipfile
+        from io import BytesIO
+        self.path = path
+        self.data = data
+        with zipfile.ZipFile(BytesIO(data)) as archive:
+            try:
+                document_xml = archive.read('word/document.xml')
+            except KeyError:
+                document_xml = None
+        self.page_size, self.margins = parse_page_setup(document_xml)
+        self._prototype = None
+        self._lock = threading.Lock()
+
+    def new_document(self, Document):
+        """
+        基于模板创建新的 docx 文档对象：首次调用时解析一次，之后复制已解析的文档对象（可在多个线程中调用）。
+        """
+        import copy
+        from io import BytesIO
+        if self._prototype is None:
+            with self._lock:
+                if self._prototype is None:
+                    self._prototype = Document(BytesIO(self.data))
+        return copy.deepcopy(self._prototype)
+
+
+def load_template(template_path):
+    """
+    读取并解析模板，按（绝对路径, 修改时间）缓存，同一进程内多次生成（GUI、批量、服务模式）只解析一次。
+
+    Args:
+        template_path: 模板文件路径
+
+    Returns:
+        TemplateInfo
+
+    Raises:
+        OSError: 模板文件不存在或无法读取
+        zipfile.BadZipFile: 模板不是有效的 docx
+    """
+    path = abspath(template_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        with open(path, 'rb') as fp:
+            template = TemplateInfo(path, fp.read())
+        for stale in [item for item in _TEMPLATES if item[0] == path]:
+            del _TEMPLATES[stale]
+        _TEMPLATES[key] = template
+    return template
+
+
+def read_input_digest(outfile):
+    """
+    读取 docx 的 ZIP 注释中记录的输入摘要（见 CodeDocPipeline.input_digest）。
+
+    Returns:
+        摘要字符串；文件不存在、不是 ZIP 或未记录摘要时返回 None
+    """
+    import zipfile
+    try:
+        with zipfile.ZipFile(outfile) as archive:
+            comment = archive.comment.decode('ascii', 'ignore')
+    except (OSError, zipfile.BadZipFile):
+        return None
+    if comment.startswith(INPUT_DIGEST_PREFIX):
+        return comment[len(INPUT_DIGEST_PREFIX):]
+    return None
+
+
+def create_document(template_path, Document):
+    """
+    创建 docx 文档对象。
+
+    Args:
+        template_path: 模板文件路径；为空则创建空文档
+        Document: python-docx 的 Document 类
+    """
+    if template_path:
+        return load_template(template_path).new_document(Document)
+    return Document()
 
 
 def normalize_items(text):
@@ -580,7 +1389,7 @@ def normalize_exts(exts):
     return items
 
 
-def collect_code_files(indirs, exts, excludes, skip_dir_names=None, skip_file_names=None):
+def collect_code_files(indirs, exts, excludes, skip_dir_names=None, skip_file_names=None, should_stop=None):
     """
     收集所有代码文件路径。
 
@@ -590,66 +1399,1110 @@ def collect_code_files(indirs, exts, excludes, skip_dir_names=None, skip_file_na
         excludes: 排除路径列表（绝对路径）
         skip_dir_names: 跳过目录名列表
         skip_file_names: 跳过文件名列表
+        should_stop: 可选回调，返回 True 时提前结束扫描
 
     Returns:
         文件路径列表（绝对路径）
     """
-    finder = CodeFinder(exts, skip_dir_names=skip_dir_names, skip_file_names=skip_file_names)
+    finder = CodeFinder(
+        exts, skip_dir_names=skip_dir_names,
+        skip_file_names=skip_file_names, should_stop=should_stop
+    )
     files = []
     for indir in indirs:
         files.extend(finder.find(indir, excludes=excludes))
     return files
 
 
-def collect_all_file_extensions(indirs, excludes, skip_dir_names=None, skip_file_names=None):
+def collect_code_index(indirs, exts, excludes, skip_dir_names=None, skip_file_names=None, should_stop=None):
     """
-    扫描目录并收集出现过的文件后缀（用于 GUI 的“自动识别后缀”）。
+    与 collect_code_files 相同，但返回紧凑的 FileIndex（含大小与修改时间），适合超大目录树。
+
+    Returns:
+        FileIndex
+    """
+    finder = CodeFinder(
+        exts, skip_dir_names=skip_dir_names,
+        skip_file_names=skip_file_names, should_stop=should_stop
+    )
+    index = FileIndex()
+    for indir in indirs:
+        finder.find_index(indir, excludes=excludes, index=index)
+    return index
+
+
+def read_line_count(file_path, chunk_size=1024 * 1024):
+    """
+    顺序读取文件一次，同时判断是否为二进制文件、识别 shebang 并统计原始行数。
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 分块读取的大小
+
+    Returns:
+        (是否疑似二进制, shebang 语言, 行数)；无法读取时视为二进制
+    """
+    try:
+        with open(file_path, 'rb') as fp:
+            head = fp.read(2048)
+            if b'\x00' in head:
+                return True, '', 0
+            lines = head.count(b'\n')
+            last = head[-1:]
+            while True:
+                chunk = fp.read(chunk_size)
+                if not chunk:
+                    break
+                lines += chunk.count(b'\n')
+                last = chunk[-1:]
+    except OSError:
+        return True, '', 0
+    if last and last != b'\n':
+        lines += 1
+    return False, detect_shebang_language(head), lines
+
+
+def count_code_tree(root, finder, excludes=None, known=None, should_stop=None, on_dir=None, on_file=None):
+    """
+    自底向上统计目录树中代码文件的数量与原始行数（跳过规则与 CodeFinder.iter_entries 相同）。
+
+    Args:
+        root: 目录路径
+        finder: CodeFinder（提供后缀规则与跳过的目录名/文件名）
+        excludes: 排除路径列表（绝对路径）
+        known: {目录: (文件数, 行数)}；已统计的子目录直接复用，新统计完成的目录也会写入
+        should_stop: 可选回调，返回 True 时中止
+        on_dir: 可选回调 on_dir(目录, 文件数, 行数)，每个目录统计完成时调用（子目录先于父目录）
+        on_file: 可选回调 on_file(文件路径, 行数)，每个代码文件统计完成时调用
+
+    Returns:
+        (文件数, 行数)；中止时返回 None（已完成的子目录仍保留在 known 中）
+    """
+    known = known if known is not None else {}
+
+    def walk(directory):
+        cached = known.get(directory)
+        if cached is not None:
+            return cached
+        files = lines = 0
+        try:
+            entries = list(scandir(directory))
+        except OSError:
+            entries = []
+        for entry in entries:
+            if should_stop and should_stop():
+                return None
+            name = entry.name
+            if finder.is_hidden_file(name):
+                continue
+            path = abspath(entry.path)
+            if finder.should_be_excluded(path, excludes):
+                continue
+            if entry.is_dir():
+                if name in finder.skip_dir_names:
+                    continue
+                result = walk(path)
+                if result is None:
+                    return None
+                files += result[0]
+                lines += result[1]
+            elif entry.is_file():
+                if name in finder.skip_file_names:
+                    continue
+                # 后缀不匹配且不可能按 shebang 收录的文件无需读取
+                if finder.classify(name) is None and ('.' in name or not finder.rules.languages):
+                    continue
+                is_binary, shebang, count = read_line_count(path)
+                if is_binary or finder.classify(name, shebang) is None:
+                    continue
+                files += 1
+                lines += count
+                if on_file:
+                    on_file(path, count)
+        known[directory] = (files, lines)
+        if on_dir:
+            on_dir(directory, files, lines)
+        return files, lines
+
+    return walk(abspath(root))
+
+
+def iter_file_extension_stats(indirs, excludes, skip_dir_names=None, skip_file_names=None, should_stop=None):
+    """
+    逐个目录扫描非二进制文件的后缀，边遍历边产出每个目录内各后缀的文件数与字节数。
 
     Args:
         indirs: 源码目录列表
         excludes: 排除路径列表（绝对路径）
         skip_dir_names: 跳过目录名列表
         skip_file_names: 跳过文件名列表
+        should_stop: 可选回调，返回 True 时提前结束扫描
 
-    Returns:
-        排序后的后缀列表
+    Yields:
+        (目录, {后缀: (文件数, 字节数)})；目录内没有带后缀的文件时为空 dict
     """
-    extensions = set()
     skip_dir_names = set(skip_dir_names or [])
     skip_file_names = set(skip_file_names or [])
     for indir in indirs:
         for root, dirs, files in os.walk(indir):
+            if should_stop and should_stop():
+                return
             root_path = abspath(root)
             if CodeFinder.should_be_excluded(root_path, excludes):
                 dirs[:] = []
                 continue
             dirs[:] = [d for d in dirs if not d.startswith('.') and d not in skip_dir_names]
+            counts = {}
             for name in files:
                 if name.startswith('.'):
                     continue
                 if name in skip_file_names:
                     continue
+                ext = os.path.splitext(name)[1].lower().lstrip('.')
+                if not ext:
+                    continue
                 file_path = abspath(os.path.join(root, name))
                 if CodeFinder.should_be_excluded(file_path, excludes):
                     continue
                 if is_binary_file(file_path):
                     continue
-                ext = os.path.splitext(name)[1].lower().lstrip('.')
-                if ext:
-                    extensions.add(ext)
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    continue
+                file_count, total = counts.get(ext, (0, 0))
+                counts[ext] = (file_count + 1, total + size)
+            yield root_path, counts
+
+
+def collect_all_file_extensions(indirs, excludes, skip_dir_names=None, skip_file_names=None, should_stop=None):
+    """
+    扫描目录并收集出现过的文件后缀（用于 GUI 的“自动识别后缀”）。
+
+    Args:
+        indirs: 源码目录列表
+        excludes: 排除路径列表（绝对路径）
+        skip_dir_names: 跳过目录名列表
+        skip_file_names: 跳过文件名列表
+        should_stop: 可选回调，返回 True 时提前结束扫描
+
+    Returns:
+        排序后的后缀列表
+    """
+    extensions = set()
+    for _, counts in iter_file_extension_stats(indirs, excludes, skip_dir_names, skip_file_names, should_stop):
+        extensions.update(counts)
     return sorted(extensions)
 
 
+def parse_page_setup(document_xml):
+    """
+    从 word/document.xml 中读取正文最后一节的页面尺寸与页边距。
+
+    Args:
+        document_xml: document.xml 的 bytes；为空或无法解析时返回默认值
+
+    Returns:
+        ((页宽, 页高), (上, 右, 下, 左))，单位为磅
+    """
+    if not document_xml:
+        return DEFAULT_PAGE_SIZE, DEFAULT_PAGE_MARGINS
+    from xml.etree import ElementTree
+    try:
+        root = ElementTree.fromstring(document_xml)
+    except ElementTree.ParseError:
+        return DEFAULT_PAGE_SIZE, DEFAULT_PAGE_MARGINS
+    sections = root.findall('.//{%s}sectPr' % WORD_NAMESPACE)
+    if not sections:
+        return DEFAULT_PAGE_SIZE, DEFAULT_PAGE_MARGINS
+    section = sections[-1]
+
+    def twips(element, name, default):
+        if element is None:
+            return default
+        value = element.get('{%s}%s' % (WORD_NAMESPACE, name))
+        try:
+            return int(value) / 20.0
+        except (TypeError, ValueError):
+            return default
+
+    size = section.find('{%s}pgSz' % WORD_NAMESPACE)
+    margin = section.find('{%s}pgMar' % WORD_NAMESPACE)
+    page_size = (
+        twips(size, 'w', DEFAULT_PAGE_SIZE[0]),
+        twips(size, 'h', DEFAULT_PAGE_SIZE[1])
+    )
+    margins = tuple(
+        twips(margin, name, default)
+        for name, default in zip(('top', 'right', 'bottom', 'left'), DEFAULT_PAGE_MARGINS)
+    )
+    return page_size, margins
+
+
+def read_template_page_setup(template_path):
+    """
+    读取 docx 模板正文最后一节的页面尺寸与页边距（不依赖 python-docx，经 load_template 缓存）。
+
+    Args:
+        template_path: 模板文件路径；为空则返回默认值（与 python-docx 默认模板一致）
+
+    Returns:
+        ((页宽, 页高), (上, 右, 下, 左))，单位为磅
+    """
+    if not template_path:
+        return DEFAULT_PAGE_SIZE, DEFAULT_PAGE_MARGINS
+    import zipfile
+    try:
+        template = load_template(template_path)
+    except (OSError, zipfile.BadZipFile):
+        return DEFAULT_PAGE_SIZE, DEFAULT_PAGE_MARGINS
+    return template.page_size, template.margins
+
+
+class CharWidthTable(dict):
+    """
+    字符宽度缓存表（磅），首次查询某字符时按东亚宽度计算并缓存。
+    """
+    def __init__(self, font_size):
+        super().__init__()
+        self.font_size = font_size
+
+    def __missing__(self, char):
+        import unicodedata
+        if unicodedata.combining(char):
+            width = 0.0
+        elif unicodedata.east_asian_width(char) in ('W', 'F'):
+            width = self.font_size
+        else:
+            width = self.font_size / 2.0
+        self[char] = width
+        return width
+
+
+class PageLayout(object):
+    """
+    页面与排版参数，用于估算每一行在 Word 中折行后占用的行数。
+
+    字符宽度按东亚宽度近似：全角/宽字符占 1 个字号宽，其余占半个字号宽，
+    组合字符不占宽度，制表符跳到下一个默认制表位。
+    """
+    def __init__(
+            self, font_size=10.5, line_spacing=10.5,
+            space_before=0.0, space_after=2.3,
+            page_size=DEFAULT_PAGE_SIZE, margins=DEFAULT_PAGE_MARGINS
+    ):
+        self.font_size = font_size
+        self.line_spacing = line_spacing
+        self.space_before = space_before
+        self.space_after = space_after
+        self.page_size = tuple(page_size)
+        self.margins = tuple(margins)
+        top, right, bottom, left = self.margins
+        self.body_width = max(1.0, self.page_size[0] - left - right)
+        self.body_height = max(1.0, self.page_size[1] - top - bottom)
+        self._char_widths = CharWidthTable(font_size)
+
+    @classmethod
+    def from_template(cls, template_path, **kwargs):
+        """
+        使用模板的页面尺寸与页边距创建布局。
+        """
+        page_size, margins = read_template_page_setup(template_path)
+        return cls(page_size=page_size, margins=margins, **kwargs)
+
+    def char_width(self, char):
+        """
+        单个字符的网格宽度（磅）。
+        """
+        return self._char_widths[char]
+
+    def text_width(self, line):
+        """
+        估算一行文本的排版宽度（磅）。
+        """
+        if '\t' not in line:
+            if line.isascii():
+                return len(line) * self.font_size / 2.0
+            return sum(map(self._char_widths.__getitem__, line))
+        width = 0.0
+        for char in line:
+            if char == '\t':
+                width = (int(width // DEFAULT_TAB_STOP) + 1) * DEFAULT_TAB_STOP
+            else:
+                width += self._char_widths[char]
+        return width
+
+    def wrapped_lines(self, line):
+        """
+        估算一行文本折行后占用的行数（空行也占 1 行）。
+        """
+        width = self.text_width(line.rstrip())
+        if width <= self.body_width:
+            return 1
+        return int(-(-width // self.body_width))
+
+
+class PageCounter(object):
+    """
+    按段落顺序模拟分页：段落可以跨页拆分，页底的段后间距允许被截断。
+    """
+    def __init__(self, layout):
+        self.layout = layout
+        self.full_pages = 0
+        self.used = 0.0
+
+    def add(self, wrapped_lines):
+        """
+        追加一个占用 wrapped_lines 行的段落。
+        """
+        layout = self.layout
+        remaining = wrapped_lines
+        before = layout.space_before
+        while True:
+            available = layout.body_height - self.used - before
+            fit = int(available // layout.line_spacing) if layout.line_spacing > 0 else remaining
+            if fit >= remaining:
+                self.used += before + remaining * layout.line_spacing + layout.space_after
+                return self
+            if fit > 0:
+                remaining -= fit
+                before = 0.0
+            elif self.used == 0.0:
+                self.used += before + remaining * layout.line_spacing + layout.space_after
+                return self
+            self.full_pages += 1
+            self.used = 0.0
+
+    def extend(self, wraps):
+        for wrapped_lines in wraps:
+            self.add(wrapped_lines)
+        return self
+
+    @property
+    def pages(self):
+        """
+        页数（最后一页不满也计为 1 页）。
+        """
+        return self.full_pages + (1 if self.used > 0 else 0)
+
+    @property
+    def fractional_pages(self):
+        """
+        以小数表示的页数，便于比较不同后缀/目录的占比。
+        """
+        return self.full_pages + min(1.0, self.used / self.layout.body_height)
+
+
+def estimate_pages(lines, layout=None):
+    """
+    估算过滤后的行在文档中占用的页数（考虑长行折行与中英文字符宽度）。
+
+    Args:
+        lines: 过滤后的行列表（每行对应一个段落）
+        layout: PageLayout；为空使用默认排版参数与页面
+
+    Returns:
+        页数
+    """
+    layout = layout if layout else PageLayout()
+    counter = PageCounter(layout)
+    for line in lines:
+        counter.add(layout.wrapped_lines(line))
+    return counter.pages
+
+
+def measure_file(args):
+    """
+    统计单个文件的原始行数、过滤后行数与字节数（供进程池调用）。
+
+    Args:
+        args: (file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, layout, size, language)；
+            size 为扫描时记录的文件大小，未知（-1）时重新获取；
+            language 为扫描时识别的语言，为 None 时按文件名与内容识别
+
+    Returns:
+        dict：path、language、bytes、raw_lines、lines；
+        提供 layout 时额外包含 wraps（每行折行后的行数，bytes 形式以减少进程间传输）
+    """
+    file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, layout, size, language = args
+    content = decode_content(file, encoding)
+    if language is None:
+        language = detect_language(file, content)
+    lines = filter_lines(content, language, skip_blank_lines, skip_comment_lines, comment_chars)
+    if size < 0:
+        try:
+            size = os.path.getsize(file)
+        except OSError:
+            size = 0
+    item = {
+        'path': file,
+        'language': language,
+        'bytes': size,
+        'raw_lines': count_lines(content),
+        'lines': len(lines)
+    }
+    if layout:
+        item['wraps'] = bytes(min(255, layout.wrapped_lines(line)) for line in lines)
+    return item
+
+
+def measure_files(tasks, jobs=None):
+    """
+    对多个文件执行 measure_file，文件较多时在进程池中并行。
+
+    Args:
+        tasks: measure_file 的参数元组列表
+        jobs: 进程数；为空使用 CPU 核数，<= 1 时在当前进程串行执行
+
+    Returns:
+        与 tasks 顺序一致的结果列表
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(tasks) > jobs:
+        from concurrent.futures import ProcessPoolExecutor
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(measure_file, tasks, chunksize=chunksize))
+    return [measure_file(task) for task in tasks]
+
+
+def _new_stats_bucket():
+    return {'files': 0, 'bytes': 0, 'raw_lines': 0, 'lines': 0, 'pages': 0.0}
+
+
+def _add_to_bucket(bucket, item):
+    bucket['files'] += 1
+    bucket['bytes'] += item['bytes']
+    bucket['raw_lines'] += item['raw_lines']
+    bucket['lines'] += item['lines']
+
+
+def _stats_key(rules, name, language):
+    """
+    统计分组：文件匹配到的规则（如 'py'、'd.ts'、'=dockerfile'）；
+    仅因 shebang 被收录的无后缀脚本按语言分组（如 '#!python'）。
+    """
+    rule = rules.match(name)
+    if rule is not None:
+        return rule
+    return '#!' + language if language else ''
+
+
+def source_order_key(relative):
+    """
+    文件在文档中的排序键：每层目录中先排直接文件、再排子目录，各自按名称排序，与 CodeFinder 的遍历顺序一致。
+
+    Args:
+        relative: 相对源码目录的路径，以 '/' 或 os.sep 分隔
+
+    Returns:
+        可比较的元组
+    """
+    parts = relative.replace(os.sep, '/').split('/')
+    return tuple((True, part) for part in parts[:-1]) + ((False, parts[-1]),)
+
+
+def _entry_order_key(entry):
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False
+    return is_dir, entry.name
+
+
+def _top_level_dir(file, indir):
+    relative = os.path.relpath(file, indir)
+    parts = relative.split(os.sep)
+    if len(parts) > 1:
+        return os.path.join(indir, parts[0])
+    return indir
+
+
+def collect_code_stats(
+        indirs, exts, comment_chars=None, excludes=None,
+        skip_blank_lines=True, skip_comment_lines=True,
+        encoding='utf-8', skip_dir_names=None, skip_file_names=None,
+        font_size=10.5, line_spacing=10.5, space_before=0.0, space_after=2.3,
+        template_path=None, outfile=None, jobs=None, should_stop=None
+):
+    """
+    仅统计（不生成 docx）：按文件规则、顶层目录与文件汇总原始/过滤后行数、字节数与估算页数。
+
+    by_ext 按文件匹配到的规则分组（见 _stats_key），与扫描时的收录规则一致：复合后缀（d.ts）与
+    完整文件名规则（=Dockerfile）各自一组，无后缀的 shebang 脚本按语言分组。
+
+    与 generate_code_doc 使用相同的扫描与过滤流程，文件的读取与过滤在进程池中并行执行。
+
+    Args:
+        indirs/exts/comment_chars/excludes: 同 generate_code_doc
+        skip_blank_lines/skip_comment_lines/encoding: 同 generate_code_doc
+        skip_dir_names/skip_file_names: 跳过目录名/文件名列表
+        font_size/line_spacing/space_before/space_after: 用于估算页数的排版参数
+        template_path: 模板路径，用于读取页面尺寸与页边距
+        outfile: 输出文件；若在源码目录内会被排除，与生成时保持一致
+        jobs: 并行进程数；为空使用 CPU 核数，<= 1 时串行执行
+        should_stop: 可选回调，返回 True 时提前结束扫描
+
+    Returns:
+        dict：file_count、totals（含 page_count）、by_ext、by_dir、files、layout
+    """
+    indirs = [abspath(indir) for indir in (indirs or DEFAULT_INDIRS)]
+    exts = normalize_exts(exts) if exts else DEFAULT_EXTS
+    comment_chars = comment_chars or DEFAULT_COMMENT_CHARS
+    excludes = normalize_paths(excludes)
+    if outfile:
+        excludes = normalize_paths(excludes + [outfile])
+    skip_dir_names = skip_dir_names or DEFAULT_SKIP_DIRS
+    skip_file_names = skip_file_names or DEFAULT_SKIP_FILES
+    layout = PageLayout.from_template(
+        template_path,
+        font_size=font_size,
+        line_spacing=line_spacing,
+        space_before=space_before,
+        space_after=space_after
+    )
+    finder = CodeFinder(
+        exts, skip_dir_names=skip_dir_names,
+        skip_file_names=skip_file_names, should_stop=should_stop
+    )
+    index = FileIndex()
+    owners = []
+    for indir in indirs:
+        start = len(index)
+        finder.find_index(indir, excludes=excludes, index=index)
+        owners.extend([indir] * (len(index) - start))
+    comment_chars = tuple(comment_chars)
+    tasks = [
+        (
+            index.path(i), encoding, skip_blank_lines, skip_comment_lines, comment_chars, layout,
+            index.sizes[i], index.language(i)
+        )
+        for i in range(len(index))
+    ]
+    items = measure_files(tasks, jobs)
+    totals = _new_stats_bucket()
+    by_ext = {}
+    by_dir = {}
+    counters = {id(totals): PageCounter(layout)}
+    for i, (item, indir) in enumerate(zip(items, owners)):
+        item['ext'] = _stats_key(finder.rules, index.name(i), item['language'])
+        ext_bucket = by_ext.get(item['ext'])
+        if ext_bucket is None:
+            ext_bucket = _new_stats_bucket()
+            ext_bucket['language'] = item['language']
+            by_ext[item['ext']] = ext_bucket
+        dir_key = _top_level_dir(item['path'], indir)
+        dir_bucket = by_dir.get(dir_key)
+        if dir_bucket is None:
+            dir_bucket = by_dir[dir_key] = _new_stats_bucket()
+        wraps = item.pop('wraps')
+        for bucket in (totals, ext_bucket, dir_bucket):
+            _add_to_bucket(bucket, item)
+            counter = counters.get(id(bucket))
+            if counter is None:
+                counter = counters[id(bucket)] = PageCounter(layout)
+            counter.extend(wraps)
+    for bucket in [totals] + list(by_ext.values()) + list(by_dir.values()):
+        bucket['pages'] = round(counters[id(bucket)].fractional_pages, 1) if id(bucket) in counters else 0.0
+    totals['page_count'] = counters[id(totals)].pages
+    return {
+        'file_count': len(items),
+        'totals': totals,
+        'by_ext': by_ext,
+        'by_dir': by_dir,
+        'files': items,
+        'layout': {
+            'page_size': list(layout.page_size),
+            'margins': list(layout.margins),
+            'body_width': layout.body_width,
+            'body_height': layout.body_height
+        }
+    }
+
+
+def format_stats_table(stats):
+    """
+    将 collect_code_stats 的结果格式化为对齐的文本表格。
+
+    Args:
+        stats: collect_code_stats 的返回值
+
+    Returns:
+        文本行列表
+    """
+    header = ('files', 'raw_lines', 'lines', 'bytes', 'pages')
+
+    def row(name, bucket):
+        return '{:<40} {:>7} {:>10} {:>10} {:>12} {:>8}'.format(
+            name, bucket['files'], bucket['raw_lines'], bucket['lines'], bucket['bytes'], bucket['pages']
+        )
+
+    title = '{:<40} {:>7} {:>10} {:>10} {:>12} {:>8}'
+    lines = [title.format('extension', *header)]
+    for ext in sorted(stats['by_ext'], key=lambda key: -stats['by_ext'][key]['lines']):
+        bucket = stats['by_ext'][ext]
+        name = '{} ({})'.format(ext, bucket['language']) if bucket['language'] else ext
+        lines.append(row(name, bucket))
+    lines.append('')
+    lines.append(title.format('directory', *header))
+    for directory in sorted(stats['by_dir'], key=lambda key: -stats['by_dir'][key]['lines']):
+        lines.append(row(directory, stats['by_dir'][directory]))
+    lines.append('')
+    lines.append(row('total', stats['totals']))
+    return lines
+
+
+class GenerationCache(object):
+    """
+    长驻进程（服务模式、GUI 会话）复用的缓存，线程安全。
+
+    - 文件索引：按扫描参数缓存 collect_code_files 的结果，并记录扫描过的目录修改时间，
+      以及按内容判断是否收录的文件（二进制检测、shebang）的大小与修改时间；
+      目录有增删改名或这些文件被原地修改时整体重新扫描
+    - 过滤后的行：按（路径、编码、过滤参数）缓存，以文件 mtime/size 校验，按总行数 LRU 淘汰
+    """
+    def __init__(self, max_lines=2000000):
+        """
+        Args:
+            max_lines: 过滤结果缓存的最大总行数
+        """
+        import threading
+        from collections import OrderedDict
+        self.max_lines = max_lines
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._lines = OrderedDict()
+        self._line_total = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _dir_stamps(dirs):
+        stamps = {}
+        for directory in dirs:
+            try:
+                stamps[directory] = os.stat(directory).st_mtime_ns
+            except OSError:
+                stamps[directory] = None
+        return stamps
+
+    @staticmethod
+    def _file_stamps(files):
+        stamps = {}
+        for file in files:
+            try:
+                stat = os.stat(file)
+                stamps[file] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                stamps[file] = None
+        return stamps
+
+    def collect_code_files(self, indirs, exts, excludes, skip_dir_names=None, skip_file_names=None, should_stop=None):
+        """
+        与 collect_code_files 相同，但在目录未变化时直接返回缓存的文件列表。
+
+        should_stop 返回 True 时提前结束扫描，不完整的结果不写入缓存。
+        """
+        key = (
+            tuple(indirs), tuple(exts), tuple(excludes or []),
+            tuple(skip_dir_names or []), tuple(skip_file_names or [])
+        )
+        with self._lock:
+            entry = self._indexes.get(key)
+        if entry and self._dir_stamps(entry[0]) == entry[0] and self._file_stamps(entry[1]) == entry[1]:
+            return list(entry[2])
+        finder = CodeFinder(
+            exts, skip_dir_names=skip_dir_names,
+            skip_file_names=skip_file_names, should_stop=should_stop
+        )
+        finder.visited_dirs = []
+        finder.sniffed_files = []
+        files = []
+        for indir in indirs:
+            files.extend(finder.find(indir, excludes=excludes))
+        if should_stop and should_stop():
+            return files
+        with self._lock:
+            self._indexes[key] = (self._dir_stamps(finder.visited_dirs), dict(finder.sniffed_files), files)
+        return list(files)
+
+    def read_code_lines(self, file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, profiler=None):
+        """
+        与 read_code_lines 相同，但文件未修改时复用上次的过滤结果。
+        """
+        key = (file, encoding, skip_blank_lines, skip_comment_lines, tuple(comment_chars))
+        try:
+            stat = os.stat(file)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        with self._lock:
+            entry = self._lines.get(key)
+            if entry and entry[0] == stamp:
+                self._lines.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2], entry[3]
+            self.misses += 1
+        lines, chars, raw_lines = read_code_lines(
+            file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, profiler
+        )
+        with self._lock:
+            previous = self._lines.pop(key, None)
+            if previous:
+                self._line_total -= len(previous[1])
+            self._lines[key] = (stamp, lines, chars, raw_lines)
+            self._line_total += len(lines)
+            while self._line_total > self.max_lines and len(self._lines) > 1:
+                _, evicted = self._lines.popitem(last=False)
+                self._line_total -= len(evicted[1])
+        return lines, chars, raw_lines
+
+    def info(self):
+        """
+        Returns:
+            dict：缓存的索引数、文件数、总行数与命中统计
+        """
+        with self._lock:
+            return {
+                'indexes': len(self._indexes),
+                'files': len(self._lines),
+                'lines': self._line_total,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+class CodeDocPipeline(object):
+    """
+    可复用的源码文档生成流水线，依次执行：
+
+        discover：扫描源码目录得到文件列表
+        decode：读取并解码单个文件
+        filter：过滤空行/注释
+        render：由 writer（CodeWriter 或 PdfCodeWriter）排版写入
+        save：保存文档
+
+    规范化后的参数、缓存与模板在多次 run 之间复用，适合 GUI、服务等长驻进程。
+    use_git/git_revision 为真时改用 git_source.GitSource 扫描（及按版本读取）文件。
+    reproducible 为真时相同输入生成逐字节相同的 docx；skip_unchanged 为真时先计算输入摘要，
+    与已有输出记录的摘要一致则跳过生成（见 input_digest）。
+    各阶段可通过构造参数替换（签名与同名方法一致），也可继承后重写对应方法：
+
+        discoverer(indirs, excludes, should_stop) -> 文件列表
+        decoder(file) -> 文本
+        line_filter(content, file) -> 行列表
+        writer_factory(pipeline, outfile, output_format, profiler) -> writer
+    """
+    def __init__(
+            self, exts=None, comment_chars=None,
+            font_name='宋体', font_size=10.5, space_before=0.0,
+            space_after=2.3, line_spacing=10.5, template_path=None,
+            skip_blank_lines=True, skip_comment_lines=True,
+            encoding='utf-8', skip_dir_names=None, skip_file_names=None,
+            output_format=None, font_file=None, cache=None,
+            line_numbers=False, line_number_start=1,
+            line_number_restart='page', compression=None,
+            use_git=False, git_revision=None,
+            reproducible=False, skip_unchanged=False,
+            discoverer=None, decoder=None, line_filter=None, writer_factory=None
+    ):
+        self.exts = normalize_exts(exts) if exts else DEFAULT_EXTS
+        self.comment_chars = comment_chars if comment_chars else DEFAULT_COMMENT_CHARS
+        self.font_name = font_name
+        self.font_size = font_size
+        self.space_before = space_before
+        self.space_after = space_after
+        self.line_spacing = line_spacing
+        self.template_path = template_path
+        self.skip_blank_lines = skip_blank_lines
+        self.skip_comment_lines = skip_comment_lines
+        self.encoding = encoding
+        self.skip_dir_names = skip_dir_names if skip_dir_names else DEFAULT_SKIP_DIRS
+        self.skip_file_names = skip_file_names if skip_file_names else DEFAULT_SKIP_FILES
+        self.output_format = output_format
+        self.font_file = font_file
+        self.cache = cache
+        self.line_numbers = line_numbers
+        self.line_number_start = line_number_start
+        self.line_number_restart = line_number_restart
+        self.compression = compression
+        self.reproducible = reproducible
+        self.skip_unchanged = skip_unchanged
+        self.git_source = None
+        if use_git or git_revision:
+            from git_source import GitSource
+            self.git_source = GitSource(
+                self.exts, self.skip_dir_names, self.skip_file_names,
+                revision=git_revision, encoding=encoding
+            )
+            discoverer = discoverer if discoverer else self.git_source.discover
+            if git_revision and not decoder:
+                decoder = self.git_source.decode
+        self.discoverer = discoverer
+        self.decoder = decoder
+        self.line_filter = line_filter
+        self.writer_factory = writer_factory
+
+    def discover(self, indirs, excludes, should_stop=None):
+        """
+        扫描阶段：返回待写入的文件列表（绝对路径）。
+        """
+        if self.discoverer:
+            return self.discoverer(indirs, excludes, should_stop)
+        if self.cache:
+            return self.cache.collect_code_files(
+                indirs, self.exts, excludes, self.skip_dir_names,
+                self.skip_file_names, should_stop=should_stop
+            )
+        return collect_code_files(
+            indirs, self.exts, excludes, self.skip_dir_names,
+            self.skip_file_names, should_stop=should_stop
+        )
+
+    def decode(self, file):
+        """
+        解码阶段：读取单个文件的文本内容。
+        """
+        if self.decoder:
+            return self.decoder(file)
+        return decode_content(file, self.encoding)
+
+    def filter(self, content, file):
+        """
+        过滤阶段：按语言过滤空行与注释，返回保留的行。
+        """
+        if self.line_filter:
+            return self.line_filter(content, file)
+        return filter_lines(
+            content, detect_language(file, content),
+            self.skip_blank_lines, self.skip_comment_lines, self.comment_chars
+        )
+
+    def read_lines(self, file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, profiler=None):
+        """
+        供 writer 调用的 line_reader：依次执行 decode 与 filter 阶段。
+
+        未通过构造参数替换 decode/filter 且提供了 cache 时复用 GenerationCache 的过滤结果
+        （继承重写 decode/filter 时不应再传入 cache）。
+        """
+        if self.cache and not (self.decoder or self.line_filter):
+            return self.cache.read_code_lines(
+                file, encoding, skip_blank_lines, skip_comment_lines, comment_chars, profiler
+            )
+        profiler = profiler if profiler else StageProfiler()
+        with profiler.stage('decode'):
+            content = self.decode(file)
+        with profiler.stage('filter'):
+            lines = self.filter(content, file)
+        return lines, len(content), count_lines(content)
+
+    def resolve_output_format(self, outfile):
+        """
+        确定输出格式：优先使用构造参数，否则按 outfile 后缀判断，输出到流时为 docx。
+        """
+        if self.output_format:
+            return self.output_format
+        if not hasattr(outfile, 'write') and str(outfile).lower().endswith('.pdf'):
+            return 'pdf'
+        return 'docx'
+
+    def create_writer(self, outfile, output_format, profiler):
+        """
+        渲染阶段的准备：创建 writer。
+        """
+        if self.writer_factory:
+            return self.writer_factory(self, outfile, output_format, profiler)
+        options = {
+            'command_chars': self.comment_chars,
+            'font_name': self.font_name,
+            'font_size': self.font_size,
+            'space_before': self.space_before,
+            'space_after': self.space_after,
+            'line_spacing': self.line_spacing,
+            'template_path': self.template_path,
+            'skip_blank_lines': self.skip_blank_lines,
+            'skip_comment_lines': self.skip_comment_lines,
+            'encoding': self.encoding,
+            'profiler': profiler,
+            'line_reader': self.read_lines
+        }
+        if output_format == 'pdf':
+            from pdf_writer import PdfCodeWriter
+            if self.line_numbers:
+                logger.warning('PDF 输出暂不支持行号，已忽略行号设置')
+            return PdfCodeWriter(
+                font_file=self.font_file,
+                outfile=None if hasattr(outfile, 'write') else outfile,
+                **options
+            )
+        writer = CodeWriter(compression=self.compression, reproducible=self.reproducible, **options)
+        if self.line_numbers:
+            writer.set_line_numbers(start=self.line_number_start, restart=self.line_number_restart)
+        return writer
+
+    def render(self, writer, title, files):
+        """
+        渲染阶段：写入页眉与各文件内容（decode/filter 由 writer 通过 read_lines 调用）。
+        """
+        writer.write_header(title)
+        for file in files:
+            writer.write_file(file)
+
+    def save(self, writer, outfile):
+        """
+        保存阶段。
+        """
+        writer.save(outfile)
+
+    def run(self, title, indirs=None, excludes=None, outfile='code.docx', profiler=None, should_stop=None):
+        """
+        执行一次完整生成。
+
+        Args:
+            title: 页眉标题
+            indirs: 源码目录列表；为空则为当前目录
+            excludes: 排除路径列表
+            outfile: 输出路径或可写的二进制流
+            profiler: StageProfiler 实例；为空则内部创建
+            should_stop: 可选回调，返回 True 时提前结束扫描，且不再写入输出
+
+        Returns:
+            dict：包含 file_count、outfile 与 stats（各阶段耗时与计数）；被取消时 cancelled 为 True
+        """
+        if profiler is None:
+            profiler = StageProfiler()
+        indirs = [abspath(indir) for indir in (indirs or DEFAULT_INDIRS)]
+        excludes = normalize_paths(excludes or [])
+        if outfile and not hasattr(outfile, 'write'):
+            excludes = normalize_paths(excludes + [outfile])
+        with profiler.stage('collect'):
+            files = self.discover(indirs, excludes, should_stop)
+        if should_stop and should_stop():
+            logger.info('生成已取消：%s', outfile)
+            return {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict(), 'cancelled': True}
+        digest, unchanged = self.check_unchanged(title, files, outfile, profiler)
+        if unchanged:
+            logger.info('输入未变化，跳过生成：%s', outfile)
+            return {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict(), 'skipped': True}
+        return self.write_files(title, files, outfile, profiler, input_digest=digest)
+
+    def input_digest(self, title, files):
+        """
+        计算输入摘要（SHA-256）：影响输出的生成参数、模板内容，以及按顺序的各文件内容与识别出的语言。
+
+        按内容而不是路径与修改时间计算，重新检出或移动目录后仍能命中；
+        注释过滤规则取决于按文件名（或 shebang）识别的语言，因此改名导致语言变化时摘要随之变化。
+
+        Returns:
+            十六进制摘要字符串
+        """
+        import hashlib
+        import json
+        settings = {
+            'version': INPUT_DIGEST_VERSION,
+            'title': title,
+            'exts': list(self.exts),
+            'comment_chars': list(self.comment_chars),
+            'font_name': self.font_name,
+            'font_size': self.font_size,
+            'space_before': self.space_before,
+            'space_after': self.space_after,
+            'line_spacing': self.line_spacing,
+            'skip_blank_lines': self.skip_blank_lines,
+            'skip_comment_lines': self.skip_comment_lines,
+            'encoding': self.encoding,
+            'line_numbers': self.line_numbers,
+            'line_number_start': self.line_number_start,
+            'line_number_restart': self.line_number_restart,
+            'compression': self.compression,
+            'reproducible': self.reproducible
+        }
+        digest = hashlib.sha256(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        if self.template_path:
+            digest.update(load_template(self.template_path).data)
+        for file in files:
+            if self.git_source and self.git_source.revision:
+                data = self.git_source.read_bytes(file)
+            elif self.decoder:
+                data = self.decode(file).encode('utf-8', 'surrogatepass')
+            else:
+                try:
+                    with open(file, 'rb') as fp:
+                        data = fp.read()
+                except OSError:
+                    data = b''
+            language = detect_language(file, data).encode('utf-8')
+            digest.update(len(language).to_bytes(2, 'little'))
+            digest.update(language)
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def check_unchanged(self, title, files, outfile, profiler):
+        """
+        skip_unchanged 时计算输入摘要，并与已有输出中记录的摘要比较。
+
+        Returns:
+            (摘要, 是否可以跳过生成)；未开启或不适用（输出到流、输出 PDF）时摘要为 None
+        """
+        if not self.skip_unchanged or not outfile or hasattr(outfile, 'write'):
+            return None, False
+        if self.resolve_output_format(outfile) != 'docx':
+            return None, False
+        with profiler.stage('hash'):
+            digest = self.input_digest(title, files)
+        return digest, read_input_digest(outfile) == digest
+
+    def write_files(self, title, files, outfile, profiler=None, input_digest=None):
+        """
+        跳过扫描阶段，将给定的文件列表渲染并保存为一个文档（分册生成时每册调用一次）。
+
+        Args:
+            input_digest: 写入 docx 的输入摘要（见 input_digest），可为空
+
+        Returns:
+            dict：包含 file_count、outfile 与 stats
+        """
+        if profiler is None:
+            profiler = StageProfiler()
+        writer = self.create_writer(outfile, self.resolve_output_format(outfile), profiler)
+        if input_digest and hasattr(writer, 'input_digest'):
+            writer.input_digest = input_digest
+        try:
+            self.render(writer, title, files)
+            self.save(writer, outfile)
+        except BaseException:
+            # 出错或被中断时删除未完成的输出（如 PDF 的 .part 临时文件）
+            if hasattr(writer, 'discard'):
+                writer.discard()
+            raise
+        return {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict()}
+
+    def close(self):
+        """
+        释放流水线持有的外部资源（如常驻的 git cat-file 进程）。
+        """
+        if self.git_source:
+            self.git_source.close()
+
+
 def generate_code_doc(
         title, indirs, exts, comment_chars,
         font_name, font_size, space_before,
         space_after, line_spacing, excludes,
         outfile, template_path=None,
         skip_blank_lines=True, skip_comment_lines=True,
-        encoding='utf-8', skip_dir_names=None, skip_file_names=None
+        encoding='utf-8', skip_dir_names=None, skip_file_names=None,
+        profiler=None, output_format=None, font_file=None,
+        cache=None, line_numbers=False, line_number_start=1,
+        line_number_restart='page', compression=None,
+        use_git=False, git_revision=None,
+        volume_by=None, volume_size=None, jobs=None,
+        parallel_render=False, reproducible=False, skip_unchanged=False
 ):
     """
-    生成 docx 源代码文档。
+    生成 docx 源代码文档（一次性使用 CodeDocPipeline；长驻进程可直接复用 CodeDocPipeline 实例）。
 
     Args:
         title: 页眉标题
@@ -658,47 +2511,655 @@ def generate_code_doc(
         comment_chars: 注释前缀列表（language 未识别时使用）
         font_name/font_size/space_before/space_after/line_spacing: 排版参数
         excludes: 排除路径列表
-        outfile: 输出 docx 路径
-        template_path: 模板 docx 路径
+        outfile: 输出路径（.docx 或 .pdf），或可写的二进制流（如 sys.stdout.buffer）
+        template_path: 模板 docx 路径；输出 PDF 时仅使用其页面尺寸与页边距
         skip_blank_lines: 是否过滤空行
         skip_comment_lines: 是否过滤注释
         encoding: 源码文件编码；支持 'auto'
         skip_dir_names/skip_file_names: 跳过目录名/文件名列表
+        profiler: StageProfiler 实例；为空则内部创建
+        output_format: 'docx' 或 'pdf'；为空时按 outfile 后缀判断，输出到流时默认为 docx
+        font_file: 输出 PDF 时嵌入的 TrueType 字体文件；为空则按 font_name 在系统字体目录中查找
+        cache: GenerationCache 实例；长驻进程中传入以复用文件索引与过滤结果
+        line_numbers: 是否开启 Word 原生行号（仅 docx 输出）
+        line_number_start: 起始行号
+        line_number_restart: 行号重新编号方式：'page'、'section' 或 'continuous'
+        compression: docx 压缩级别：'store'、'fast'、'default' 或 'max'；为空则使用 python-docx 默认保存
+        use_git: 是否只收录 git 跟踪的文件（git ls-files）
+        git_revision: 从指定版本（分支、标签或提交）读取文件，无需检出；指定时隐含 use_git
+        volume_by: 分册方式：'pages'、'lines' 或 'dir'（见 plan_volumes）；为空则输出单个文档
+        volume_size: 按页数/行数分册时每册的上限
+        jobs: 分册或并行生成正文时的进程数；为空使用 CPU 核数
+        parallel_render: 是否由多个进程并行生成正文段落后拼接（见 generate_parallel_body，仅 docx 输出）
+        reproducible: 是否生成可复现的 docx（固定时间戳、部件顺序与核心属性，相同输入逐字节相同）
+        skip_unchanged: 输入摘要与已有输出记录的一致时跳过生成，返回值中 skipped 为 True（仅输出到 docx 文件时）
 
     Returns:
-        dict：包含 file_count 与 outfile
+        dict：包含 file_count、outfile 与 stats（各阶段耗时与计数）；分册时另含 volumes
+    """
+    options = {
+        'exts': exts,
+        'comment_chars': comment_chars,
+        'font_name': font_name,
+        'font_size': font_size,
+        'space_before': space_before,
+        'space_after': space_after,
+        'line_spacing': line_spacing,
+        'template_path': template_path,
+        'skip_blank_lines': skip_blank_lines,
+        'skip_comment_lines': skip_comment_lines,
+        'encoding': encoding,
+        'skip_dir_names': skip_dir_names,
+        'skip_file_names': skip_file_names,
+        'output_format': output_format,
+        'font_file': font_file,
+        'line_numbers': line_numbers,
+        'line_number_start': line_number_start,
+        'line_number_restart': line_number_restart,
+        'compression': compression,
+        'use_git': use_git,
+        'git_revision': git_revision,
+        'reproducible': reproducible,
+        'skip_unchanged': skip_unchanged
+    }
+    pipeline = CodeDocPipeline(cache=cache, **options)
+    try:
+        if volume_by:
+            return generate_volumes(
+                options, title, indirs, excludes, outfile, volume_by,
+                volume_size=volume_size, jobs=jobs, profiler=profiler, pipeline=pipeline
+            )
+        if parallel_render:
+            return generate_parallel_body(
+                options, title, indirs, excludes, outfile,
+                jobs=jobs, profiler=profiler, pipeline=pipeline
+            )
+        return pipeline.run(title, indirs, excludes, outfile, profiler=profiler)
+    finally:
+        pipeline.close()
+
+
+BATCH_JOB_DEFAULTS = {
+    'title': '软件著作权程序鉴别材料生成器V1.0',
+    'indirs': DEFAULT_INDIRS,
+    'exts': DEFAULT_EXTS,
+    'comment_chars': None,
+    'font_name': '宋体',
+    'font_size': 10.5,
+    'space_before': 0.0,
+    'space_after': 2.3,
+    'line_spacing': 10.5,
+    'excludes': [],
+    'outfile': 'code.docx'
+}
+BATCH_PATH_KEYS = ('outfile', 'template_path', 'font_file')
+BATCH_PATH_LIST_KEYS = ('indirs', 'excludes')
+
+
+def load_batch_manifest(manifest_path):
     """
-    if not indirs:
-        indirs = DEFAULT_INDIRS
-    if not exts:
-        exts = DEFAULT_EXTS
+    读取批量生成清单（JSON 或 TOML），返回合并默认值后的任务列表。
+
+    清单格式：
+        - JSON：{"defaults": {...}, "jobs": [{...}, ...]}，或直接为任务数组
+        - TOML：[defaults] 表与 [[jobs]] 数组表
+    每个任务的键与 generate_code_doc 的参数一致，另可包含 name；
+    未指定 outfile 的任务输出到“<name>.docx”，没有 name 时为“code-<序号>.docx”；
+    相对路径按清单文件所在目录解析，多个任务的输出文件相同时视为清单错误（并行执行时会互相覆盖）。
+
+    Args:
+        manifest_path: 清单文件路径
+
+    Returns:
+        任务配置列表（dict，可直接传给 run_batch）
+
+    Raises:
+        ValueError: 清单格式不正确，或多个任务的输出文件相同
+    """
+    base_dir = os.path.dirname(abspath(manifest_path))
+    if manifest_path.lower().endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError as exc:
+            raise RuntimeError('读取TOML清单需要Python 3.11及以上版本') from exc
+        with open(manifest_path, 'rb') as fp:
+            manifest = tomllib.load(fp)
     else:
-        exts = normalize_exts(exts)
-    if not comment_chars:
-        comment_chars = DEFAULT_COMMENT_CHARS
-    indirs = [abspath(indir) for indir in indirs]
-    excludes = normalize_paths(excludes)
-    if outfile:
-        excludes = normalize_paths(excludes + [outfile])
-    if not skip_dir_names:
-        skip_dir_names = DEFAULT_SKIP_DIRS
-    if not skip_file_names:
-        skip_file_names = DEFAULT_SKIP_FILES
-    files = collect_code_files(indirs, exts, excludes, skip_dir_names, skip_file_names)
-    writer = CodeWriter(
-        command_chars=comment_chars,
-        font_name=font_name,
-        font_size=font_size,
-        space_before=space_before,
-        space_after=space_after,
-        line_spacing=line_spacing,
-        template_path=template_path,
-        skip_blank_lines=skip_blank_lines,
-        skip_comment_lines=skip_comment_lines,
-        encoding=encoding
-    )
-    writer.write_header(title)
+        import json
+        with codecs.open(manifest_path, encoding='utf-8') as fp:
+            manifest = json.load(fp)
+    if isinstance(manifest, list):
+        manifest = {'jobs': manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('jobs'), list):
+        raise ValueError('清单中缺少jobs任务列表：{}'.format(manifest_path))
+    defaults = dict(BATCH_JOB_DEFAULTS)
+    del defaults['outfile']
+    defaults.update(manifest.get('defaults') or {})
+    jobs = []
+    outfiles = {}
+    for index, item in enumerate(manifest['jobs']):
+        if not isinstance(item, dict):
+            raise ValueError('第{}个任务不是对象：{}'.format(index + 1, item))
+        job = dict(defaults)
+        job.update(item)
+        if not job.get('outfile'):
+            job['outfile'] = '{}.docx'.format(job['name']) if job.get('name') else 'code-{}.docx'.format(index + 1)
+        for key in BATCH_PATH_KEYS:
+            if job.get(key):
+                job[key] = os.path.join(base_dir, job[key])
+        for key in BATCH_PATH_LIST_KEYS:
+            if isinstance(job.get(key), str):
+                job[key] = [job[key]]
+            job[key] = [os.path.join(base_dir, path) for path in job.get(key) or []]
+        key = os.path.normcase(abspath(job['outfile']))
+        if key in outfiles:
+            raise ValueError('第{}个任务与第{}个任务的输出文件相同：{}'.format(
+                index + 1, outfiles[key] + 1, job['outfile']
+            ))
+        outfiles[key] = index
+        job.setdefault('name', os.path.splitext(os.path.basename(job['outfile']))[0])
+        jobs.append(job)
+    return jobs
+
+
+def init_batch_worker(template_paths):
+    """
+    批量生成的工作进程初始化：预编译全部注释正则并预先解析模板，供该进程内的所有任务复用。
+    """
+    for language in COMMENT_PATTERN_BY_LANG:
+        get_comment_regex(language)
+    get_comment_regex('python-block')
+    get_comment_regex('python-line')
+    for template_path in template_paths:
+        try:
+            load_template(template_path)
+        except Exception:
+            continue
+
+
+def run_batch_job(job):
+    """
+    执行单个批量任务（供进程池调用），异常会被记录在结果中而不是抛出。
+
+    Returns:
+        dict：name、ok、outfile、file_count、elapsed、stats 或 error
+    """
+    job = dict(job)
+    name = job.pop('name', '')
+    start = time.perf_counter()
+    try:
+        result = generate_code_doc(**job)
+    except Exception as exc:
+        return {
+            'name': name,
+            'ok': False,
+            'outfile': job.get('outfile'),
+            'elapsed': time.perf_counter() - start,
+            'error': str(exc)
+        }
+    result.update({'name': name, 'ok': True, 'elapsed': time.perf_counter() - start})
+    return result
+
+
+def run_batch(jobs, max_workers=None):
+    """
+    在进程池中并行执行多个生成任务。
+
+    每个工作进程启动时预编译注释正则、预读模板（见 init_batch_worker），
+    因此解释器启动、正则编译与模板读取只按进程数付出，而不是按任务数。
+
+    Args:
+        jobs: 任务配置列表（见 load_batch_manifest）
+        max_workers: 进程数；为空使用 CPU 核数，<= 1 时在当前进程串行执行
+
+    Returns:
+        与 jobs 顺序一致的结果列表（见 run_batch_job）
+    """
+    if not jobs:
+        return []
+    template_paths = sorted({job['template_path'] for job in jobs if job.get('template_path')})
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(jobs))
+    if max_workers <= 1:
+        init_batch_worker(template_paths)
+        return [run_batch_job(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=init_batch_worker,
+            initargs=(template_paths,)
+    ) as executor:
+        return list(executor.map(run_batch_job, jobs))
+
+
+VOLUME_MODES = ('pages', 'lines', 'dir')
+
+
+def volume_path(outfile, number):
+    """
+    分册的输出路径：code.docx -> code-1.docx、code-2.docx ...
+    """
+    root, ext = os.path.splitext(outfile)
+    return '{}-{}{}'.format(root, number, ext)
+
+
+def remove_stale_volumes(outfile, start):
+    """
+    删除上次生成时多出的分册（从第 start 册起连续存在的 volume_path 文件），避免与本次结果混淆。
+
+    Returns:
+        已删除的文件路径列表
+    """
+    removed = []
+    number = start
+    while os.path.isfile(volume_path(outfile, number)):
+        path = volume_path(outfile, number)
+        try:
+            os.remove(path)
+        except OSError as error:
+            logger.warning('无法删除过期的分册 %s：%s', path, error)
+            break
+        logger.info('已删除过期的分册：%s', path)
+        removed.append(path)
+        number += 1
+    return removed
+
+
+def plan_volumes(files, volume_by, volume_size=None, indirs=None, items=None, layout=None):
+    """
+    按写入顺序将文件列表切分为若干分册，同一文件不会拆到两册；依次拼接各册即为单个文档的文件顺序。
+
+    Args:
+        files: 文件列表（绝对路径，按写入顺序）
+        volume_by: 'pages'（按估算页数）、'lines'（按过滤后行数）或 'dir'（按源码目录下的顶层目录：
+            每个源码目录的直接文件为一册，每个顶层目录为一册；按源码目录顺序排列，
+            直接文件在前，顶层目录按名称排序，册内保持原有的文件顺序）
+        volume_size: 每册的页数/行数上限（'dir' 时忽略）；单个文件超过上限时独占一册
+        indirs: 源码目录列表（'dir' 时用于确定文件所属的顶层目录）
+        items: 与 files 一一对应的 measure_file 结果（'pages'/'lines' 时必需，'pages' 还需含 wraps）
+        layout: PageLayout（'pages' 时用于模拟分页）
+
+    Returns:
+        分册列表，每册为一个文件列表
+
+    Raises:
+        ValueError: 分册方式不合法或缺少上限
+    """
+    if volume_by not in VOLUME_MODES:
+        raise ValueError('不支持的分册方式：{}'.format(volume_by))
+    if volume_by == 'dir':
+        indirs = [abspath(indir) for indir in indirs or DEFAULT_INDIRS]
+        roots = sorted(indirs, key=len, reverse=True)
+        groups = {}
+        for file in files:
+            owner = next((root for root in roots if file.startswith(root + os.sep)), os.path.dirname(file))
+            group = _top_level_dir(file, owner)
+            order = indirs.index(owner) if owner in indirs else len(indirs)
+            groups.setdefault((order, group != owner, group), []).append(file)
+        return [groups[key] for key in sorted(groups)]
+    if not volume_size or volume_size < 1:
+        raise ValueError('按{}分册时需要指定每册的上限'.format('页数' if volume_by == 'pages' else '行数'))
+    volumes = []
+    current = []
+    size = 0
+    counter = PageCounter(layout) if volume_by == 'pages' else None
+    for file, item in zip(files, items):
+        if counter is not None:
+            counter.extend(item['wraps'])
+            over = counter.pages > volume_size
+        else:
+            size += item['lines']
+            over = size > volume_size
+        if over and current:
+            volumes.append(current)
+            current = []
+            if counter is not None:
+                counter = PageCounter(layout).extend(item['wraps'])
+            else:
+                size = item['lines']
+        current.append(file)
+    if current:
+        volumes.append(current)
+    return volumes
+
+
+def measure_volume_items(pipeline, files, layout=None, jobs=None):
+    """
+    为分册统计每个文件过滤后的行数（及折行数）。
+
+    未替换 decode/filter 阶段时在进程池中读取（measure_file），
+    否则（如从 git 版本读取）在当前进程中经流水线读取。
+
+    Returns:
+        与 files 对应的 dict 列表：lines，提供 layout 时还包含 wraps
+    """
+    if pipeline.decoder or pipeline.line_filter:
+        items = []
+        for file in files:
+            lines, _, _ = pipeline.read_lines(
+                file, pipeline.encoding, pipeline.skip_blank_lines,
+                pipeline.skip_comment_lines, pipeline.comment_chars
+            )
+            item = {'lines': len(lines)}
+            if layout:
+                item['wraps'] = bytes(min(255, layout.wrapped_lines(line)) for line in lines)
+            items.append(item)
+        return items
+    comment_chars = tuple(pipeline.comment_chars)
+    tasks = [
+        (
+            file, pipeline.encoding, pipeline.skip_blank_lines, pipeline.skip_comment_lines,
+            comment_chars, layout, -1, None
+        )
+        for file in files
+    ]
+    return measure_files(tasks, jobs)
+
+
+def run_volume_job(job):
+    """
+    渲染并保存单个分册（供进程池调用）；开启 skip_unchanged 时该册输入摘要未变化则跳过。
+
+    Args:
+        job: dict：options（CodeDocPipeline 参数）、title、files、outfile、indirs、excludes
+
+    Returns:
+        dict：包含 file_count、outfile 与 stats；跳过时 skipped 为 True
+    """
+    pipeline = CodeDocPipeline(**job['options'])
+    profiler = StageProfiler()
+    try:
+        if pipeline.git_source and pipeline.git_source.revision:
+            # 按版本读取需要先建立路径到 git 对象的映射
+            pipeline.discover(job['indirs'], job['excludes'])
+        digest, unchanged = pipeline.check_unchanged(job['title'], job['files'], job['outfile'], profiler)
+        if unchanged:
+            return {
+                'file_count': len(job['files']), 'outfile': job['outfile'],
+                'stats': profiler.as_dict(), 'skipped': True
+            }
+        return pipeline.write_files(job['title'], job['files'], job['outfile'], profiler, input_digest=digest)
+    finally:
+        pipeline.close()
+
+
+def generate_volumes(
+        pipeline_options, title, indirs, excludes, outfile, volume_by,
+        volume_size=None, jobs=None, profiler=None, pipeline=None
+):
+    """
+    分册生成：扫描一次后按 plan_volumes 切分，每册在独立的工作进程中渲染并保存为 code-1.docx、code-2.docx ...
+
+    Args:
+        pipeline_options: CodeDocPipeline 的构造参数（dict，需可序列化，不含 cache）
+        title: 页眉标题（各册相同）
+        indirs/excludes: 源码目录与排除路径列表
+        outfile: 输出路径（各册路径见 volume_path）
+        volume_by/volume_size: 见 plan_volumes
+        jobs: 进程数；为空使用 CPU 核数，<= 1 时在当前进程串行执行
+        profiler: StageProfiler 实例；各册的阶段耗时会累加到其中
+        pipeline: 用于扫描与统计的 CodeDocPipeline；为空则按 pipeline_options 创建
+
+    Returns:
+        dict：file_count、outfile、volumes（各册的 outfile、file_count 与 skipped）、
+        removed（见 remove_stale_volumes）与 stats；所有分册都未变化时 skipped 为 True
+
+    Raises:
+        ValueError: outfile 不是文件路径，或分册参数不合法
+    """
+    if not outfile or hasattr(outfile, 'write'):
+        raise ValueError('分册生成需要指定输出文件路径')
+    if volume_by not in VOLUME_MODES:
+        raise ValueError('不支持的分册方式：{}'.format(volume_by))
+    profiler = profiler if profiler else StageProfiler()
+    owns_pipeline = pipeline is None
+    if owns_pipeline:
+        pipeline = CodeDocPipeline(**pipeline_options)
+    try:
+        indirs = [abspath(indir) for indir in (indirs or DEFAULT_INDIRS)]
+        excludes = normalize_paths(normalize_paths(excludes or []) + [outfile])
+        with profiler.stage('collect'):
+            files = pipeline.discover(indirs, excludes)
+        items = None
+        layout = None
+        if volume_by != 'dir':
+            if volume_by == 'pages':
+                layout = PageLayout.from_template(
+                    pipeline.template_path,
+                    font_size=pipeline.font_size,
+                    line_spacing=pipeline.line_spacing,
+                    space_before=pipeline.space_before,
+                    space_after=pipeline.space_after
+                )
+            with profiler.stage('measure'):
+                items = measure_volume_items(pipeline, files, layout, jobs)
+        volumes = plan_volumes(files, volume_by, volume_size, indirs, items, layout)
+    finally:
+        if owns_pipeline:
+            pipeline.close()
+    volume_jobs = [
+        {
+            'options': pipeline_options,
+            'title': title,
+            'files': volume,
+            'outfile': volume_path(outfile, number),
+            'indirs': indirs,
+            'excludes': excludes
+        }
+        for number, volume in enumerate(volumes, 1)
+    ]
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(volume_jobs))
+    template_paths = [pipeline_options['template_path']] if pipeline_options.get('template_path') else []
+    if jobs <= 1:
+        results = [run_volume_job(job) for job in volume_jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(
+                max_workers=jobs,
+                initializer=init_batch_worker,
+                initargs=(template_paths,)
+        ) as executor:
+            results = list(executor.map(run_volume_job, volume_jobs))
+    for result in results:
+        profiler.merge(result['stats'])
+    logger.debug('共%d个文件，分为%d册.', len(files), len(results))
+    removed = remove_stale_volumes(outfile, len(results) + 1)
+    result = {
+        'file_count': len(files),
+        'outfile': outfile,
+        'volumes': [
+            {'outfile': item['outfile'], 'file_count': item['file_count'], 'skipped': bool(item.get('skipped'))}
+            for item in results
+        ],
+        'removed': removed,
+        'stats': profiler.as_dict()
+    }
+    if results and all(item.get('skipped') for item in results):
+        result['skipped'] = True
+    return result
+
+
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def xml_escape(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+class ParagraphXmlTemplate(object):
+    """
+    直接序列化代码行段落的 WordprocessingML，结构与 CodeWriter.write_file 经 python-docx 生成的段落一致：
+
+        <w:p><w:pPr><w:spacing .../></w:pPr><w:r><w:rPr><w:rFonts .../><w:sz .../></w:rPr><w:t>...</w:t></w:r></w:p>
+
+    制表符写为 <w:tab/>，XML 不允许的控制字符被丢弃（python-docx 遇到时会报错）。
+    """
+    def __init__(self, font_name='宋体', font_size=10.5, space_before=0.0, space_after=2.3, line_spacing=10.5):
+        # 取整方式与 python-docx 的 Pt(...).twips 及字号（半磅）转换一致
+        def twips(points):
+            return int(round(int(points * 12700) / 635.0))
+
+        font = '"{}"'.format(xml_escape(font_name).replace('"', '&quot;'))
+        self.prefix = (
+            '<w:p><w:pPr><w:spacing w:before="{}" w:after="{}" w:line="{}" w:lineRule="exact"/></w:pPr>'
+            '<w:r><w:rPr><w:rFonts w:ascii={} w:hAnsi={}/><w:sz w:val="{}"/></w:rPr>'
+        ).format(
+            twips(space_before), twips(space_after), twips(line_spacing),
+            font, font, int(int(font_size * 12700) / 12700.0 * 2)
+        )
+        self.suffix = '</w:r></w:p>'
+
+    @staticmethod
+    def _text(text):
+        text = xml_escape(text)
+        if text.strip() != text:
+            return '<w:t xml:space="preserve">{}</w:t>'.format(text)
+        return '<w:t>{}</w:t>'.format(text)
+
+    def render(self, line):
+        """
+        Returns:
+            单行代码对应的段落 XML（str）
+        """
+        line = XML_INVALID_CHARS.sub('', line.rstrip())
+        if '\t' not in line:
+            return self.prefix + (self._text(line) if line else '') + self.suffix
+        parts = [self._text(part) if part else '' for part in line.split('\t')]
+        return self.prefix + '<w:tab/>'.join(parts) + self.suffix
+
+
+def render_body_job(job):
+    """
+    读取一组文件并序列化为段落 XML 片段（供进程池调用）。
+
+    Args:
+        job: dict：options（CodeDocPipeline 参数）、files、indirs、excludes
+
+    Returns:
+        (UTF-8 编码的段落 XML, 该组文件的阶段统计)
+    """
+    pipeline = CodeDocPipeline(**job['options'])
+    profiler = StageProfiler()
+    try:
+        if pipeline.git_source and pipeline.git_source.revision:
+            pipeline.discover(job['indirs'], job['excludes'])
+        template = ParagraphXmlTemplate(
+            pipeline.font_name, pipeline.font_size, pipeline.space_before,
+            pipeline.space_after, pipeline.line_spacing
+        )
+        parts = []
+        for file in job['files']:
+            lines, chars, raw_lines = pipeline.read_lines(
+                file, pipeline.encoding, pipeline.skip_blank_lines,
+                pipeline.skip_comment_lines, pipeline.comment_chars, profiler
+            )
+            with profiler.stage('render'):
+                parts.extend(map(template.render, lines))
+            profiler.count('files')
+            profiler.count('chars', chars)
+            profiler.count('raw_lines', raw_lines)
+            profiler.count('lines', len(lines))
+        return ''.join(parts).encode('utf-8'), profiler.as_dict()
+    finally:
+        pipeline.close()
+
+
+def split_render_slices(files, slices):
+    """
+    将文件列表按顺序切分为不超过 slices 段，尽量使每段的文件总大小接近。
+    """
+    sizes = []
     for file in files:
-        writer.write_file(file)
-    writer.save(outfile)
-    return {'file_count': len(files), 'outfile': outfile}
+        try:
+            sizes.append(max(1, os.path.getsize(file)))
+        except OSError:
+            sizes.append(1)
+    target = sum(sizes) / float(max(1, slices))
+    result = []
+    current = []
+    size = 0
+    for file, file_size in zip(files, sizes):
+        current.append(file)
+        size += file_size
+        if size >= target and len(result) < slices - 1:
+            result.append(current)
+            current = []
+            size = 0
+    if current:
+        result.append(current)
+    return result
+
+
+def generate_parallel_body(
+        pipeline_options, title, indirs, excludes, outfile,
+        jobs=None, profiler=None, pipeline=None
+):
+    """
+    多进程生成单个 docx：工作进程各自读取、过滤一段文件并序列化段落 XML（render_body_job），
+    主进程按 collect_code_files 的顺序拼接进正文并保存，排版阶段不再受限于单线程的 python-docx。
+
+    输出 PDF 时不适用，改为单进程生成。
+
+    Args:
+        pipeline_options: CodeDocPipeline 的构造参数（dict，需可序列化，不含 cache）
+        title: 页眉标题
+        indirs/excludes: 源码目录与排除路径列表
+        outfile: 输出路径或可写的二进制流
+        jobs: 进程数；为空使用 CPU 核数，<= 1 时在当前进程串行执行
+        profiler: StageProfiler 实例；工作进程的阶段耗时会累加到其中
+        pipeline: 用于扫描与保存的 CodeDocPipeline；为空则按 pipeline_options 创建
+
+    Returns:
+        dict：包含 file_count、outfile 与 stats
+    """
+    profiler = profiler if profiler else StageProfiler()
+    owns_pipeline = pipeline is None
+    if owns_pipeline:
+        pipeline = CodeDocPipeline(**pipeline_options)
+    try:
+        if pipeline.resolve_output_format(outfile) != 'docx' or pipeline.writer_factory:
+            logger.warning('并行生成正文仅支持 docx 输出，已改为单进程生成')
+            return pipeline.run(title, indirs, excludes, outfile, profiler=profiler)
+        indirs = [abspath(indir) for indir in (indirs or DEFAULT_INDIRS)]
+        excludes = normalize_paths(excludes or [])
+        if outfile and not hasattr(outfile, 'write'):
+            excludes = normalize_paths(excludes + [outfile])
+        with profiler.stage('collect'):
+            files = pipeline.discover(indirs, excludes)
+        digest, unchanged = pipeline.check_unchanged(title, files, outfile, profiler)
+        if unchanged:
+            logger.info('输入未变化，跳过生成：%s', outfile)
+            return {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict(), 'skipped': True}
+        if jobs is None:
+            jobs = os.cpu_count() or 1
+        body_jobs = [
+            {'options': pipeline_options, 'files': files_slice, 'indirs': indirs, 'excludes': excludes}
+            for files_slice in split_render_slices(files, jobs * 4)
+        ]
+        writer = pipeline.create_writer(outfile, 'docx', profiler)
+        writer.input_digest = digest
+        writer.write_header(title)
+        if jobs <= 1 or len(body_jobs) <= 1:
+            results = map(render_body_job, body_jobs)
+            for fragment, stats in results:
+                writer.append_xml(fragment)
+                profiler.merge(stats)
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            template_paths = [pipeline_options['template_path']] if pipeline_options.get('template_path') else []
+            with ProcessPoolExecutor(
+                    max_workers=jobs,
+                    initializer=init_batch_worker,
+                    initargs=(template_paths,)
+            ) as executor:
+                for fragment, stats in executor.map(render_body_job, body_jobs):
+                    writer.append_xml(fragment)
+                    profiler.merge(stats)
+        pipeline.save(writer, outfile)
+        return {'file_count': len(files), 'outfile': outfile, 'stats': profiler.as_dict()}
+    finally:
+        if owns_pipeline:
+            pipeline.close()
@@ -0,0 +1,508 @@
+# -*- coding: utf-8 -*-
+"""
+GUI 文件树：按需列出目录内容的 Qt 数据模型，以及在后台线程中统计各目录文件数与行数的计数器。
+
+- 只有展开的目录才会读取子项，超大目录按批插入（视图滚动到末尾时再取下一批）；
+  视图只绘制可见行，不为每个文件创建控件
+- 文件数/行数由 TreeCounter 在后台线程中自底向上统计（count_code_tree），统计过的子目录不会重复遍历；
+  新展开的目录优先统计，被打断的统计稍后继续；统计不计排除路径，勾选变化后重新统计受影响的上级目录
+- 勾选状态由排除路径集合推导：取消勾选即加入排除列表；重新勾选被上级排除的子项时，
+  上级的排除项会展开为其余兄弟项的排除项
+"""
+import os
+import threading
+import time
+from os import scandir
+from os.path import abspath
+
+from PyQt5.QtCore import QAbstractItemModel, QModelIndex, QObject, Qt, pyqtSignal
+
+from core import (
+    CodeFinder, DEFAULT_SKIP_DIRS, DEFAULT_SKIP_FILES, count_code_tree,
+    normalize_paths, sniff_file
+)
+
+FETCH_BATCH = 1000
+COLUMN_LABELS = ('名称', '文件数', '行数')
+PENDING_TEXT = '…'
+
+
+def list_tree_children(directory, finder):
+    """
+    列出目录在文件树中显示的子项：未跳过的子目录，以及会被收录的代码文件（目录在前，按名称排序）。
+
+    Returns:
+        [(名称, 绝对路径, 是否目录)]
+    """
+    dirs = []
+    files = []
+    try:
+        entries = list(scandir(directory))
+    except OSError:
+        return []
+    for entry in entries:
+        name = entry.name
+        if finder.is_hidden_file(name):
+            continue
+        path = abspath(entry.path)
+        if entry.is_dir():
+            if name not in finder.skip_dir_names:
+                dirs.append((name, path, True))
+        elif entry.is_file() and name not in finder.skip_file_names:
+            if finder.classify(name) is not None:
+                files.append((name, path, False))
+            elif '.' not in name and finder.rules.languages:
+                # 无后缀文件需要按 shebang 判断，只读取文件开头
+                is_binary, shebang = sniff_file(path)
+                if not is_binary and finder.classify(name, shebang) is not None:
+                    files.append((name, path, False))
+    dirs.sort(key=lambda item: item[0].lower())
+    files.sort(key=lambda item: item[0].lower())
+    return dirs + files
+
+
+class FileTreeNode(object):
+    __slots__ = ('path', 'name', 'is_dir', 'parent', 'row', 'children', 'pending', 'files', 'lines')
+
+    def __init__(self, path, name, is_dir, parent=None, row=0):
+        self.path = path
+        self.name = name
+        self.is_dir = is_dir
+        self.parent = parent
+        self.row = row
+        self.children = None
+        self.pending = None
+        self.files = None
+        self.lines = None
+
+
+class TreeCounter(QObject):
+    """
+    后台统计目录的文件数与行数：请求按后进先出处理，新请求会打断正在进行的统计，
+    被打断的目录放回队尾，已完成的子目录结果保留复用。
+
+    结果通过 counted 信号分批回报：{'generation', 'dirs': [(目录, 文件数, 行数)], 'files': [(文件, 行数)]}；
+    只回报已展开（watch）目录下的文件行数。统计过的目录与文件结果保存在计数器中，
+    之后才展开的目录通过 dir_counts/file_lines 直接取得，不必重新统计。
+    """
+    counted = pyqtSignal(object)
+
+    def __init__(self, parent=None, interval=0.2):
+        super().__init__(parent)
+        self.interval = interval
+        self._condition = threading.Condition()
+        self._stack = []
+        self._requested = set()
+        self._watched = set()
+        self._known = {}
+        self._known_files = {}
+        self._finder = None
+        self._excludes = None
+        self._generation = 0
+        self._arrivals = 0
+        self._closed = False
+        self._thread = None
+
+    def reset(self, finder, excludes=None):
+        """
+        更换扫描规则：丢弃排队中的请求与已统计的结果。
+        """
+        with self._condition:
+            self._generation += 1
+            self._stack = []
+            self._requested = set()
+            self._watched = set()
+            self._known = {}
+            self._known_files = {}
+            self._finder = finder
+            self._excludes = excludes
+        return self._generation
+
+    def invalidate(self, excludes, paths):
+        """
+        排除路径变化：丢弃受影响目录（变化路径本身、其上级与下级目录）的统计结果，之后按新的排除路径重新统计。
+        文件行数与排除路径无关，继续保留。
+
+        Args:
+            excludes: 新的排除路径列表（绝对路径）
+            paths: 加入或移出排除列表的路径
+
+        Returns:
+            新的批次编号；旧批次的结果应被忽略
+        """
+        prefixes = [path + os.sep for path in paths]
+
+        def affected(directory):
+            prefix = directory + os.sep
+            return (
+                directory in paths or any(directory.startswith(item) for item in prefixes)
+                or any(path.startswith(prefix) for path in paths)
+            )
+
+        with self._condition:
+            self._generation += 1
+            self._excludes = excludes
+            self._known = dict(item for item in self._known.items() if not affected(item[0]))
+            self._requested = set(directory for directory in self._requested if not affected(directory))
+            self._stack = [directory for directory in self._stack if directory in self._requested]
+        return self._generation
+
+    def dir_counts(self, directory):
+        """
+        已统计目录的 (文件数, 行数)；尚未统计时返回 None。
+        """
+        return self._known.get(directory)
+
+    def file_lines(self, path):
+        """
+        已统计文件的行数；尚未统计时返回 None。
+        """
+        return self._known_files.get(os.path.dirname(path), {}).get(os.path.basename(path))
+
+    def watch(self, directory):
+        self._watched.add(directory)
+
+    def request(self, directory):
+        with self._condition:
+            if (self._closed or self._finder is None or directory in self._requested
+                    or directory in self._known):
+                return
+            self._requested.add(directory)
+            self._stack.append(directory)
+            self._arrivals += 1
+            self._condition.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='ccd-tree-counter', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stack and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                directory = self._stack.pop()
+                generation = self._generation
+                arrivals = self._arrivals
+                finder = self._finder
+                excludes = self._excludes
+                known = self._known
+                known_files = self._known_files
+            batch = {'generation': generation, 'dirs': [], 'files': []}
+            state = {'flushed': time.monotonic()}
+
+            def flush(force=False):
+                now = time.monotonic()
+                if (batch['dirs'] or batch['files']) and (force or now - state['flushed'] >= self.interval):
+                    self.counted.emit({'generation': generation, 'dirs': batch['dirs'], 'files': batch['files']})
+                    batch['dirs'] = []
+                    batch['files'] = []
+                    state['flushed'] = now
+
+            def on_dir(path, files, lines):
+                batch['dirs'].append((path, files, lines))
+                flush()
+
+            def on_file(path, lines):
+                parent, name = os.path.split(path)
+                # 先记录结果再检查是否已展开：与 watch 后读取 file_lines 的顺序相反，两者至少有一方能取得行数
+                known_files.setdefault(parent, {})[name] = lines
+                if parent in self._watched:
+                    batch['files'].append((path, lines))
+                    flush()
+
+            def should_stop():
+                return self._closed or self._generation != generation or self._arrivals != arrivals
+
+            result = count_code_tree(
+                directory, finder, excludes, known,
+                should_stop=should_stop, on_dir=on_dir, on_file=on_file
+            )
+            if result is not None:
+                batch['dirs'].append((directory, result[0], result[1]))
+            flush(force=True)
+            if result is None:
+                with self._condition:
+                    # 被新请求打断的目录稍后继续；被 reset/invalidate 丢弃的不再继续
+                    if not self._closed and directory in self._requested and directory not in self._known:
+                        self._stack.insert(0, directory)
+
+
+class FileTreeModel(QAbstractItemModel):
+    """
+    源码目录的懒加载树模型：列为名称、文件数、行数，首列可勾选（对应排除路径）。
+
+    excludes_changed 信号在用户勾选/取消勾选后发出新的排除路径列表（绝对路径、已排序）。
+    """
+    excludes_changed = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.finder = None
+        self.roots = []
+        self.excludes = set()
+        self._exclude_list = []
+        self._dir_nodes = {}
+        self._file_nodes = {}
+        self._generation = 0
+        self.counter = TreeCounter(self)
+        self.counter.counted.connect(self._apply_counts)
+
+    def set_source(self, indirs, exts, excludes=None, skip_dir_names=None, skip_file_names=None):
+        """
+        重新加载根目录与扫描规则（后缀变化时也需调用）。
+        """
+        self.beginResetModel()
+        self.finder = CodeFinder(
+            exts,
+            skip_dir_names=skip_dir_names if skip_dir_names else DEFAULT_SKIP_DIRS,
+            skip_file_names=skip_file_names if skip_file_names else DEFAULT_SKIP_FILES
+        )
+        self._set_excludes(excludes or [])
+        self._dir_nodes = {}
+        self._file_nodes = {}
+        self.roots = []
+        for path in normalize_paths(indirs):
+            if os.path.isdir(path):
+                node = FileTreeNode(path, path, True, None, len(self.roots))
+                self.roots.append(node)
+                self._dir_nodes[path] = node
+        self._generation = self.counter.reset(self.finder, self._exclude_list)
+        self.endResetModel()
+
+    def set_excludes(self, excludes):
+        """
+        排除路径在外部（如排除路径输入框）变化时同步勾选状态，不重新加载目录。
+        """
+        excludes = set(normalize_paths(excludes))
+        if excludes == self.excludes:
+            return
+        previous = self.excludes
+        self._set_excludes(excludes)
+        self._refresh_check_states()
+        self._recount(previous)
+
+    def _set_excludes(self, excludes):
+        self.excludes = set(excludes)
+        self._exclude_list = sorted(self.excludes)
+
+    def close(self):
+        self.counter.close()
+
+    # Qt 模型接口
+
+    def _node(self, index):
+        return index.internalPointer() if index.isValid() else None
+
+    def _siblings(self, node):
+        return self.roots if node.parent is None else node.parent.children
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() and parent.column() != 0:
+            return QModelIndex()
+        children = self.roots if not parent.isValid() else self._node(parent).children or []
+        if row < 0 or row >= len(children) or column < 0 or column >= len(COLUMN_LABELS):
+            return QModelIndex()
+        return self.createIndex(row, column, children[row])
+
+    def parent(self, index):
+        node = self._node(index)
+        if node is None or node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.roots)
+        if parent.column() != 0:
+            return 0
+        return len(self._node(parent).children or [])
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(COLUMN_LABELS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self.roots)
+        if parent.column() != 0:
+            return False
+        node = self._node(parent)
+        return node.is_dir and (node.children is None or bool(node.children) or bool(node.pending))
+
+    def canFetchMore(self, parent):
+        node = self._node(parent)
+        return node is not None and node.is_dir and (node.children is None or bool(node.pending))
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node is None or not node.is_dir:
+            return
+        if node.children is None:
+            node.children = []
+            node.pending = list_tree_children(node.path, self.finder)
+            # 先登记再创建节点：之后统计的文件行数经 counted 回报，已统计的在创建节点时读取
+            self.counter.watch(node.path)
+        batch = node.pending[:FETCH_BATCH]
+        if not batch:
+            return
+        del node.pending[:FETCH_BATCH]
+        start = len(node.children)
+        self.beginInsertRows(parent, start, start + len(batch) - 1)
+        for offset, (name, path, is_dir) in enumerate(batch):
+            child = FileTreeNode(path, name, is_dir, node, start + offset)
+            node.children.append(child)
+            if is_dir:
+                self._dir_nodes[path] = child
+                counts = self.counter.dir_counts(path)
+                if counts is not None:
+                    child.files, child.lines = counts
+            else:
+                self._file_nodes[path] = child
+                child.lines = self.counter.file_lines(path)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMN_LABELS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 0:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        node = self._node(index)
+        if node is None:
+            return None
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return node.name
+            if CodeFinder.should_be_excluded(node.path, self._exclude_list):
+                return ''
+            if node.is_dir and node.files is None:
+                counts = self.counter.dir_counts(node.path)
+                if counts is None:
+                    self.counter.request(node.path)
+                else:
+                    node.files, node.lines = counts
+            elif not node.is_dir and node.lines is None:
+                node.lines = self.counter.file_lines(node.path)
+            if column == 1:
+                if not node.is_dir:
+                    return ''
+                return PENDING_TEXT if node.files is None else str(node.files)
+            return PENDING_TEXT if node.lines is None else str(node.lines)
+        if role == Qt.CheckStateRole and column == 0:
+            return self.check_state(node.path)
+        if role == Qt.ToolTipRole:
+            return node.path
+        if role == Qt.TextAlignmentRole and column > 0:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        node = self._node(index)
+        if node is None or role != Qt.CheckStateRole or index.column() != 0:
+            return False
+        previous = self.excludes
+        if value == Qt.Checked:
+            self._include(node.path)
+        else:
+            self._exclude(node.path)
+        self._refresh_check_states()
+        self._recount(previous)
+        self.excludes_changed.emit(list(self._exclude_list))
+        return True
+
+    # 勾选与排除路径
+
+    def check_state(self, path):
+        if CodeFinder.should_be_excluded(path, self._exclude_list):
+            return Qt.Unchecked
+        prefix = path + os.sep
+        if any(exclude.startswith(prefix) for exclude in self._exclude_list):
+            return Qt.PartiallyChecked
+        return Qt.Checked
+
+    def _exclude(self, path):
+        prefix = path + os.sep
+        excludes = set(exclude for exclude in self.excludes if not exclude.startswith(prefix))
+        excludes.add(path)
+        self._set_excludes(excludes)
+
+    def _include(self, path):
+        prefix = path + os.sep
+        excludes = set(exclude for exclude in self.excludes if not exclude.startswith(prefix))
+        excludes.discard(path)
+        ancestors = [exclude for exclude in excludes if path.startswith(exclude + os.sep)]
+        for ancestor in ancestors:
+            # 将上级的排除项展开为路径上各层的其余兄弟项
+            excludes.discard(ancestor)
+            relative = os.path.relpath(path, ancestor).split(os.sep)
+            directory = ancestor
+            for part in relative:
+                for _, child, _ in list_tree_children(directory, self.finder):
+                    if os.path.basename(child) != part:
+                        excludes.add(child)
+                directory = os.path.join(directory, part)
+        self._set_excludes(excludes)
+
+    def _refresh_check_states(self):
+        self._emit_levels_changed(0, 0, Qt.CheckStateRole)
+
+    def _emit_levels_changed(self, first_column, last_column, role):
+        levels = [(QModelIndex(), self.roots)]
+        levels.extend(
+            (self.createIndex(node.row, 0, node), node.children)
+            for node in self._dir_nodes.values() if node.children
+        )
+        for parent, children in levels:
+            if children:
+                self.dataChanged.emit(
+                    self.index(0, first_column, parent), self.index(len(children) - 1, last_column, parent), [role]
+                )
+
+    def _recount(self, previous):
+        """
+        排除路径变化后丢弃受影响目录的统计结果，可见的目录在重绘时重新请求统计。
+        """
+        changed = previous ^ self.excludes
+        if not changed or self.finder is None:
+            return
+        self._generation = self.counter.invalidate(self._exclude_list, changed)
+        for node in self._dir_nodes.values():
+            if node.files is not None and self.counter.dir_counts(node.path) is None:
+                node.files = None
+                node.lines = None
+        self._emit_levels_changed(1, 2, Qt.DisplayRole)
+
+    def _apply_counts(self, batch):
+        if batch['generation'] != self._generation:
+            return
+        for path, files, lines in batch['dirs']:
+            node = self._dir_nodes.get(path)
+            if node is not None:
+                node.files = files
+                node.lines = lines
+                self._emit_counts_changed(node)
+        for path, lines in batch['files']:
+            node = self._file_nodes.get(path)
+            if node is not None:
+                node.lines = lines
+                self._emit_counts_changed(node)
+
+    def _emit_counts_changed(self, node):
+        self.dataChanged.emit(
+            self.createIndex(node.row, 1, node), self.createIndex(node.row, 2, node), [Qt.DisplayRole]
+        )
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+git 源码模式：用一次 `git ls-files -z`（或指定版本时的 `git ls-tree -r -z`）列出受版本控制的文件，
+并可通过常驻的 `git cat-file --batch` 进程读取指定版本的文件内容，无需检出即可按标签/提交生成文档。
+
+与目录遍历相比不会进入未跟踪的构建产物目录，忽略规则由 git 自身处理。
+"""
+import logging
+import os
+import subprocess
+import threading
+from os.path import abspath
+
+from core import (
+    CodeFinder, DEFAULT_SKIP_DIRS, DEFAULT_SKIP_FILES, decode_bytes, sniff_file, source_order_key
+)
+
+logger = logging.getLogger(__name__)
+
+BINARY_SNIFF_SIZE = 2048
+
+
+def run_git(args, cwd):
+    """
+    执行 git 命令并返回标准输出（bytes）。
+
+    Raises:
+        RuntimeError: 未安装 git 或命令执行失败
+    """
+    try:
+        process = subprocess.run(
+            ['git'] + list(args), cwd=cwd,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+    except OSError as exc:
+        raise RuntimeError('未找到 git 命令，请安装 git 后重试') from exc
+    if process.returncode != 0:
+        raise RuntimeError('git {} 执行失败：{}'.format(
+            ' '.join(args), process.stderr.decode('utf-8', 'ignore').strip()
+        ))
+    return process.stdout
+
+
+def git_toplevel(path):
+    """
+    返回 path 所在 git 仓库的根目录（绝对路径）与 path 相对根目录的前缀（以 / 结尾，位于根目录时为空）。
+    """
+    output = run_git(['rev-parse', '--show-toplevel', '--show-prefix'], path).decode('utf-8').split('\n')
+    return abspath(output[0].strip()), output[1].strip() if len(output) > 1 else ''
+
+
+class GitBlobReader(object):
+    """
+    常驻的 `git cat-file --batch` 进程：逐个读取 <版本>:<路径> 的内容，线程安全。
+    """
+    def __init__(self, toplevel, revision):
+        self.toplevel = toplevel
+        self.revision = revision
+        self._lock = threading.Lock()
+        try:
+            self._process = subprocess.Popen(
+                ['git', 'cat-file', '--batch'], cwd=toplevel,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE
+            )
+        except OSError as exc:
+            raise RuntimeError('未找到 git 命令，请安装 git 后重试') from exc
+
+    def read(self, name):
+        """
+        读取仓库内文件在该版本的内容。
+
+        Args:
+            name: 相对仓库根目录的路径（以 / 分隔）
+
+        Returns:
+            bytes；版本中不存在该文件时返回 None
+        """
+        with self._lock:
+            stdin = self._process.stdin
+            stdout = self._process.stdout
+            stdin.write('{}:{}\n'.format(self.revision, name).encode('utf-8'))
+            stdin.flush()
+            header = stdout.readline().split()
+            if len(header) != 3:
+                return None
+            size = int(header[2])
+            data = stdout.read(size)
+            stdout.read(1)
+        if header[1] != b'blob':
+            return None
+        return data
+
+    def close(self):
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            self._process.wait()
+        self._process.stdout.close()
+
+
+class GitSource(object):
+    """
+    基于 git 的文件来源，可作为 CodeDocPipeline 的 discoverer 与 decoder。
+
+    - revision 为空：列出索引中跟踪的文件，从工作区读取内容
+    - 指定 revision（分支、标签或提交）：列出该版本中的文件，经 git cat-file --batch 读取内容；
+      二进制文件（前 2048 字节含 NUL）读取为空文本
+
+    扫描时与 CodeFinder 相同地跳过隐藏路径、指定的目录名/文件名与 excludes；
+    无后缀脚本的 shebang 识别只用于工作区（指定版本时不为此读取文件内容）。
+    """
+    def __init__(self, exts=None, skip_dir_names=None, skip_file_names=None, revision=None, encoding='utf-8'):
+        self.finder = CodeFinder(
+            exts,
+            skip_dir_names=skip_dir_names if skip_dir_names else DEFAULT_SKIP_DIRS,
+            skip_file_names=skip_file_names if skip_file_names else DEFAULT_SKIP_FILES
+        )
+        self.revision = revision
+        self.encoding = encoding
+        self._readers = {}
+        self._blobs = {}
+        self._lock = threading.Lock()
+
+    def list_files(self, indir):
+        """
+        列出目录下受版本控制的文件（相对 indir 的路径）。
+        """
+        if self.revision:
+            output = run_git(['ls-tree', '-r', '-z', '--name-only', self.revision], indir)
+        else:
+            output = run_git(['ls-files', '-z', '--cached'], indir)
+        names = [name for name in output.decode('utf-8', 'surrogateescape').split('\0') if name]
+        # 与工作区扫描的顺序一致（见 source_order_key）
+        return sorted(names, key=source_order_key)
+
+    def _is_skipped(self, relative):
+        finder = self.finder
+        parts = relative.split('/')
+        for part in parts:
+            if finder.is_hidden_file(part):
+                return True
+        for part in parts[:-1]:
+            if part in finder.skip_dir_names:
+                return True
+        return parts[-1] in finder.skip_file_names
+
+    def discover(self, indirs, excludes, should_stop=None):
+        """
+        CodeDocPipeline 的 discoverer：返回文件绝对路径列表。
+        """
+        files = []
+        for indir in indirs:
+            if should_stop and should_stop():
+                break
+            if self.revision:
+                toplevel, prefix = git_toplevel(indir)
+            for relative in self.list_files(indir):
+                if self._is_skipped(relative):
+                    continue
+                name = relative.rsplit('/', 1)[-1]
+                # 按文件名即可排除的直接跳过；工作区中无后缀的文件还需按 shebang 判断
+                if self.finder.classify(name) is None and (self.revision or '.' in name):
+                    continue
+                path = abspath(os.path.join(indir, relative))
+                if self.finder.should_be_excluded(path, excludes):
+                    continue
+                if not self.revision:
+                    if not os.path.isfile(path):
+                        continue
+                    is_binary, shebang = sniff_file(path)
+                    if is_binary or self.finder.classify(name, shebang) is None:
+                        continue
+                files.append(path)
+                if self.revision:
+                    self._blobs[path] = (toplevel, prefix + relative)
+            logger.debug('git 在%s目录下找到%d个代码文件.', indir, len(files))
+        return files
+
+    def _reader_for(self, toplevel):
+        with self._lock:
+            reader = self._readers.get(toplevel)
+            if reader is None:
+                reader = self._readers[toplevel] = GitBlobReader(toplevel, self.revision)
+        return reader
+
+    def read_bytes(self, path):
+        """
+        读取文件内容：指定版本时从 git 读取，否则从工作区读取。
+        """
+        if not self.revision:
+            with open(path, 'rb') as fp:
+                return fp.read()
+        blob = self._blobs.get(path)
+        if blob is None:
+            raise RuntimeError('{} 不在已扫描的 git 版本中'.format(path))
+        data = self._reader_for(blob[0]).read(blob[1])
+        return data if data is not None else b''
+
+    def decode(self, path):
+        """
+        CodeDocPipeline 的 decoder：按 encoding 解码文件内容。
+        """
+        try:
+            data = self.read_bytes(path)
+        except OSError:
+            return ''
+        if b'\x00' in data[:BINARY_SNIFF_SIZE]:
+            return ''
+        return decode_bytes(data, self.encoding)
+
+    def close(self):
+        """
+        结束常驻的 git cat-file 进程。
+        """
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers = {}
+        for reader in readers:
+            reader.close()
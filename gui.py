@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-
 import os
 import sys
+import time
 
-from PyQt5.QtCore import QEvent, Qt, QThread, QTimer, QUrl, pyqtSignal
+from PyQt5.QtCore import (
+    QEvent, QObject, QRunnable, Qt, QThread, QThreadPool, QTimer, QUrl, pyqtSignal
+)
 from PyQt5.QtGui import QDesktopServices, QPalette
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QFileDialog, QScrollArea, QMainWindow, QDialog, QListWidget,
     QListWidgetItem, QAbstractItemView, QDialogButtonBox, QStyle,
-    QStyleOptionViewItem
+    QStyleOptionViewItem, QTreeView, QHeaderView
 )
 from qfluentwidgets import (
     PrimaryPushButton, PushButton, LineEdit, TextEdit,
@@ -17,11 +20,13 @@ from qfluentwidgets import (
 )
 
 from core import (
-    collect_all_file_extensions, collect_code_files, generate_code_doc,
+    iter_file_extension_stats, collect_code_index, collect_code_stats,
+    format_stage_summary, CodeDocPipeline, GenerationCache,
     normalize_items, normalize_exts, normalize_paths,
     DEFAULT_SKIP_DIRS, DEFAULT_SKIP_FILES, LANGUAGE_BY_EXT,
-    read_gitignore_excludes
+    iter_gitignore_excludes
 )
+from file_tree import FileTreeModel
 
 COMMENT_PREFIX_BY_LANG = {
     'python': ['#', '"""', "'''"],
@@ -52,64 +57,239 @@ COMMENT_PREFIX_BY_LANG = {
 }
 
 
-class GenerateWorker(QThread):
+OUTPUT_SUFFIXES = ('.docx', '.pdf')
+LINE_NUMBER_RESTART_LABELS = {
+    '每页重新编号': 'page',
+    '每节重新编号': 'section',
+    '连续编号': 'continuous'
+}
+
+TASK_PRIORITY = {
+    'gitignore': 4,
+    'extensions': 3,
+    'scan': 2,
+    'stats': 1,
+    'generate': 0
+}
+
+
+def run_file_scan(config, should_stop=None):
+    indirs = [os.path.abspath(indir) for indir in config['indirs']]
+    excludes = normalize_paths(config['excludes'])
+    outfile = config.get('outfile')
+    if outfile:
+        excludes = normalize_paths(excludes + [outfile])
+    index = collect_code_index(
+        indirs,
+        config['exts'],
+        excludes,
+        DEFAULT_SKIP_DIRS,
+        DEFAULT_SKIP_FILES,
+        should_stop=should_stop
+    )
+    return {
+        'mode': 'scan',
+        'file_count': len(index),
+        'bytes': index.total_size()
+    }
+
+
+def run_code_stats(config, should_stop=None):
+    result = collect_code_stats(
+        indirs=config['indirs'],
+        exts=config['exts'],
+        comment_chars=config['comment_chars'],
+        excludes=config['excludes'],
+        skip_blank_lines=config['skip_blank_lines'],
+        skip_comment_lines=config['skip_comment_lines'],
+        encoding=config['encoding'],
+        font_size=config['font_size'],
+        line_spacing=config['line_spacing'],
+        space_before=config['space_before'],
+        space_after=config['space_after'],
+        template_path=config['template_path'],
+        outfile=config.get('outfile'),
+        should_stop=should_stop
+    )
+    result['mode'] = 'stats'
+    return result
+
+
+# 每次生成单独传给 CodeDocPipeline.run 的配置项，其余配置项用于构造流水线
+RUN_CONFIG_KEYS = ('title', 'indirs', 'excludes', 'outfile')
+
+
+def pipeline_options(config):
+    """
+    从界面配置中取出构造 CodeDocPipeline 的参数（去掉 RUN_CONFIG_KEYS）。
+    """
+    return {key: value for key, value in config.items() if key not in RUN_CONFIG_KEYS}
+
+
+def run_generate(pipeline, config, should_stop=None):
+    result = pipeline.run(
+        config['title'], config['indirs'], config['excludes'], config['outfile'],
+        should_stop=should_stop
+    )
+    result['mode'] = 'generate'
+    return result
+
+
+def run_extension_scan(indirs, excludes, should_stop=None, progress=None, interval=0.2):
+    """
+    后台收集后缀及各后缀的文件数与字节数：每隔 interval 秒通过 progress 回报有变化的后缀（累计值）。
+    """
+    stats = {}
+    changed = set()
+    dirs = 0
+    last = time.monotonic()
+    for _, counts in iter_file_extension_stats(
+        indirs, excludes, DEFAULT_SKIP_DIRS, DEFAULT_SKIP_FILES, should_stop=should_stop
+    ):
+        dirs += 1
+        for ext, (files, size) in counts.items():
+            total_files, total_size = stats.get(ext, (0, 0))
+            stats[ext] = (total_files + files, total_size + size)
+            changed.add(ext)
+        now = time.monotonic()
+        if progress and changed and now - last >= interval:
+            progress({'dirs': dirs, 'stats': {ext: stats[ext] for ext in changed}})
+            changed = set()
+            last = now
+    return {'mode': 'extensions', 'dirs': dirs, 'stats': stats}
+
+
+def format_size(size):
+    if size >= 1048576:
+        return '{:.1f} MB'.format(size / 1048576.0)
+    if size >= 1024:
+        return '{:.1f} KB'.format(size / 1024.0)
+    return '{} B'.format(size)
+
+
+def run_gitignore_scan(indirs, should_stop=None, progress=None, batch_size=200, interval=0.2):
+    """
+    后台读取 .gitignore：每累计 batch_size 条排除路径或每隔 interval 秒通过 progress 分批回报。
+    """
+    seen = set()
+    batch = []
+    dirs = 0
+    total = 0
+    last = time.monotonic()
+    for _, paths in iter_gitignore_excludes(indirs, should_stop):
+        dirs += 1
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                batch.append(path)
+        now = time.monotonic()
+        if progress and (len(batch) >= batch_size or now - last >= interval):
+            total += len(batch)
+            progress({'dirs': dirs, 'count': total, 'paths': batch})
+            batch = []
+            last = now
+    total += len(batch)
+    if progress and batch:
+        progress({'dirs': dirs, 'count': total, 'paths': batch})
+    return {'mode': 'gitignore', 'dirs': dirs, 'count': total, 'paths': [] if progress else sorted(seen)}
+
+
+class TaskSignals(QObject):
     finished = pyqtSignal(object)
     failed = pyqtSignal(str)
+    progress = pyqtSignal(object)
+    done = pyqtSignal()
 
-    def __init__(self, config, mode):
+
+class BackgroundTask(QRunnable):
+    """
+    在共享线程池中执行的任务；被取消后不再发出结果信号。
+    """
+    def __init__(self, key, func, args, with_progress=False):
         super().__init__()
-        self.config = config
-        self.mode = mode
+        self.setAutoDelete(False)
+        self.key = key
+        self.func = func
+        self.args = args
+        self.with_progress = with_progress
+        self.cancelled = False
+        self.signals = TaskSignals()
+
+    def is_cancelled(self):
+        return self.cancelled
+
+    def report_progress(self, payload):
+        if not self.cancelled:
+            self.signals.progress.emit(payload)
 
     def run(self):
         try:
-            if self.mode == 'scan':
-                indirs = [os.path.abspath(indir) for indir in self.config['indirs']]
-                excludes = normalize_paths(self.config['excludes'])
-                outfile = self.config.get('outfile')
-                if outfile:
-                    excludes = normalize_paths(excludes + [outfile])
-                files = collect_code_files(
-                    indirs,
-                    self.config['exts'],
-                    excludes,
-                    DEFAULT_SKIP_DIRS,
-                    DEFAULT_SKIP_FILES
-                )
-                self.finished.emit({
-                    'mode': 'scan',
-                    'file_count': len(files)
-                })
+            if self.cancelled:
+                return
+            if self.with_progress:
+                result = self.func(*self.args, should_stop=self.is_cancelled, progress=self.report_progress)
             else:
-                result = generate_code_doc(**self.config)
-                result['mode'] = 'generate'
-                self.finished.emit(result)
+                result = self.func(*self.args, should_stop=self.is_cancelled)
+            if not self.cancelled:
+                self.signals.finished.emit(result)
         except Exception as exc:
-            self.failed.emit(str(exc))
+            if not self.cancelled:
+                self.signals.failed.emit(str(exc))
+        finally:
+            self.signals.done.emit()
 
 
-class ExtensionScanWorker(QThread):
-    finished = pyqtSignal(list)
-    failed = pyqtSignal(str)
-
-    def __init__(self, indirs, excludes):
-        super().__init__()
-        self.indirs = indirs
-        self.excludes = excludes
+class TaskPool(QObject):
+    """
+    GUI 共享的后台线程池。
 
-    def run(self):
-        try:
-            exts = collect_all_file_extensions(
-                self.indirs, self.excludes,
-                DEFAULT_SKIP_DIRS, DEFAULT_SKIP_FILES
-            )
-            self.finished.emit(exts)
-        except Exception as exc:
-            self.failed.emit(str(exc))
+    同一 key 只保留最新的任务：提交新任务时，排队中的旧任务直接移出队列，
+    运行中的旧任务被标记取消（扫描函数通过 should_stop 提前结束，结果被丢弃）。
+    不同 key 的任务（后缀扫描、文件计数、统计、生成）互不阻塞，按优先级调度。
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max(len(TASK_PRIORITY), QThread.idealThreadCount()))
+        self.latest = {}
+        self.alive = set()
+
+    def submit(self, key, func, args, on_finished, on_failed, on_progress=None):
+        self.cancel(key)
+        task = BackgroundTask(key, func, args, with_progress=on_progress is not None)
+        task.signals.finished.connect(on_finished)
+        task.signals.failed.connect(on_failed)
+        if on_progress is not None:
+            task.signals.progress.connect(on_progress)
+        task.signals.done.connect(lambda: self._release(task))
+        self.latest[key] = task
+        self.alive.add(task)
+        self.pool.start(task, TASK_PRIORITY.get(key, 0))
+        return task
+
+    def cancel(self, key):
+        task = self.latest.pop(key, None)
+        if task is None:
+            return False
+        task.cancelled = True
+        if self.pool.tryTake(task):
+            self.alive.discard(task)
+        return True
+
+    def is_running(self, key):
+        return key in self.latest
+
+    def _release(self, task):
+        self.alive.discard(task)
+        if self.latest.get(task.key) is task:
+            del self.latest[task.key]
 
 
 class ExtensionSelectDialog(QDialog):
-    def __init__(self, exts, selected, parent=None):
+    """
+    后缀选择对话框：每项显示后缀、文件数与总大小；扫描未完成时可通过 update_stats 陆续补充。
+    """
+    def __init__(self, stats, selected, parent=None, scanning=False):
         super().__init__(parent)
         self.setWindowTitle('选择文件后缀')
         self.resize(420, 480)
@@ -127,21 +307,17 @@ class ExtensionSelectDialog(QDialog):
         header.setStyleSheet('font-size: 13px; font-weight: 600; color: #374151;')
         layout.addWidget(header)
 
-        hint = BodyLabel('请勾选需要提取的后缀')
-        hint.setStyleSheet('font-size: 12px; color: #6b7280;')
-        layout.addWidget(hint)
+        self.hint = BodyLabel('')
+        self.hint.setStyleSheet('font-size: 12px; color: #6b7280;')
+        layout.addWidget(self.hint)
 
+        self.selected = set(selected)
+        self.items = {}
+        self.scanning = scanning
         self.list_widget = QListWidget()
         self.list_widget.setSelectionMode(QAbstractItemView.NoSelection)
         self.list_widget.setAlternatingRowColors(True)
-        for ext in exts:
-            item = QListWidgetItem(ext)
-            if ext in selected:
-                item.setCheckState(Qt.Checked)
-            else:
-                item.setCheckState(Qt.Unchecked)
-            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-            self.list_widget.addItem(item)
+        self.list_widget.setUniformItemSizes(True)
         layout.addWidget(self.list_widget, 1)
 
         action_row = QWidget()
@@ -167,6 +343,37 @@ class ExtensionSelectDialog(QDialog):
         self.clear_btn.clicked.connect(self._clear_all)
         self.list_widget.itemChanged.connect(self._update_count)
         self.list_widget.viewport().installEventFilter(self)
+        self.update_stats(stats, None if scanning else 0)
+
+    def update_stats(self, stats, dirs=None):
+        """
+        合并后缀统计（累计值）：新后缀按名称插入，已有后缀只更新文字，勾选状态保持不变。
+
+        Args:
+            stats: {后缀: (文件数, 字节数)}
+            dirs: 已遍历的目录数；为 None 表示扫描尚未完成
+        """
+        self.list_widget.blockSignals(True)
+        for ext in sorted(stats):
+            files, size = stats[ext]
+            text = '{}    {} 个文件，{}'.format(ext, files, format_size(size))
+            item = self.items.get(ext)
+            if item is None:
+                item = QListWidgetItem(text)
+                item.setData(Qt.UserRole, ext)
+                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+                item.setCheckState(Qt.Checked if ext in self.selected else Qt.Unchecked)
+                self.items[ext] = item
+                row = sorted(self.items).index(ext)
+                self.list_widget.insertItem(row, item)
+            else:
+                item.setText(text)
+        self.list_widget.blockSignals(False)
+        self.scanning = dirs is None
+        if dirs is None:
+            self.hint.setText('请勾选需要提取的后缀（正在扫描，列表会陆续补充）')
+        else:
+            self.hint.setText('请勾选需要提取的后缀')
         self._update_count()
 
     def eventFilter(self, obj, event):
@@ -197,6 +404,8 @@ class ExtensionSelectDialog(QDialog):
                 item.setCheckState(Qt.Checked)
 
     def _clear_all(self):
+        # 尚未扫描到的已选后缀也一并清除
+        self.selected &= set(self.items)
         for i in range(self.list_widget.count()):
             self.list_widget.item(i).setCheckState(Qt.Unchecked)
 
@@ -210,11 +419,16 @@ class ExtensionSelectDialog(QDialog):
         self.count_label.setText('已选 {} / {}'.format(checked, total))
 
     def get_selected(self):
-        selected = []
+        """
+        返回勾选的后缀；扫描未完成时保留原已选、但尚未出现在列表中的后缀。
+        """
+        selected = set()
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
             if item.checkState() == Qt.Checked:
-                selected.append(item.text())
+                selected.add(item.data(Qt.UserRole))
+        if self.scanning:
+            selected |= self.selected - set(self.items)
         return sorted(selected)
 
 
@@ -310,6 +524,8 @@ class CommentPrefixDialog(QDialog):
             self.list_widget.item(i).setCheckState(Qt.Checked)
 
     def _clear_all(self):
+        # 尚未扫描到的已选后缀也一并清除
+        self.selected &= set(self.items)
         for i in range(self.list_widget.count()):
             self.list_widget.item(i).setCheckState(Qt.Unchecked)
 
@@ -345,14 +561,32 @@ class GeneratorWindow(QMainWindow):
         setTheme(Theme.AUTO)
         self.setWindowTitle('软著源代码文档生成器')
         self.resize(1000, 720)
-        self.worker = None
-        self.ext_worker = None
-        self.pending_ext_scan = False
+        self.task_pool = TaskPool(self)
         self.available_exts = []
+        self.ext_stats = {}
+        self.ext_dialog = None
         self.last_scan_count = 0
+        self.last_stats = None
+        self.last_code_stats = None
+        self.generation_cache = GenerationCache()
+        self.generation_pipeline = None
+        self.generation_pipeline_options = None
+        self.gitignore_seen = set()
+        self.gitignore_added = 0
         self.ext_scan_timer = QTimer(self)
         self.ext_scan_timer.setSingleShot(True)
         self.ext_scan_timer.timeout.connect(self.start_extension_scan)
+        self.field_items = {}
+        self.summary_timer = QTimer(self)
+        self.summary_timer.setSingleShot(True)
+        self.summary_timer.timeout.connect(self._update_summary)
+        self.tree_timer = QTimer(self)
+        self.tree_timer.setSingleShot(True)
+        self.tree_timer.timeout.connect(self.reload_file_tree)
+        self.tree_excludes_timer = QTimer(self)
+        self.tree_excludes_timer.setSingleShot(True)
+        self.tree_excludes_timer.timeout.connect(self.sync_tree_excludes)
+        self.tree_syncing = False
         self._build_ui()
 
     def _build_ui(self):
@@ -496,6 +730,30 @@ class GeneratorWindow(QMainWindow):
 
         layout.addWidget(source_group)
 
+        tree_group, tree_layout = self._create_group('文件树')
+        tree_hint = BodyLabel('展开目录查看将收录的文件；取消勾选即加入排除路径，文件数与行数在后台统计')
+        tree_hint.setWordWrap(True)
+        tree_hint.setStyleSheet('font-size: 12px; color: #6b7280;')
+        self.tree_model = FileTreeModel(self)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.tree_model)
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setMinimumHeight(320)
+        self.tree_view.header().setStretchLastSection(False)
+        self.tree_view.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.tree_view.header().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.tree_view.header().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.refresh_tree_btn = PushButton('刷新')
+        self.refresh_tree_btn.setMinimumHeight(32)
+        tree_buttons = QHBoxLayout()
+        tree_buttons.setSpacing(8)
+        tree_buttons.addWidget(self.refresh_tree_btn)
+        tree_buttons.addStretch(1)
+        tree_layout.addWidget(tree_hint)
+        tree_layout.addWidget(self.tree_view)
+        tree_layout.addLayout(tree_buttons)
+        layout.addWidget(tree_group)
+
         output_group, output_layout = self._create_group('文档设置')
         output_grid = QGridLayout()
         output_grid.setHorizontalSpacing(12)
@@ -587,6 +845,20 @@ class GeneratorWindow(QMainWindow):
         style_grid.addWidget(BodyLabel('行距'), 4, 0)
         style_grid.addWidget(self.line_spacing_spin, 4, 1)
 
+        line_number_row = QWidget()
+        line_number_layout = QHBoxLayout(line_number_row)
+        line_number_layout.setContentsMargins(0, 0, 0, 0)
+        line_number_layout.setSpacing(8)
+        self.line_numbers_check = CheckBox('显示行号')
+        self.line_number_restart_combo = ComboBox()
+        self.line_number_restart_combo.addItems(list(LINE_NUMBER_RESTART_LABELS))
+        self.line_number_restart_combo.setMinimumHeight(32)
+        line_number_layout.addWidget(self.line_numbers_check)
+        line_number_layout.addWidget(self.line_number_restart_combo)
+        line_number_layout.addStretch(1)
+        style_grid.addWidget(BodyLabel('行号'), 5, 0)
+        style_grid.addWidget(line_number_row, 5, 1)
+
         style_btn_row = QWidget()
         style_btn_layout = QHBoxLayout(style_btn_row)
         style_btn_layout.setContentsMargins(0, 0, 0, 0)
@@ -616,12 +888,15 @@ class GeneratorWindow(QMainWindow):
         action_row_layout.setSpacing(8)
         self.generate_btn = PrimaryPushButton('生成文档')
         self.scan_btn = PushButton('扫描文件数')
+        self.stats_btn = PushButton('统计行数与页数')
         self.open_output_btn = PushButton('打开输出目录')
         self.generate_btn.setMinimumHeight(36)
         self.scan_btn.setMinimumHeight(34)
+        self.stats_btn.setMinimumHeight(34)
         self.open_output_btn.setMinimumHeight(34)
         action_row_layout.addWidget(self.generate_btn)
         action_row_layout.addWidget(self.scan_btn)
+        action_row_layout.addWidget(self.stats_btn)
         action_row_layout.addWidget(self.open_output_btn)
         action_layout.addWidget(action_row)
         self.status_label = BodyLabel('')
@@ -647,17 +922,23 @@ class GeneratorWindow(QMainWindow):
         self.reset_style_btn.clicked.connect(self.reset_style_defaults)
         self.generate_btn.clicked.connect(lambda: self.start_worker('generate'))
         self.scan_btn.clicked.connect(lambda: self.start_worker('scan'))
+        self.stats_btn.clicked.connect(lambda: self.start_worker('stats'))
         self.open_output_btn.clicked.connect(self.open_output_dir)
         self.outfile_edit.textChanged.connect(self._update_open_output_enabled)
-        self.outfile_edit.textChanged.connect(self._update_summary)
-        self.indirs_edit.textChanged.connect(self._update_summary)
+        self.outfile_edit.textChanged.connect(self.schedule_summary)
+        self.indirs_edit.textChanged.connect(lambda: self.invalidate_field('indirs'))
         self.indirs_edit.textChanged.connect(self.schedule_extension_scan)
-        self.exts_edit.textChanged.connect(self._update_summary)
-        self.comment_chars_edit.textChanged.connect(self._update_summary)
-        self.excludes_edit.textChanged.connect(self._update_summary)
-        self.encoding_combo.currentTextChanged.connect(self._update_summary)
-        self.skip_blank_check.toggled.connect(self._update_summary)
-        self.skip_comment_check.toggled.connect(self._update_summary)
+        self.exts_edit.textChanged.connect(lambda: self.invalidate_field('exts'))
+        self.comment_chars_edit.textChanged.connect(lambda: self.invalidate_field('comment_chars'))
+        self.excludes_edit.textChanged.connect(lambda: self.invalidate_field('excludes'))
+        self.excludes_edit.textChanged.connect(self.schedule_tree_excludes)
+        self.indirs_edit.textChanged.connect(self.schedule_file_tree)
+        self.exts_edit.textChanged.connect(self.schedule_file_tree)
+        self.refresh_tree_btn.clicked.connect(self.reload_file_tree)
+        self.tree_model.excludes_changed.connect(self.handle_tree_excludes_changed)
+        self.encoding_combo.currentTextChanged.connect(self.schedule_summary)
+        self.skip_blank_check.toggled.connect(self.schedule_summary)
+        self.skip_comment_check.toggled.connect(self.schedule_summary)
         self.exts_select_btn.clicked.connect(self.open_extension_dialog)
         self.comment_select_btn.clicked.connect(self.open_comment_prefix_dialog)
         self._update_open_output_enabled()
@@ -691,23 +972,88 @@ class GeneratorWindow(QMainWindow):
             self._append_line(self.excludes_edit, file_path)
 
     def load_gitignore_excludes(self):
-        indirs = normalize_items(self.indirs_edit.toPlainText())
+        if self.task_pool.is_running('gitignore'):
+            self.task_pool.cancel('gitignore')
+            self._set_gitignore_loading(False)
+            self.status_label.setText('已取消读取 .gitignore')
+            return
+        indirs = list(self.get_field_items('indirs'))
         if not indirs:
             self._notify('warning', '未选择源码目录', '请先添加源码目录')
             return
-        excludes = read_gitignore_excludes(indirs)
-        if not excludes:
+        self.gitignore_seen = set(self.get_field_items('excludes'))
+        self.gitignore_added = 0
+        self._set_gitignore_loading(True)
+        self.status_label.setText('正在读取 .gitignore...')
+        self.task_pool.submit(
+            'gitignore', run_gitignore_scan, (indirs,),
+            self.handle_gitignore_finished,
+            self.handle_gitignore_failed,
+            on_progress=self.handle_gitignore_progress
+        )
+
+    def _set_gitignore_loading(self, loading):
+        self.read_gitignore_btn.setText('取消读取' if loading else '读取.gitignore')
+
+    def handle_gitignore_progress(self, progress):
+        lines = [path for path in progress['paths'] if path not in self.gitignore_seen]
+        if lines:
+            self.gitignore_seen.update(lines)
+            self.gitignore_added += len(lines)
+            if self.excludes_edit.toPlainText().strip():
+                self.excludes_edit.append('\n'.join(lines))
+            else:
+                self.excludes_edit.setText('\n'.join(lines))
+        self.status_label.setText('正在读取 .gitignore：已遍历 {} 个目录，新增 {} 条排除路径'.format(
+            progress['dirs'], self.gitignore_added
+        ))
+
+    def handle_gitignore_finished(self, result):
+        self._set_gitignore_loading(False)
+        self.status_label.setText('.gitignore 读取完成：遍历 {} 个目录'.format(result['dirs']))
+        if not self.gitignore_added:
             self._notify('warning', '未读取到排除项', '请确认 .gitignore 是否存在或包含可解析路径')
             return
-        self._append_lines(self.excludes_edit, excludes)
-        self._notify('success', '读取完成', '已添加 {} 条排除路径'.format(len(excludes)))
+        self._notify('success', '读取完成', '已添加 {} 条排除路径'.format(self.gitignore_added))
+
+    def handle_gitignore_failed(self, message):
+        self._set_gitignore_loading(False)
+        self.status_label.setText('读取 .gitignore 失败：{}'.format(message))
+        self._notify('error', '读取失败', message)
+
+    def schedule_file_tree(self):
+        self.tree_timer.start(400)
+
+    def reload_file_tree(self):
+        """
+        按当前的源码目录、后缀与排除路径重新加载文件树（清空已统计的行数）。
+        """
+        self.tree_timer.stop()
+        self.tree_model.set_source(
+            self.get_field_items('indirs'), self.get_field_items('exts'), self.get_field_items('excludes')
+        )
+
+    def schedule_tree_excludes(self):
+        if not self.tree_syncing:
+            self.tree_excludes_timer.start(200)
+
+    def sync_tree_excludes(self):
+        self.tree_model.set_excludes(self.get_field_items('excludes'))
+
+    def handle_tree_excludes_changed(self, excludes):
+        self.tree_syncing = True
+        try:
+            self.excludes_edit.setText('\n'.join(excludes))
+        finally:
+            self.tree_syncing = False
 
     def choose_outfile(self):
         file_path, _ = QFileDialog.getSaveFileName(
-            self, '选择输出文件', self.outfile_edit.text() or os.getcwd(), 'Word 文档 (*.docx)'
+            self, '选择输出文件', self.outfile_edit.text() or os.getcwd(),
+            'Word 文档 (*.docx);;PDF 文档 (*.pdf)'
         )
         if file_path:
-            if not file_path.lower().endswith('.docx'):
+            if not file_path.lower().endswith(OUTPUT_SUFFIXES):
                 file_path += '.docx'
             self.outfile_edit.setText(file_path)
 
@@ -736,22 +1082,41 @@ class GeneratorWindow(QMainWindow):
         else:
             widget.setText(text)
 
-    def _append_lines(self, widget, lines):
-        current = normalize_items(widget.toPlainText())
-        merged = current[:]
-        for item in lines:
-            if item not in merged:
-                merged.append(item)
-        widget.setText('\n'.join(merged))
+    def invalidate_field(self, name):
+        """
+        输入框内容变化：丢弃该字段的解析结果，并合并到下一次概览刷新中。
+        """
+        self.field_items.pop(name, None)
+        self.schedule_summary()
+
+    def schedule_summary(self):
+        self.summary_timer.start(200)
+
+    def get_field_items(self, name):
+        """
+        返回列表类字段（indirs/exts/comment_chars/excludes）的解析结果；仅在内容变化后重新解析。
+        """
+        items = self.field_items.get(name)
+        if items is None:
+            if name == 'indirs':
+                items = normalize_items(self.indirs_edit.toPlainText())
+            elif name == 'exts':
+                items = normalize_exts(normalize_items(self.exts_edit.text()))
+            elif name == 'comment_chars':
+                items = normalize_items(self.comment_chars_edit.text())
+            else:
+                items = normalize_items(self.excludes_edit.toPlainText())
+            self.field_items[name] = items
+        return items
 
     def build_config(self):
-        indirs = normalize_items(self.indirs_edit.toPlainText())
-        exts = normalize_exts(normalize_items(self.exts_edit.text()))
-        comment_chars = normalize_items(self.comment_chars_edit.text())
-        excludes = normalize_items(self.excludes_edit.toPlainText())
+        indirs = list(self.get_field_items('indirs'))
+        exts = list(self.get_field_items('exts'))
+        comment_chars = list(self.get_field_items('comment_chars'))
+        excludes = list(self.get_field_items('excludes'))
         title = self.title_edit.text().strip() or '软件著作权程序鉴别材料生成器V1.0'
         outfile = self.outfile_edit.text().strip() or os.path.abspath('code.docx')
-        if not outfile.lower().endswith('.docx'):
+        if not outfile.lower().endswith(OUTPUT_SUFFIXES):
             outfile += '.docx'
         template_path = self.template_edit.text().strip() or None
         encoding = self.encoding_combo.currentText().strip() or 'utf-8'
@@ -772,7 +1137,9 @@ class GeneratorWindow(QMainWindow):
             'template_path': template_path,
             'skip_blank_lines': self.skip_blank_check.isChecked(),
             'skip_comment_lines': self.skip_comment_check.isChecked(),
-            'encoding': encoding
+            'encoding': encoding,
+            'line_numbers': self.line_numbers_check.isChecked(),
+            'line_number_restart': LINE_NUMBER_RESTART_LABELS[self.line_number_restart_combo.currentText()]
         }
 
     def schedule_extension_scan(self):
@@ -781,38 +1148,48 @@ class GeneratorWindow(QMainWindow):
         self.ext_scan_timer.start(300)
 
     def start_extension_scan(self):
-        if self.ext_worker and self.ext_worker.isRunning():
-            self.pending_ext_scan = True
-            return
         config = self.build_config()
+        self.ext_stats = {}
+        self.available_exts = []
         if not config['indirs']:
-            self.available_exts = []
+            self.task_pool.cancel('extensions')
             return
         excludes = normalize_paths(config['excludes'])
-        self.ext_worker = ExtensionScanWorker(config['indirs'], excludes)
-        self.ext_worker.finished.connect(self.handle_extension_scan_finished)
-        self.ext_worker.failed.connect(self.handle_extension_scan_failed)
-        self.ext_worker.start()
+        self.task_pool.submit(
+            'extensions', run_extension_scan, (config['indirs'], excludes),
+            self.handle_extension_scan_finished,
+            self.handle_extension_scan_failed,
+            on_progress=self.handle_extension_scan_progress
+        )
 
-    def handle_extension_scan_finished(self, exts):
-        self.available_exts = exts
-        if self.pending_ext_scan:
-            self.pending_ext_scan = False
-            self.start_extension_scan()
+    def handle_extension_scan_progress(self, progress):
+        self.ext_stats.update(progress['stats'])
+        self.available_exts = sorted(self.ext_stats)
+        if self.ext_dialog is not None:
+            self.ext_dialog.update_stats(progress['stats'])
+
+    def handle_extension_scan_finished(self, result):
+        self.ext_stats = result['stats']
+        self.available_exts = sorted(self.ext_stats)
+        if self.ext_dialog is not None:
+            self.ext_dialog.update_stats(self.ext_stats, result['dirs'])
 
     def handle_extension_scan_failed(self, message):
         self._notify('warning', '后缀扫描失败', message)
-        if self.pending_ext_scan:
-            self.pending_ext_scan = False
-            self.start_extension_scan()
 
     def open_extension_dialog(self):
-        if not self.available_exts:
+        scanning = self.task_pool.is_running('extensions')
+        if not self.available_exts and not scanning:
             self._notify('warning', '暂无可选后缀', '请先添加源码目录以自动收集后缀')
             return
-        current = set(normalize_exts(normalize_items(self.exts_edit.text())))
-        dialog = ExtensionSelectDialog(self.available_exts, current, self)
-        if dialog.exec_() == QDialog.Accepted:
+        current = set(self.get_field_items('exts'))
+        dialog = ExtensionSelectDialog(self.ext_stats, current, self, scanning=scanning)
+        self.ext_dialog = dialog
+        try:
+            accepted = dialog.exec_() == QDialog.Accepted
+        finally:
+            self.ext_dialog = None
+        if accepted:
             selected = dialog.get_selected()
             self.exts_edit.setText(', '.join(selected))
 
@@ -827,7 +1204,7 @@ class GeneratorWindow(QMainWindow):
         return langs
 
     def _get_selected_languages_from_prefixes(self):
-        current_prefixes = normalize_items(self.comment_chars_edit.text())
+        current_prefixes = list(self.get_field_items('comment_chars'))
         selected_langs = []
         for lang, prefixes in COMMENT_PREFIX_BY_LANG.items():
             if any(prefix in current_prefixes for prefix in prefixes):
@@ -842,6 +1219,7 @@ class GeneratorWindow(QMainWindow):
             self.comment_chars_edit.setText(', '.join(prefixes))
 
     def _update_summary(self):
+        self.summary_timer.stop()
         config = self.build_config()
         indir_count = len(config['indirs'])
         ext_count = len(config['exts'])
@@ -865,6 +1243,21 @@ class GeneratorWindow(QMainWindow):
             '输出路径：{}'.format(output_path),
             '上次扫描：{} 个文件'.format(self.last_scan_count)
         ]
+        if self.last_code_stats:
+            totals = self.last_code_stats['totals']
+            summary.append('上次统计：{} 个文件，{} 行（原始 {} 行），预计 {} 页'.format(
+                totals['files'], totals['lines'], totals['raw_lines'], totals['page_count']
+            ))
+            by_ext = self.last_code_stats['by_ext']
+            for ext in sorted(by_ext, key=lambda key: -by_ext[key]['lines'])[:8]:
+                bucket = by_ext[ext]
+                summary.append('  {}：{} 个文件，{} 行，约 {} 页'.format(
+                    ext, bucket['files'], bucket['lines'], bucket['pages']
+                ))
+        stage_lines = format_stage_summary(self.last_stats)
+        if stage_lines:
+            summary.append('上次生成耗时：')
+            summary.extend('  ' + line for line in stage_lines)
         self.summary_body.setText('\n'.join(summary))
 
     def eventFilter(self, obj, event):
@@ -878,8 +1271,8 @@ class GeneratorWindow(QMainWindow):
         return super().eventFilter(obj, event)
 
     def start_worker(self, mode):
-        if self.worker and self.worker.isRunning():
-            self._notify('warning', '任务进行中', '请等待当前任务完成后再操作')
+        if mode == 'generate' and self.task_pool.is_running('generate'):
+            self._notify('warning', '任务进行中', '请等待当前生成任务完成后再操作')
             return
         config = self.build_config()
         valid, message = self._validate_inputs(config, mode)
@@ -889,24 +1282,51 @@ class GeneratorWindow(QMainWindow):
         if not config['exts']:
             self._notify('warning', '未选择后缀', '请点击“选择”添加文件后缀')
             return
-        self.set_buttons_enabled(False)
+        args = (config,)
+        if mode == 'generate':
+            args = (self.get_generation_pipeline(config), config)
+            self.set_buttons_enabled(False)
         if mode == 'scan':
             self.status_label.setText('正在扫描文件，请稍候...')
             self.summary_title.setText('正在扫描文件')
+        elif mode == 'stats':
+            self.status_label.setText('正在统计行数，请稍候...')
+            self.summary_title.setText('正在统计行数')
         else:
             self.status_label.setText('正在生成文档，请稍候...')
             self.summary_title.setText('正在生成文档')
-        self.worker = GenerateWorker(config, mode)
-        self.worker.finished.connect(self.handle_finished)
-        self.worker.failed.connect(self.handle_failed)
-        self.worker.start()
+        runners = {
+            'scan': run_file_scan,
+            'stats': run_code_stats,
+            'generate': run_generate
+        }
+        self.task_pool.submit(
+            mode, runners[mode], args,
+            self.handle_finished,
+            lambda message: self.handle_failed(message, mode)
+        )
+
+    def get_generation_pipeline(self, config):
+        """
+        返回用于生成的 CodeDocPipeline：配置未变化时复用上次的流水线（保留常驻的 git 进程等），
+        否则关闭旧流水线并按新配置重建。
+        """
+        options = pipeline_options(config)
+        options['cache'] = self.generation_cache
+        if self.generation_pipeline is None or options != self.generation_pipeline_options:
+            if self.generation_pipeline is not None:
+                self.generation_pipeline.close()
+            self.generation_pipeline = CodeDocPipeline(**options)
+            self.generation_pipeline_options = options
+        return self.generation_pipeline
 
     def handle_finished(self, result):
-        self.set_buttons_enabled(True)
         if result.get('mode') == 'scan':
             self.last_scan_count = result.get('file_count', 0)
             self._update_summary()
-            self.status_label.setText('扫描完成，共找到 {} 个文件'.format(self.last_scan_count))
+            self.status_label.setText('扫描完成，共找到 {} 个文件（{:.1f} MB）'.format(
+                self.last_scan_count, result.get('bytes', 0) / 1048576.0
+            ))
             self.summary_title.setText('扫描完成')
             InfoBar.success(
                 title='扫描完成',
@@ -916,6 +1336,24 @@ class GeneratorWindow(QMainWindow):
                 parent=self
             )
             return
+        if result.get('mode') == 'stats':
+            self.last_code_stats = result
+            self.last_scan_count = result.get('file_count', 0)
+            self._update_summary()
+            totals = result['totals']
+            self.status_label.setText('统计完成，共 {} 个文件，{} 行'.format(totals['files'], totals['lines']))
+            self.summary_title.setText('统计完成')
+            InfoBar.success(
+                title='统计完成',
+                content='过滤后共 {} 行，预计 {} 页'.format(totals['lines'], totals['page_count']),
+                duration=3000,
+                position=InfoBarPosition.TOP,
+                parent=self
+            )
+            return
+        self.set_buttons_enabled(True)
+        self.last_stats = result.get('stats')
+        self._update_summary()
         self.status_label.setText('生成完成，共写入 {} 个文件'.format(result.get('file_count', 0)))
         self.summary_title.setText('生成完成')
         InfoBar.success(
@@ -927,8 +1365,9 @@ class GeneratorWindow(QMainWindow):
         )
         self._update_open_output_enabled()
 
-    def handle_failed(self, message):
-        self.set_buttons_enabled(True)
+    def handle_failed(self, message, mode='generate'):
+        if mode == 'generate':
+            self.set_buttons_enabled(True)
         self.status_label.setText('失败：{}'.format(message))
         self.summary_title.setText('任务失败')
         InfoBar.error(
@@ -940,7 +1379,6 @@ class GeneratorWindow(QMainWindow):
         )
 
     def set_buttons_enabled(self, enabled):
-        self.scan_btn.setEnabled(enabled)
         self.generate_btn.setEnabled(enabled)
         self.open_output_btn.setEnabled(enabled)
 
@@ -950,6 +1388,8 @@ class GeneratorWindow(QMainWindow):
         self.space_before_spin.setValue(0.0)
         self.space_after_spin.setValue(2.3)
         self.line_spacing_spin.setValue(10.5)
+        self.line_numbers_check.setChecked(False)
+        self.line_number_restart_combo.setCurrentIndex(0)
 
     def _notify(self, level, title, content):
         if level == 'success':
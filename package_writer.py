@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+docx（OPC/ZIP）包写出：可选压缩级别，大部件在后台线程中分块并行压缩。
+
+python-docx 的 Document.save 使用 zipfile 以默认级别单线程压缩全部部件，
+正文 document.xml 达到上百 MB 时压缩占据保存阶段的大部分时间。
+这里按部件自行写出 ZIP：小部件直接压缩写入，大部件切分为定长块交给线程池
+（zlib 压缩期间释放 GIL），各块以 Z_SYNC_FLUSH 结束后顺序拼接为合法的 deflate 流。
+输出只顺序写入、从不回退，因此也可写入不可 seek 的流。
+部件按调用顺序写入（后台压缩的部件之后调用写入的部件会排在其后），可复现模式下按部件名排序、使用固定时间戳。
+"""
+import os
+import struct
+import time
+import zlib
+
+COMPRESSION_LEVELS = {
+    'store': None,
+    'fast': 1,
+    'default': 6,
+    'max': 9
+}
+PARALLEL_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP_MAX_SIZE = 0xFFFFFFFF
+REPRODUCIBLE_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+
+def reproducible_date_time():
+    """
+    可复现输出使用的固定时间：设置了 SOURCE_DATE_EPOCH 时取该时间（UTC），否则为 1980-01-01 00:00:00。
+
+    Returns:
+        (年, 月, 日, 时, 分, 秒)
+    """
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch and epoch.isdigit():
+        return tuple(time.gmtime(int(epoch))[:6])
+    return REPRODUCIBLE_DATE_TIME
+
+
+def dos_date_time(timestamp=None):
+    """
+    将时间戳（或 (年, 月, 日, 时, 分, 秒) 元组）转换为 ZIP 使用的 DOS 日期与时间。
+    """
+    if isinstance(timestamp, tuple):
+        year, month, day, hour, minute, second = timestamp
+    else:
+        year, month, day, hour, minute, second = time.localtime(timestamp)[:6]
+    year = max(year, 1980)
+    return (
+        (year - 1980) << 9 | month << 5 | day,
+        hour << 11 | minute << 5 | second // 2
+    )
+
+
+def _deflate_chunk(chunk, level, last):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def deflate(data, level, executor=None, chunk_size=CHUNK_SIZE):
+    """
+    以原始 deflate 格式压缩数据；提供线程池时分块并行压缩。
+
+    Args:
+        data: 待压缩的 bytes
+        level: zlib 压缩级别（1-9）
+        executor: concurrent.futures 执行器；为空则在当前线程内一次压缩
+        chunk_size: 分块大小
+
+    Returns:
+        (压缩后的 bytes, CRC32)
+    """
+    if executor is None or len(data) <= chunk_size:
+        return _deflate_chunk(data, level, True), zlib.crc32(data)
+    view = memoryview(data)
+    offsets = range(0, len(data), chunk_size)
+    crc = executor.submit(zlib.crc32, view)
+    chunks = [
+        executor.submit(_deflate_chunk, view[offset:offset + chunk_size], level, offset + chunk_size >= len(data))
+        for offset in offsets
+    ]
+    return b''.join(chunk.result() for chunk in chunks), crc.result()
+
+
+class ZipPackageWriter(object):
+    """
+    顺序写出 ZIP 包（不使用 ZIP64，单个部件不超过 4GB）。
+
+    Args:
+        file: 输出路径或可写的二进制流
+        compression: 压缩级别：'store'、'fast'、'default' 或 'max'
+        jobs: 大部件并行压缩的线程数；为空则按 CPU 核数，1 表示不使用后台线程
+        date_time: 条目修改时间的时间戳或 (年, 月, 日, 时, 分, 秒) 元组；为空则使用当前时间
+        comment: ZIP 包注释（bytes）
+
+    Raises:
+        ValueError: 压缩级别不合法
+    """
+    def __init__(self, file, compression='default', jobs=None, date_time=None, comment=b''):
+        if compression not in COMPRESSION_LEVELS:
+            raise ValueError('不支持的压缩级别：{}'.format(compression))
+        self.level = COMPRESSION_LEVELS[compression]
+        self.jobs = jobs if jobs else (os.cpu_count() or 1)
+        self.date, self.time = dos_date_time(date_time)
+        self.comment = comment
+        if hasattr(file, 'write'):
+            self._fp = file
+            self._owns_fp = False
+        else:
+            self._fp = open(file, 'wb')
+            self._owns_fp = True
+        self._offset = 0
+        self._entries = []
+        self._pending = []
+        self._executor = None
+        self._coordinator = None
+
+    def _get_executor(self):
+        if self._executor is None and self.jobs > 1:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.jobs)
+            # 分派与收集分块的线程独立于压缩线程池，避免等待分块时占满线程池
+            self._coordinator = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    def _write(self, data):
+        self._fp.write(data)
+        self._offset += len(data)
+
+    def _write_entry(self, name, size, method, payload, crc):
+        if size > ZIP_MAX_SIZE or len(payload) > ZIP_MAX_SIZE:
+            raise ValueError('部件过大（超过 4GB）：{}'.format(name))
+        encoded = name.encode('utf-8')
+        flags = 0x800 if not name.isascii() else 0
+        self._entries.append((encoded, flags, method, crc, len(payload), size, self._offset))
+        self._write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 20, flags, method, self.time, self.date,
+            crc, len(payload), size, len(encoded), 0
+        ))
+        self._write(encoded)
+        self._write(payload)
+
+    def write(self, name, data):
+        """
+        压缩并写入一个部件；之前有后台压缩中的部件时暂存，close 时按调用顺序写入。
+        """
+        if self.level is None:
+            method, payload, crc = ZIP_STORED, data, zlib.crc32(data)
+        else:
+            method = ZIP_DEFLATED
+            payload, crc = deflate(data, self.level)
+        if self._pending:
+            self._pending.append((name, len(data), method, (payload, crc)))
+        else:
+            self._write_entry(name, len(data), method, payload, crc)
+
+    def write_async(self, name, data):
+        """
+        在后台线程中分块压缩部件，先继续写入其它部件，close 时再写入该部件。
+        """
+        executor = self._get_executor()
+        if self.level is None or executor is None:
+            self.write(name, data)
+            return
+        future = self._coordinator.submit(deflate, data, self.level, executor)
+        self._pending.append((name, len(data), ZIP_DEFLATED, future))
+
+    def close(self):
+        """
+        写入后台压缩的部件与中央目录；传入路径时关闭文件。
+        """
+        try:
+            for name, size, method, result in self._pending:
+                payload, crc = result.result() if hasattr(result, 'result') else result
+                self._write_entry(name, size, method, payload, crc)
+            self._pending = []
+            start = self._offset
+            for encoded, flags, method, crc, compressed, size, offset in self._entries:
+                self._write(struct.pack(
+                    '<IHHHHHHIIIHHHHHII', 0x02014b50, 20, 20, flags, method, self.time, self.date,
+                    crc, compressed, size, len(encoded), 0, 0, 0, 0, 0o600 << 16, offset
+                ))
+                self._write(encoded)
+            self._write(struct.pack(
+                '<IHHHHIIH', 0x06054b50, 0, 0, len(self._entries), len(self._entries),
+                self._offset - start, start, len(self.comment)
+            ))
+            self._write(self.comment)
+            self._fp.flush()
+        finally:
+            if self._executor is not None:
+                self._coordinator.shutdown(wait=True)
+                self._executor.shutdown(wait=True)
+                self._executor = None
+                self._coordinator = None
+            if self._owns_fp:
+                self._fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def save_document(document, file, compression='default', jobs=None, blobs=None, reproducible=False, comment=b''):
+    """
+    按指定压缩级别保存 python-docx 文档；超过 PARALLEL_THRESHOLD 的部件（通常为正文）在后台并行压缩。
+
+    Args:
+        document: python-docx 的 Document 对象
+        file: 输出路径或可写的二进制流
+        compression: 压缩级别：'store'、'fast'、'default' 或 'max'
+        jobs: 并行压缩的线程数
+        blobs: 可选，{部件名: bytes}，替换对应部件序列化后的内容（如拼接了预生成段落的正文）
+        reproducible: 是否按部件名排序写入并使用固定时间戳（见 reproducible_date_time）
+        comment: ZIP 包注释（bytes）
+    """
+    blobs = blobs or {}
+    from docx.opc.packuri import PACKAGE_URI
+    from docx.opc.pkgwriter import _ContentTypesItem
+    package = document.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+    members = [
+        ('[Content_Types].xml', _ContentTypesItem.from_parts(parts).blob),
+        (PACKAGE_URI.rels_uri.membername, package.rels.xml)
+    ]
+    for part in parts:
+        blob = blobs.get(part.partname)
+        members.append((part.partname.membername, blob if blob is not None else part.blob))
+        if len(part.rels):
+            members.append((part.partname.rels_uri.membername, part.rels.xml))
+    date_time = None
+    if reproducible:
+        # [Content_Types].xml 按字节序排在其它部件之前
+        members.sort(key=lambda member: member[0].encode('utf-8'))
+        date_time = reproducible_date_time()
+    with ZipPackageWriter(file, compression=compression, jobs=jobs, date_time=date_time, comment=comment) as writer:
+        for name, blob in members:
+            if len(blob) > PARALLEL_THRESHOLD:
+                writer.write_async(name, blob)
+            else:
+                writer.write(name, blob)
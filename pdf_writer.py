@@ -0,0 +1,647 @@
+# -*- coding: utf-8 -*-
+"""
+PDF 输出后端：按固定网格排版过滤后的代码行，逐页写入磁盘，并嵌入子集化的 TrueType 字体。
+
+仅依赖标准库。与 CodeWriter 提供相同的 write_header / write_file / save 接口，
+由 generate_code_doc 在输出 .pdf 时按需导入。
+"""
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from functools import lru_cache
+
+from core import (
+    PageLayout, StageProfiler, DEFAULT_COMMENT_CHARS, DEFAULT_TAB_STOP,
+    read_code_lines
+)
+
+logger = logging.getLogger(__name__)
+
+FONT_FILES_BY_NAME = {
+    '宋体': ['simsun.ttc', 'simsun.ttf', 'uming.ttc', 'wqy-zenhei.ttc'],
+    '黑体': ['simhei.ttf', 'wqy-zenhei.ttc'],
+    '微软雅黑': ['msyh.ttc', 'msyh.ttf', 'wqy-microhei.ttc'],
+    '仿宋': ['simfang.ttf'],
+    '楷体': ['simkai.ttf'],
+    'Arial': ['arial.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf', 'DejaVuSans.ttf'],
+    'Times New Roman': ['times.ttf', 'Times New Roman.ttf', 'LiberationSerif-Regular.ttf', 'DejaVuSerif.ttf']
+}
+FONT_DIRS = [
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+    os.path.expanduser('~/Library/Fonts'),
+    '/Library/Fonts',
+    '/System/Library/Fonts',
+    os.path.expanduser('~/.local/share/fonts'),
+    os.path.expanduser('~/.fonts'),
+    '/usr/local/share/fonts',
+    '/usr/share/fonts'
+]
+FALLBACK_CID_FONT = 'STSong-Light'
+HEADER_DISTANCE = 36.0
+BASELINE_RATIO = 0.8
+
+
+@lru_cache(maxsize=None)
+def find_font_file(font_name):
+    """
+    在常见系统字体目录中查找字体名对应的字体文件。
+
+    Args:
+        font_name: 字体名（如 '宋体'）或字体文件名
+
+    Returns:
+        字体文件路径；未找到返回 None
+    """
+    candidates = [name.lower() for name in FONT_FILES_BY_NAME.get(font_name, [])]
+    candidates.append(font_name.lower())
+    for directory in FONT_DIRS:
+        if not os.path.isdir(directory):
+            continue
+        for root, dirs, files in os.walk(directory):
+            lowered = {name.lower(): name for name in files}
+            for candidate in candidates:
+                for suffix in ('', '.ttf', '.ttc'):
+                    name = lowered.get(candidate + suffix)
+                    if name:
+                        return os.path.join(root, name)
+    return None
+
+
+class TrueTypeFont(object):
+    """
+    读取 TrueType（glyf 轮廓）字体或字体集合中的一个字体，支持按字形子集化。
+
+    子集化保留原有字形编号（未使用的字形置空），因此 PDF 中可直接使用 Identity 映射。
+    """
+    def __init__(self, path, index=0):
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        offset = 0
+        if data[:4] == b'ttcf':
+            count = struct.unpack('>I', data[8:12])[0]
+            index = index if index < count else 0
+            offset = struct.unpack('>I', data[12 + 4 * index:16 + 4 * index])[0]
+        num_tables = struct.unpack('>H', data[offset + 4:offset + 6])[0]
+        self.tables = {}
+        for i in range(num_tables):
+            record = offset + 12 + 16 * i
+            tag, _, table_offset, length = struct.unpack('>4sIII', data[record:record + 16])
+            self.tables[tag.decode('latin-1')] = data[table_offset:table_offset + length]
+        for tag in ('head', 'hhea', 'maxp', 'hmtx', 'loca', 'glyf', 'cmap'):
+            if tag not in self.tables:
+                raise RuntimeError('不支持的字体文件（缺少 {} 表，仅支持 TrueType 轮廓字体）：{}'.format(tag, path))
+        head = self.tables['head']
+        self.units_per_em = struct.unpack('>H', head[18:20])[0]
+        self.bbox = struct.unpack('>hhhh', head[36:44])
+        index_to_loc_format = struct.unpack('>h', head[50:52])[0]
+        hhea = self.tables['hhea']
+        self.ascent, self.descent = struct.unpack('>hh', hhea[4:8])
+        self.number_of_hmetrics = struct.unpack('>H', hhea[34:36])[0]
+        self.num_glyphs = struct.unpack('>H', self.tables['maxp'][4:6])[0]
+        loca = self.tables['loca']
+        if index_to_loc_format == 0:
+            self.offsets = [value * 2 for value in struct.unpack('>%dH' % (self.num_glyphs + 1), loca[:2 * (self.num_glyphs + 1)])]
+        else:
+            self.offsets = list(struct.unpack('>%dI' % (self.num_glyphs + 1), loca[:4 * (self.num_glyphs + 1)]))
+        self.cmap = self._parse_cmap(self.tables['cmap'])
+        self.name = self._parse_postscript_name(self.tables.get('name', b'')) or 'CodeFont'
+
+    @staticmethod
+    def _parse_cmap(table):
+        count = struct.unpack('>H', table[2:4])[0]
+        subtables = {}
+        for i in range(count):
+            platform, encoding, offset = struct.unpack('>HHI', table[4 + 8 * i:12 + 8 * i])
+            subtables[(platform, encoding)] = offset
+        for key in ((3, 10), (0, 4), (3, 1), (0, 3), (0, 1), (0, 0)):
+            if key not in subtables:
+                continue
+            offset = subtables[key]
+            fmt = struct.unpack('>H', table[offset:offset + 2])[0]
+            if fmt == 12:
+                return TrueTypeFont._parse_cmap_format12(table, offset)
+            if fmt == 4:
+                return TrueTypeFont._parse_cmap_format4(table, offset)
+        return {}
+
+    @staticmethod
+    def _parse_cmap_format4(table, offset):
+        seg_count = struct.unpack('>H', table[offset + 6:offset + 8])[0] // 2
+        ends_at = offset + 14
+        starts_at = ends_at + 2 * seg_count + 2
+        deltas_at = starts_at + 2 * seg_count
+        ranges_at = deltas_at + 2 * seg_count
+        ends = struct.unpack('>%dH' % seg_count, table[ends_at:ends_at + 2 * seg_count])
+        starts = struct.unpack('>%dH' % seg_count, table[starts_at:starts_at + 2 * seg_count])
+        deltas = struct.unpack('>%dh' % seg_count, table[deltas_at:deltas_at + 2 * seg_count])
+        ranges = struct.unpack('>%dH' % seg_count, table[ranges_at:ranges_at + 2 * seg_count])
+        mapping = {}
+        for i in range(seg_count):
+            start, end, delta, range_offset = starts[i], ends[i], deltas[i], ranges[i]
+            if start == 0xFFFF:
+                continue
+            for code in range(start, end + 1):
+                if range_offset == 0:
+                    glyph = (code + delta) & 0xFFFF
+                else:
+                    position = ranges_at + 2 * i + range_offset + 2 * (code - start)
+                    glyph = struct.unpack('>H', table[position:position + 2])[0]
+                    if glyph:
+                        glyph = (glyph + delta) & 0xFFFF
+                if glyph:
+                    mapping[code] = glyph
+        return mapping
+
+    @staticmethod
+    def _parse_cmap_format12(table, offset):
+        groups = struct.unpack('>I', table[offset + 12:offset + 16])[0]
+        mapping = {}
+        for i in range(groups):
+            position = offset + 16 + 12 * i
+            start, end, glyph = struct.unpack('>III', table[position:position + 12])
+            for code in range(start, end + 1):
+                mapping[code] = glyph + code - start
+        return mapping
+
+    @staticmethod
+    def _parse_postscript_name(table):
+        if len(table) < 6:
+            return ''
+        count, storage = struct.unpack('>HH', table[2:6])
+        for i in range(count):
+            record = 6 + 12 * i
+            platform, encoding, _, name_id, length, offset = struct.unpack('>HHHHHH', table[record:record + 12])
+            if name_id != 6:
+                continue
+            raw = table[storage + offset:storage + offset + length]
+            name = raw.decode('utf-16-be', 'ignore') if platform in (0, 3) else raw.decode('latin-1')
+            name = ''.join(ch for ch in name if ch.isalnum() or ch in '-_')
+            if name:
+                return name
+        return ''
+
+    def glyph_id(self, char):
+        return self.cmap.get(ord(char), 0)
+
+    def _glyph_data(self, glyph):
+        return self.tables['glyf'][self.offsets[glyph]:self.offsets[glyph + 1]]
+
+    def _components(self, glyph):
+        data = self._glyph_data(glyph)
+        if len(data) < 10 or struct.unpack('>h', data[:2])[0] >= 0:
+            return []
+        components = []
+        position = 10
+        while True:
+            flags, component = struct.unpack('>HH', data[position:position + 4])
+            components.append(component)
+            position += 4 + (4 if flags & 0x0001 else 2)
+            if flags & 0x0008:
+                position += 2
+            elif flags & 0x0040:
+                position += 4
+            elif flags & 0x0080:
+                position += 8
+            if not flags & 0x0020:
+                return components
+
+    def subset(self, glyphs):
+        """
+        生成仅包含指定字形（及其复合字形组件）的字体文件数据。
+
+        Args:
+            glyphs: 需要保留的字形编号集合
+
+        Returns:
+            TrueType 字体文件的 bytes
+        """
+        keep = {0}
+        pending = [glyph for glyph in glyphs if glyph < self.num_glyphs]
+        while pending:
+            glyph = pending.pop()
+            if glyph in keep:
+                continue
+            keep.add(glyph)
+            pending.extend(self._components(glyph))
+        num_glyphs = max(keep) + 1
+        glyf = bytearray()
+        loca = []
+        for glyph in range(num_glyphs):
+            loca.append(len(glyf))
+            if glyph in keep:
+                glyf += self._glyph_data(glyph)
+                if len(glyf) % 4:
+                    glyf += b'\0' * (4 - len(glyf) % 4)
+        loca.append(len(glyf))
+        hmetrics = min(self.number_of_hmetrics, num_glyphs)
+        hmtx = self.tables['hmtx']
+        hmtx = hmtx[:4 * hmetrics] + hmtx[4 * self.number_of_hmetrics:4 * self.number_of_hmetrics + 2 * (num_glyphs - hmetrics)]
+        head = bytearray(self.tables['head'])
+        head[8:12] = b'\0\0\0\0'
+        head[50:52] = struct.pack('>h', 1)
+        hhea = bytearray(self.tables['hhea'])
+        hhea[34:36] = struct.pack('>H', hmetrics)
+        maxp = bytearray(self.tables['maxp'])
+        maxp[4:6] = struct.pack('>H', num_glyphs)
+        tables = {
+            'head': bytes(head),
+            'hhea': bytes(hhea),
+            'maxp': bytes(maxp),
+            'hmtx': bytes(hmtx),
+            'loca': struct.pack('>%dI' % len(loca), *loca),
+            'glyf': bytes(glyf)
+        }
+        for tag in ('cvt ', 'fpgm', 'prep'):
+            if tag in self.tables:
+                tables[tag] = self.tables[tag]
+        return self._build_sfnt(tables)
+
+    @staticmethod
+    def _checksum(data):
+        if len(data) % 4:
+            data += b'\0' * (4 - len(data) % 4)
+        return sum(struct.unpack('>%dI' % (len(data) // 4), data)) & 0xFFFFFFFF
+
+    @staticmethod
+    def _build_sfnt(tables):
+        tags = sorted(tables)
+        count = len(tags)
+        power = 1
+        while power * 2 <= count:
+            power *= 2
+        header = struct.pack('>IHHHH', 0x00010000, count, power * 16, power.bit_length() - 1, count * 16 - power * 16)
+        directory = b''
+        body = b''
+        offset = 12 + 16 * count
+        head_offset = 0
+        for tag in tags:
+            data = tables[tag]
+            if tag == 'head':
+                head_offset = offset + len(body)
+            directory += struct.pack('>4sIII', tag.encode('latin-1'), TrueTypeFont._checksum(data), offset + len(body), len(data))
+            body += data
+            if len(body) % 4:
+                body += b'\0' * (4 - len(body) % 4)
+        font = bytearray(header + directory + body)
+        adjustment = (0xB1B0AFBA - TrueTypeFont._checksum(bytes(font))) & 0xFFFFFFFF
+        font[head_offset + 8:head_offset + 12] = struct.pack('>I', adjustment)
+        return bytes(font)
+
+
+class PdfCodeWriter(object):
+    """
+    将源码文件按行写入 PDF 文档（固定网格排版）。
+
+    与 CodeWriter 一致地使用字体、字号、段前/段后/行距与页眉标题；页面尺寸与页边距取自模板。
+    字符按 PageLayout 的网格宽度定位（全角 1 个字号宽，半角半个字号宽），因此分页结果与
+    estimate_pages 的估算一致。每页写完即落盘，字体子集在保存时写入。
+    """
+    def __init__(
+            self, font_name='宋体',
+            font_size=10.5, space_before=0.0,
+            space_after=2.3, line_spacing=10.5,
+            command_chars=None, template_path=None,
+            skip_blank_lines=True, skip_comment_lines=True,
+            encoding='utf-8', font_file=None,
+            outfile=None, profiler=None, line_reader=None
+    ):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.command_chars = command_chars if command_chars else DEFAULT_COMMENT_CHARS
+        self.skip_blank_lines = skip_blank_lines
+        self.skip_comment_lines = skip_comment_lines
+        self.encoding = encoding
+        self.profiler = profiler if profiler else StageProfiler()
+        self.line_reader = line_reader if line_reader else read_code_lines
+        self.layout = PageLayout.from_template(
+            template_path,
+            font_size=font_size,
+            line_spacing=line_spacing,
+            space_before=space_before,
+            space_after=space_after
+        )
+        self.font = None
+        if font_file:
+            self.font = TrueTypeFont(font_file)
+        else:
+            found = find_font_file(font_name)
+            try:
+                self.font = TrueTypeFont(found) if found else None
+            except (OSError, RuntimeError, struct.error) as exc:
+                logger.warning('字体文件 %s 无法嵌入：%s', found, exc)
+            if self.font is None:
+                logger.warning('未找到字体“%s”可嵌入的字体文件，PDF 将使用不嵌入的 %s 字体', font_name, FALLBACK_CID_FONT)
+        self.title = ''
+        self.used_glyphs = {}
+        self.missing_chars = set()
+        self.page_ids = []
+        self.offsets = {}
+        self.next_id = 9
+        self.page_lines = []
+        self.used = 0.0
+        self.outfile = outfile
+        if outfile:
+            self.part_path = outfile + '.part'
+            self.fp = open(self.part_path, 'wb')
+        else:
+            self.part_path = None
+            self.fp = tempfile.TemporaryFile()
+        self.fp.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def write_header(self, title):
+        """
+        设置页眉标题（对之后写入的每一页生效）。
+        """
+        self.title = title
+        return self
+
+    def write_file(self, file):
+        """
+        将单个文件内容按行排版，写满的页立即写入磁盘。
+        """
+        profiler = self.profiler
+        lines, chars, raw_lines = self.line_reader(
+            file, self.encoding,
+            self.skip_blank_lines,
+            self.skip_comment_lines,
+            self.command_chars,
+            profiler
+        )
+        with profiler.stage('render'):
+            for line in lines:
+                self._add_paragraph(self._split_line(line.rstrip()))
+        profiler.count('files')
+        profiler.count('chars', chars)
+        profiler.count('raw_lines', raw_lines)
+        profiler.count('lines', len(lines))
+        return self
+
+    def save(self, file=None):
+        """
+        写入剩余页面、字体与交叉引用表，完成 PDF 文件。
+        """
+        with self.profiler.stage('save'):
+            if self.page_lines or not self.page_ids:
+                self._flush_page()
+            self._write_font()
+            self._write_object(2, '<< /Type /Pages /Kids [{}] /Count {} >>'.format(
+                ' '.join('{} 0 R'.format(page) for page in self.page_ids), len(self.page_ids)
+            ))
+            self._write_object(1, '<< /Type /Catalog /Pages 2 0 R >>')
+            self._write_object(8, '<< /Producer (CCD) /Title {} >>'.format(self._text_string(self.title)))
+            xref_offset = self.fp.tell()
+            count = self.next_id
+            rows = ['xref', '0 {}'.format(count), '0000000000 65535 f ']
+            for number in range(1, count):
+                if number in self.offsets:
+                    rows.append('{:010d} 00000 n '.format(self.offsets[number]))
+                else:
+                    rows.append('0000000000 65535 f ')
+            rows.append('trailer')
+            rows.append('<< /Size {} /Root 1 0 R /Info 8 0 R >>'.format(count))
+            rows.append('startxref')
+            rows.append(str(xref_offset))
+            rows.append('%%EOF\n')
+            self.fp.write('\n'.join(rows).encode('latin-1'))
+            target = file or self.outfile
+            if self.part_path:
+                self.fp.close()
+                os.replace(self.part_path, target)
+            else:
+                self.fp.seek(0)
+                if hasattr(target, 'write'):
+                    shutil.copyfileobj(self.fp, target)
+                else:
+                    with open(target, 'wb') as out:
+                        shutil.copyfileobj(self.fp, out)
+                self.fp.close()
+
+    def discard(self):
+        """
+        放弃生成：关闭并删除临时文件（用于取消任务）。
+        """
+        if not self.fp.closed:
+            self.fp.close()
+        if self.part_path and os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+    def _split_line(self, line):
+        """
+        按网格宽度将一行拆分为若干可视行，每个可视行为 [(x, 文本段), ...]（制表符处断开）。
+        """
+        layout = self.layout
+        rows = []
+        runs = []
+        run = []
+        run_x = 0.0
+        x = 0.0
+        for char in line:
+            if char == '\t':
+                target = (int(x // DEFAULT_TAB_STOP) + 1) * DEFAULT_TAB_STOP
+                if run:
+                    runs.append((run_x, ''.join(run)))
+                    run = []
+                x = run_x = target
+                if x > layout.body_width:
+                    rows.append(runs)
+                    runs = []
+                    x = run_x = 0.0
+                continue
+            width = layout.char_width(char)
+            if x + width > layout.body_width and (run or runs):
+                if run:
+                    runs.append((run_x, ''.join(run)))
+                    run = []
+                rows.append(runs)
+                runs = []
+                x = run_x = 0.0
+            if not run:
+                run_x = x
+            run.append(char)
+            x += width
+        if run:
+            runs.append((run_x, ''.join(run)))
+        rows.append(runs)
+        return rows
+
+    def _add_paragraph(self, rows):
+        layout = self.layout
+        before = layout.space_before
+        index = 0
+        while index < len(rows):
+            available = layout.body_height - self.used - before
+            fit = int(available // layout.line_spacing) if layout.line_spacing > 0 else len(rows)
+            if fit <= 0 and self.used > 0.0:
+                self._flush_page()
+                continue
+            fit = max(1, fit)
+            top = self.used + before
+            for offset, row in enumerate(rows[index:index + fit]):
+                self.page_lines.append((top + offset * layout.line_spacing, row))
+            placed = min(fit, len(rows) - index)
+            index += placed
+            self.used = top + placed * layout.line_spacing
+            before = 0.0
+            if index < len(rows):
+                self._flush_page()
+        self.used += layout.space_after
+
+    def _encode(self, text):
+        if self.font is None:
+            return ''.join('{:04X}'.format(ord(char) if ord(char) < 0x10000 else 0x3F) for char in text)
+        codes = []
+        for char in text:
+            glyph = self.font.glyph_id(char)
+            if glyph and glyph not in self.used_glyphs:
+                self.used_glyphs[glyph] = char
+            codes.append('{:04X}'.format(glyph))
+        return ''.join(codes)
+
+    def _show_text(self, text):
+        """
+        生成显示一段文本的操作符。
+
+        字体中缺少的字符显示为 .notdef（字形 0，宽度为 DW），不写入 used_glyphs 与 ToUnicode，
+        并用 TJ 的位移把其后的字符拉回网格位置；缺少的字符记录在 missing_chars 中，保存时汇总警告。
+        """
+        if self.font is None:
+            return '<{}> Tj'.format(self._encode(text))
+        parts = []
+        run = []
+        for char in text:
+            if self.font.glyph_id(char):
+                run.append(char)
+                continue
+            self.missing_chars.add(char)
+            if run:
+                parts.append('<{}>'.format(self._encode(''.join(run))))
+                run = []
+            parts.append('<0000> {}'.format(1000 - self._grid_width(char)))
+        if not parts:
+            return '<{}> Tj'.format(self._encode(text))
+        if run:
+            parts.append('<{}>'.format(self._encode(''.join(run))))
+        return '[{}] TJ'.format(' '.join(parts))
+
+    def _flush_page(self):
+        layout = self.layout
+        page_width, page_height = layout.page_size
+        top_margin, _, _, left_margin = layout.margins
+        size = self.font_size
+        commands = ['BT', '/F1 {:.2f} Tf'.format(size)]
+        if self.title:
+            title_width = layout.text_width(self.title)
+            x = (page_width - title_width) / 2.0
+            y = page_height - max(HEADER_DISTANCE, top_margin / 2.0)
+            commands.append('1 0 0 1 {:.2f} {:.2f} Tm {}'.format(x, y, self._show_text(self.title)))
+        baseline = layout.line_spacing * BASELINE_RATIO
+        for top, runs in self.page_lines:
+            y = page_height - top_margin - top - baseline
+            for x, text in runs:
+                commands.append('1 0 0 1 {:.2f} {:.2f} Tm {}'.format(left_margin + x, y, self._show_text(text)))
+        commands.append('ET')
+        content = zlib.compress('\n'.join(commands).encode('latin-1'))
+        content_id = self._allocate()
+        page_id = self._allocate()
+        self._write_stream(content_id, '/Filter /FlateDecode', content)
+        self._write_object(page_id, (
+            '<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {:.2f} {:.2f}] '
+            '/Resources << /Font << /F1 3 0 R >> >> /Contents {} 0 R >>'
+        ).format(page_width, page_height, content_id))
+        self.page_ids.append(page_id)
+        self.page_lines = []
+        self.used = 0.0
+
+    def _grid_width(self, char):
+        return int(round(self.layout.char_width(char) / self.font_size * 1000))
+
+    def _write_font(self):
+        if self.missing_chars:
+            logger.warning(
+                '字体 %s 中没有 %d 个字符（如 %s），PDF 中显示为空白框',
+                self.font.name, len(self.missing_chars), ''.join(sorted(self.missing_chars)[:10])
+            )
+        if self.font is None:
+            self._write_object(3, (
+                '<< /Type /Font /Subtype /Type0 /BaseFont /{0} /Encoding /UniGB-UCS2-H '
+                '/DescendantFonts [4 0 R] >>'
+            ).format(FALLBACK_CID_FONT))
+            self._write_object(4, (
+                '<< /Type /Font /Subtype /CIDFontType0 /BaseFont /{0} '
+                '/CIDSystemInfo << /Registry (Adobe) /Ordering (GB1) /Supplement 2 >> '
+                '/FontDescriptor 5 0 R /DW 1000 /W [1 [{1}]] >>'
+            ).format(FALLBACK_CID_FONT, ' '.join(['500'] * 95)))
+            self._write_object(5, (
+                '<< /Type /FontDescriptor /FontName /{0} /Flags 6 /FontBBox [-25 -254 1000 880] '
+                '/ItalicAngle 0 /Ascent 880 /Descent -120 /CapHeight 880 /StemV 93 >>'
+            ).format(FALLBACK_CID_FONT))
+            return
+        font = self.font
+        base_name = 'CCDAAA+' + font.name
+        scale = 1000.0 / font.units_per_em
+        widths = []
+        for glyph in sorted(self.used_glyphs):
+            widths.append('{} [{}]'.format(glyph, self._grid_width(self.used_glyphs[glyph])))
+        self._write_object(3, (
+            '<< /Type /Font /Subtype /Type0 /BaseFont /{0} /Encoding /Identity-H '
+            '/DescendantFonts [4 0 R] /ToUnicode 7 0 R >>'
+        ).format(base_name))
+        self._write_object(4, (
+            '<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{0} '
+            '/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+            '/FontDescriptor 5 0 R /CIDToGIDMap /Identity /DW 1000 /W [{1}] >>'
+        ).format(base_name, ' '.join(widths)))
+        bbox = ' '.join(str(int(value * scale)) for value in font.bbox)
+        self._write_object(5, (
+            '<< /Type /FontDescriptor /FontName /{0} /Flags 4 /FontBBox [{1}] /ItalicAngle 0 '
+            '/Ascent {2} /Descent {3} /CapHeight {2} /StemV 80 /FontFile2 6 0 R >>'
+        ).format(base_name, bbox, int(font.ascent * scale), int(font.descent * scale)))
+        data = font.subset(set(self.used_glyphs))
+        self._write_stream(6, '/Filter /FlateDecode /Length1 {}'.format(len(data)), zlib.compress(data))
+        self._write_stream(7, '', zlib.compress(self._to_unicode_cmap().encode('latin-1')), compressed=True)
+
+    def _to_unicode_cmap(self):
+        entries = sorted(self.used_glyphs.items())
+        rows = [
+            '/CIDInit /ProcSet findresource begin',
+            '12 dict begin',
+            'begincmap',
+            '/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def',
+            '/CMapName /Adobe-Identity-UCS def',
+            '/CMapType 2 def',
+            '1 begincodespacerange',
+            '<0000> <FFFF>',
+            'endcodespacerange'
+        ]
+        for start in range(0, len(entries), 100):
+            chunk = entries[start:start + 100]
+            rows.append('{} beginbfchar'.format(len(chunk)))
+            for glyph, char in chunk:
+                rows.append('<{:04X}> <{}>'.format(glyph, char.encode('utf-16-be').hex().upper()))
+            rows.append('endbfchar')
+        rows.extend(['endcmap', 'CMapName currentdict /CMap defineresource pop', 'end', 'end'])
+        return '\n'.join(rows)
+
+    @staticmethod
+    def _text_string(text):
+        return '<FEFF{}>'.format(text.encode('utf-16-be').hex().upper())
+
+    def _allocate(self):
+        number = self.next_id
+        self.next_id += 1
+        return number
+
+    def _write_object(self, number, body):
+        self.offsets[number] = self.fp.tell()
+        self.fp.write('{} 0 obj\n{}\nendobj\n'.format(number, body).encode('latin-1'))
+
+    def _write_stream(self, number, entries, data, compressed=False):
+        if compressed:
+            entries = (entries + ' /Filter /FlateDecode').strip()
+        self.offsets[number] = self.fp.tell()
+        self.fp.write('{} 0 obj\n<< {} /Length {} >>\nstream\n'.format(number, entries, len(data)).encode('latin-1'))
+        self.fp.write(data)
+        self.fp.write(b'\nendstream\nendobj\n')
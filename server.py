@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+本地服务模式：常驻进程通过 HTTP（TCP 或 Unix socket）接收生成任务并回传文档。
+
+接口：
+    POST /generate  请求体为 generate_code_doc 参数的 JSON（无需 outfile），响应体为生成的文档
+    GET  /health    返回运行状态、排队情况与缓存命中统计
+
+文件索引、过滤后的行与模板在进程内保持缓存（见 GenerationCache、load_template），
+同时运行的任务数受 max_jobs 限制，超过 max_queue 个排队任务时返回 503。
+"""
+import http.client
+import inspect
+import json
+import logging
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import BATCH_JOB_DEFAULTS, GenerationCache, generate_code_doc
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf'
+}
+RESERVED_JOB_KEYS = ('outfile', 'profiler', 'cache', 'volume_by', 'volume_size', 'jobs', 'skip_unchanged')
+JOB_LIST_KEYS = ('indirs', 'exts', 'excludes', 'comment_chars', 'skip_dir_names', 'skip_file_names')
+JOB_NUMBER_KEYS = ('font_size', 'space_before', 'space_after', 'line_spacing')
+JOB_INT_KEYS = ('line_number_start',)
+CHUNK_SIZE = 64 * 1024
+
+
+class ServerBusy(Exception):
+    pass
+
+
+class DocService(object):
+    """
+    任务执行器：校验任务参数、限制并发并复用缓存。
+    """
+    def __init__(self, max_jobs=2, max_queue=16, cache=None):
+        self.max_jobs = max_jobs
+        self.max_queue = max_queue
+        self.cache = cache if cache else GenerationCache()
+        self.allowed_keys = set(inspect.signature(generate_code_doc).parameters) - set(RESERVED_JOB_KEYS)
+        self._slots = threading.BoundedSemaphore(max_jobs)
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+
+    def build_job(self, payload):
+        """
+        将请求 JSON 合并默认值并校验为 generate_code_doc 参数。
+
+        Raises:
+            ValueError: 参数不合法
+        """
+        if not isinstance(payload, dict):
+            raise ValueError('请求体必须是JSON对象')
+        unknown = sorted(set(payload) - self.allowed_keys)
+        if unknown:
+            raise ValueError('未知参数：{}'.format(', '.join(unknown)))
+        job = dict(BATCH_JOB_DEFAULTS)
+        job.update(payload)
+        job.pop('outfile', None)
+        for key in JOB_LIST_KEYS:
+            value = job.get(key)
+            if isinstance(value, str):
+                job[key] = [value]
+            elif value is not None and not (
+                    isinstance(value, list) and all(isinstance(item, str) for item in value)
+            ):
+                raise ValueError('参数{}必须是字符串或字符串列表'.format(key))
+        for key in JOB_NUMBER_KEYS + JOB_INT_KEYS:
+            if key not in job:
+                continue
+            value = job[key]
+            types = int if key in JOB_INT_KEYS else (int, float)
+            if isinstance(value, bool) or not isinstance(value, types):
+                raise ValueError('参数{}必须是{}'.format(key, '整数' if key in JOB_INT_KEYS else '数字'))
+        job['output_format'] = job.get('output_format') or 'docx'
+        if job['output_format'] not in CONTENT_TYPES:
+            raise ValueError('不支持的输出格式：{}'.format(job['output_format']))
+        for indir in job['indirs'] or []:
+            if not os.path.isdir(indir):
+                raise ValueError('无效源码目录：{}'.format(indir))
+        return job
+
+    def run(self, job, outfile):
+        """
+        在并发限制内执行任务，排队过多时抛出 ServerBusy。
+        """
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                raise ServerBusy('排队任务过多，请稍后重试')
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            return generate_code_doc(outfile=outfile, cache=self.cache, **job)
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def status(self):
+        with self._lock:
+            state = {
+                'running': self.running,
+                'waiting': self.waiting,
+                'completed': self.completed,
+                'max_jobs': self.max_jobs,
+                'max_queue': self.max_queue
+            }
+        state['cache'] = self.cache.info()
+        return state
+
+
+class DocRequestHandler(BaseHTTPRequestHandler):
+    server_version = 'CCD'
+
+    def address_string(self):
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return 'unix'
+
+    def log_message(self, format, *args):
+        logger.info('%s %s', self.address_string(), format % args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        self._send_json(200, self.server.service.status())
+
+    def do_POST(self):
+        if self.path != '/generate':
+            self._send_json(404, {'error': 'not found'})
+            return
+        service = self.server.service
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            job = service.build_job(json.loads(self.rfile.read(length).decode('utf-8') or '{}'))
+        except ValueError as exc:
+            self._send_json(400, {'error': str(exc)})
+            return
+        workdir = tempfile.mkdtemp(prefix='ccd-')
+        outfile = os.path.join(workdir, 'code.' + job['output_format'])
+        try:
+            start = time.perf_counter()
+            try:
+                result = service.run(job, outfile)
+            except ServerBusy as exc:
+                self._send_json(503, {'error': str(exc)})
+                return
+            except Exception as exc:
+                logger.exception('生成失败')
+                self._send_json(500, {'error': str(exc)})
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPES[job['output_format']])
+            self.send_header('Content-Length', str(os.path.getsize(outfile)))
+            self.send_header('Content-Disposition', 'attachment; filename="code.{}"'.format(job['output_format']))
+            self.send_header('X-CCD-File-Count', str(result['file_count']))
+            self.send_header('X-CCD-Elapsed', '{:.3f}'.format(time.perf_counter() - start))
+            self.end_headers()
+            with open(outfile, 'rb') as fp:
+                shutil.copyfileobj(fp, self.wfile, CHUNK_SIZE)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+class DocHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, DocRequestHandler)
+        self.service = service
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class DocUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, path, service):
+            if os.path.exists(path):
+                os.remove(path)
+            super().__init__(path, DocRequestHandler)
+            self.service = service
+
+
+def create_server(host='127.0.0.1', port=8765, socket_path=None, max_jobs=2, max_queue=16):
+    """
+    创建服务实例（未启动），便于在测试或其它进程中嵌入。
+
+    Args:
+        host/port: TCP 监听地址；port 为 0 时由系统分配
+        socket_path: Unix socket 路径；提供时忽略 host/port
+        max_jobs: 同时运行的任务数
+        max_queue: 允许排队的任务数
+    """
+    service = DocService(max_jobs=max_jobs, max_queue=max_queue)
+    if socket_path:
+        return DocUnixServer(socket_path, service)
+    return DocHTTPServer((host, port), service)
+
+
+def serve(host='127.0.0.1', port=8765, socket_path=None, max_jobs=2, max_queue=16):
+    """
+    启动服务并阻塞运行，直到收到 KeyboardInterrupt。
+    """
+    server = create_server(host, port, socket_path, max_jobs, max_queue)
+    where = socket_path if socket_path else 'http://{}:{}'.format(*server.server_address[:2])
+    logger.info('CCD 服务已启动：%s', where)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def request_document(job, out, host='127.0.0.1', port=8765, socket_path=None, timeout=None):
+    """
+    客户端：提交任务并将返回的文档流式写入 out。
+
+    Args:
+        job: generate_code_doc 参数（dict，无需 outfile）
+        out: 输出文件路径或可写的二进制流
+        host/port/socket_path: 服务地址
+        timeout: 超时时间（秒）
+
+    Returns:
+        dict：file_count 与 elapsed
+
+    Raises:
+        RuntimeError: 服务返回错误
+    """
+    if socket_path:
+        connection = UnixHTTPConnection(socket_path, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(job, ensure_ascii=False).encode('utf-8')
+        connection.request('POST', '/generate', body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            message = response.read().decode('utf-8', 'ignore')
+            try:
+                message = json.loads(message).get('error', message)
+            except ValueError:
+                pass
+            raise RuntimeError('服务返回 {}：{}'.format(response.status, message))
+        if hasattr(out, 'write'):
+            shutil.copyfileobj(response, out, CHUNK_SIZE)
+        else:
+            with open(out, 'wb') as fp:
+                shutil.copyfileobj(response, fp, CHUNK_SIZE)
+        return {
+            'file_count': int(response.getheader('X-CCD-File-Count', '0')),
+            'elapsed': float(response.getheader('X-CCD-Elapsed', '0'))
+        }
+    finally:
+        connection.close()
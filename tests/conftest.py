@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SOURCE_FILES = {
+    'main.py': '# 注释\nimport os\n\n\nprint("源码", os.getcwd())\n',
+    'pkg/__init__.py': 'VALUE = 1\n',
+    'pkg/util.py': 'def add(a, b):\n    """相加"""\n    return a + b  # 行尾注释\n',
+    'pkg/models.py': 'class Model(object):\n\tname = "<model> & \'quoted\'"\n',
+    'lib/mod.py': 'VALUE = "lib"\n',
+    'lib/text.py': 'TEXT = """\n多行文本\n"""\n\n\nEND = 1\n',
+}
+GENERATE_OPTIONS = {
+    'title': '测试文档',
+    'exts': ['py'],
+    'comment_chars': ['#'],
+    'font_name': '宋体',
+    'font_size': 10.5,
+    'space_before': 0.0,
+    'space_after': 2.3,
+    'line_spacing': 10.5,
+    'excludes': []
+}
+
+
+class AppendOnlyStream(io.RawIOBase):
+    """只允许顺序写入的流，模拟管道或标准输出；写入的内容保存在 buffer 中。"""
+    def __init__(self):
+        super().__init__()
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+@pytest.fixture
+def source(tmp_path):
+    """
+    共用的源码目录：根目录一个文件，pkg 与 lib 两个顶层子目录，包含注释、空行、中文与 XML 特殊字符。
+    """
+    root = tmp_path / 'src'
+    for name, text in SOURCE_FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+    return str(root)
+
+
+@pytest.fixture
+def generate_options(source):
+    """
+    返回 build(outfile, **extra)：以 source 为源码目录的 generate_code_doc 参数，extra 覆盖默认值。
+    """
+    def build(outfile, **extra):
+        options = dict(GENERATE_OPTIONS, indirs=[source], outfile=outfile)
+        options.update(extra)
+        return options
+    return build
+
+
+@pytest.fixture
+def generate(generate_options):
+    """
+    返回 run(outfile, **extra)：用 generate_options 的参数调用 generate_code_doc。
+    """
+    from core import generate_code_doc
+
+    def run(outfile, **extra):
+        return generate_code_doc(**generate_options(outfile, **extra))
+    return run
+
+
+@pytest.fixture
+def unseekable_stream():
+    return AppendOnlyStream()
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+pytest.importorskip('docx')
+
+from async_api import generate_code_doc_async  # noqa: E402
+
+
+def test_async_output_matches_sync(generate, generate_options, tmp_path):
+    sync_out = str(tmp_path / 'sync.docx')
+    async_out = str(tmp_path / 'async.docx')
+    sync_result = generate(sync_out, reproducible=True)
+    events = []
+    async_result = asyncio.run(generate_code_doc_async(
+        on_progress=events.append, **generate_options(async_out, reproducible=True)
+    ))
+    assert async_result['file_count'] == sync_result['file_count'] == 6
+    assert [event['stage'] for event in events] == ['discover'] + ['render'] * 6 + ['save', 'done']
+    with open(sync_out, 'rb') as fp_sync, open(async_out, 'rb') as fp_async:
+        assert fp_sync.read() == fp_async.read()
+
+
+def test_async_skip_unchanged(generate, generate_options, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    first = asyncio.run(generate_code_doc_async(**generate_options(outfile, skip_unchanged=True)))
+    assert not first.get('skipped')
+    second = asyncio.run(generate_code_doc_async(**generate_options(outfile, skip_unchanged=True)))
+    assert second['skipped'] is True
+    assert generate(outfile, skip_unchanged=True)['skipped'] is True
+
+
+def test_async_accepts_all_generate_options(generate_options, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    result = asyncio.run(generate_code_doc_async(
+        **generate_options(outfile, volume_by='dir', jobs=1, cache=None)
+    ))
+    assert result['file_count'] == 6
+    assert len(result['volumes']) == 3
+    result = asyncio.run(generate_code_doc_async(**generate_options(outfile, jobs=2, volume_size=None)))
+    assert result['file_count'] == 6
+
+
+def test_async_rejects_unknown_options(generate_options, tmp_path):
+    with pytest.raises(TypeError):
+        asyncio.run(generate_code_doc_async(**generate_options(str(tmp_path / 'code.docx'), bogus=1)))
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from core import load_batch_manifest, run_batch
+
+
+def test_json_manifest_merges_defaults_and_resolves_paths(tmp_path):
+    manifest = tmp_path / 'batch.json'
+    manifest.write_text(json.dumps({
+        'defaults': {'exts': ['py'], 'indirs': 'src'},
+        'jobs': [
+            {'outfile': 'out/a.docx'},
+            {'outfile': 'b.docx', 'exts': ['js'], 'name': 'web'}
+        ]
+    }), encoding='utf-8')
+
+    jobs = load_batch_manifest(str(manifest))
+    assert [job['name'] for job in jobs] == ['a', 'web']
+    assert jobs[0]['outfile'] == str(tmp_path / 'out' / 'a.docx')
+    assert jobs[0]['indirs'] == [str(tmp_path / 'src')]
+    assert jobs[0]['exts'] == ['py']
+    assert jobs[1]['exts'] == ['js']
+
+
+def test_toml_manifest(tmp_path):
+    pytest.importorskip('tomllib')
+    manifest = tmp_path / 'batch.toml'
+    manifest.write_text(
+        '[defaults]\nexts = ["py"]\n\n[[jobs]]\noutfile = "a.docx"\nindirs = ["src"]\n',
+        encoding='utf-8'
+    )
+    jobs = load_batch_manifest(str(manifest))
+    assert jobs[0]['outfile'] == str(tmp_path / 'a.docx')
+    assert jobs[0]['indirs'] == [str(tmp_path / 'src')]
+
+
+def test_jobs_without_outfile_get_distinct_names(tmp_path):
+    manifest = tmp_path / 'batch.json'
+    manifest.write_text(json.dumps([{'name': 'api'}, {}, {}]), encoding='utf-8')
+    jobs = load_batch_manifest(str(manifest))
+    assert [job['outfile'] for job in jobs] == [
+        str(tmp_path / 'api.docx'), str(tmp_path / 'code-2.docx'), str(tmp_path / 'code-3.docx')
+    ]
+    assert [job['name'] for job in jobs] == ['api', 'code-2', 'code-3']
+
+
+@pytest.mark.parametrize('manifest_data', [
+    {'defaults': {'outfile': 'shared.docx'}, 'jobs': [{}, {}]},
+    {'jobs': [{'outfile': 'out/a.docx'}, {'outfile': 'out/../out/a.docx'}]},
+    {'jobs': [{'name': 'code-2'}, {}]},
+])
+def test_duplicate_outfiles_rejected(tmp_path, manifest_data):
+    manifest = tmp_path / 'batch.json'
+    manifest.write_text(json.dumps(manifest_data), encoding='utf-8')
+    with pytest.raises(ValueError, match='输出文件相同'):
+        load_batch_manifest(str(manifest))
+
+
+def test_manifest_without_jobs_is_rejected(tmp_path):
+    manifest = tmp_path / 'batch.json'
+    manifest.write_text('{"defaults": {}}', encoding='utf-8')
+    with pytest.raises(ValueError):
+        load_batch_manifest(str(manifest))
+
+
+def test_failed_job_is_reported_not_raised(tmp_path):
+    job = {'name': 'missing', 'indirs': [str(tmp_path / 'missing')], 'outfile': str(tmp_path / 'x.docx')}
+    results = run_batch([job], max_workers=1)
+    assert results[0]['name'] == 'missing'
+    assert results[0]['ok'] is False
+    assert results[0]['error']
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip('click')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_cli_import_defers_heavy_modules():
+    code = (
+        'import sys, cli; '
+        'print(",".join(sorted(name for name in ("core", "docx", "PyQt5", "json") if name in sys.modules)))'
+    )
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ))
+    assert output.decode().strip() == ''
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import os
+
+from core import FileIndex, collect_code_files, collect_code_index
+
+
+def write(path, text='x = 1\n'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_should_stop_ends_scan_early(tmp_path):
+    for name in ('a', 'b', 'c'):
+        write(tmp_path / name / 'm.py')
+
+    assert collect_code_files([str(tmp_path)], ['py'], [], should_stop=lambda: True) == []
+
+    checks = []
+
+    def should_stop():
+        checks.append(1)
+        return len(checks) > 2
+
+    files = collect_code_files([str(tmp_path)], ['py'], [], should_stop=should_stop)
+    assert len(files) == 1
+    assert len(collect_code_files([str(tmp_path)], ['py'], [])) == 3
+
+
+def test_file_index_round_trip():
+    index = FileIndex()
+    index.add('/src', 'main.py', 10, 5, 'python')
+    index.add('/src/pkg', '模块.PY', 20, 6, 'python')
+    index.add('/src', 'run\udcff', language='shellscript')
+    assert len(index) == 3
+    assert index.paths() == [
+        os.path.join('/src', 'main.py'), os.path.join('/src/pkg', '模块.PY'), os.path.join('/src', 'run\udcff')
+    ]
+    assert index.dirs == ['/src', '/src/pkg']
+    assert [index.ext(i) for i in range(3)] == ['py', 'py', '']
+    assert [index.language(i) for i in range(3)] == ['python', 'python', 'shellscript']
+    assert index.total_size() == 30
+    assert index.memory_size() > 0
+
+
+def test_collect_code_index_matches_file_list(tmp_path):
+    write(tmp_path / 'a.py')
+    write(tmp_path / 'pkg' / 'b.py', 'y = 22\n')
+    write(tmp_path / 'notes.txt')
+    index = collect_code_index([str(tmp_path)], ['py'], [])
+    assert index.paths() == collect_code_files([str(tmp_path)], ['py'], [])
+    sizes = dict(zip(index.paths(), index.sizes))
+    assert sizes[str(tmp_path / 'pkg' / 'b.py')] == 7
+    assert list(index.mtimes) == [os.stat(path).st_mtime_ns for path in index.paths()]
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('qfluentwidgets')
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import Qt  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from gui import ExtensionSelectDialog  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_selection_kept_for_extensions_not_scanned_yet(app):
+    dialog = ExtensionSelectDialog({'py': (2, 100)}, ['py', 'js', 'go'], scanning=True)
+    assert dialog.get_selected() == ['go', 'js', 'py']
+
+    # 扫描到的后缀按原选择勾选，取消勾选后不再返回
+    dialog.update_stats({'js': (1, 10)})
+    dialog.items['js'].setCheckState(Qt.Unchecked)
+    assert dialog.get_selected() == ['go', 'py']
+
+    # 扫描完成后只返回列表中勾选的后缀
+    dialog.update_stats({'py': (2, 100), 'js': (1, 10)}, dirs=3)
+    assert dialog.get_selected() == ['py']
+
+
+def test_clear_all_drops_pending_extensions(app):
+    dialog = ExtensionSelectDialog({'py': (2, 100)}, ['py', 'go'], scanning=True)
+    dialog._clear_all()
+    assert dialog.get_selected() == []
+    dialog.update_stats({'go': (1, 10)})
+    assert dialog.get_selected() == []
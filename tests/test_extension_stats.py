@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import os
+
+from core import collect_all_file_extensions, iter_file_extension_stats
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fp:
+        fp.write(data)
+
+
+def test_extension_counts_streamed_per_directory(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, 'a.py'), b'x = 1\n')
+    write(os.path.join(root, 'B.PY'), b'y\n')
+    write(os.path.join(root, 'logo.png'), b'\x89PNG\x00\x00')
+    write(os.path.join(root, 'Makefile'), b'all:\n')
+    write(os.path.join(root, '.hidden.py'), b'z\n')
+    write(os.path.join(root, 'web', 'app.js'), b'let a;\n')
+    write(os.path.join(root, 'node_modules', 'dep.js'), b'x\n')
+    write(os.path.join(root, 'build', 'out.js'), b'x\n')
+
+    stats = dict(iter_file_extension_stats(
+        [root], [os.path.join(root, 'build')], skip_dir_names=['node_modules']
+    ))
+    assert stats == {
+        root: {'py': (2, 8)},
+        os.path.join(root, 'web'): {'js': (1, 7)}
+    }
+    assert collect_all_file_extensions([root], []) == ['js', 'py']
+    assert list(iter_file_extension_stats([root], [], should_stop=lambda: True)) == []
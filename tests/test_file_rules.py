@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from core import FileRules, compile_file_rules, get_language_by_extension
+
+
+@pytest.fixture
+def rules():
+    return FileRules(['.py', 'JS', '!min.js', 'd.ts', '=Dockerfile', 'vue', '', '!'])
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('main.py', 'python'),
+    ('MAIN.PY', 'python'),
+    ('app.js', 'javascript'),
+    ('app.min.js', None),
+    ('APP.MIN.JS', None),
+    ('types.d.ts', 'typescript'),
+    ('index.ts', None),
+    ('Dockerfile', 'dockerfile'),
+    ('dockerfile', 'dockerfile'),
+    ('Dockerfile.dev', None),
+    ('view.vue', ''),
+    ('py', None),
+    ('archive.tar.gz', None),
+])
+def test_classify(rules, name, expected):
+    assert rules.classify(name) == expected
+    assert rules.is_code(name) == (expected is not None)
+
+
+def test_match_reports_rule(rules):
+    assert rules.match('a.min.js') == 'min.js'
+    assert rules.match('a.js') == 'js'
+    assert rules.match('x.d.ts') == 'd.ts'
+    assert rules.match('DOCKERFILE') == '=dockerfile'
+    assert rules.match('a.txt') is None
+
+
+def test_languages_only_from_included_rules(rules):
+    assert rules.languages == {'python', 'javascript', 'typescript', 'dockerfile'}
+    assert FileRules().languages == set()
+    assert FileRules().classify('a.py') is None
+
+
+def test_compound_suffix_language_falls_back_to_last_part():
+    assert FileRules(['spec.ts']).classify('a.spec.ts') == 'typescript'
+    assert FileRules(['ts']).classify('a.spec.ts') == 'typescript'
+
+
+def test_compiled_rules_cached():
+    assert compile_file_rules(('py', 'js')) is compile_file_rules(('py', 'js'))
+
+
+def test_language_by_file_name():
+    assert get_language_by_extension('/src/types.d.ts') == 'typescript'
+    assert get_language_by_extension('/src/Makefile') == 'makefile'
+    assert get_language_by_extension('/src/unknown.xyz') == ''
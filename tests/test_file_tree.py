@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+
+import pytest
+
+QtCore = pytest.importorskip('PyQt5.QtCore')
+
+from file_tree import FileTreeModel  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+
+def write(path, lines):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as fp:
+        fp.write('x = 1\n' * lines)
+
+
+def wait_until(app, condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('timed out')
+        app.processEvents()
+        time.sleep(0.01)
+
+
+def display(model, index, column):
+    return model.data(model.index(index.row(), column, index.parent()))
+
+
+def child_by_name(model, parent, name):
+    for row in range(model.rowCount(parent)):
+        index = model.index(row, 0, parent)
+        if model.data(index) == name:
+            return index
+    raise KeyError(name)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'src'
+    write(str(root / 'main.py'), 3)
+    write(str(root / 'pkg' / 'a.py'), 5)
+    write(str(root / 'pkg' / 'deep' / 'b.py'), 7)
+    write(str(root / 'vendor' / 'c.py'), 11)
+    write(str(root / 'notes.txt'), 2)
+    return str(root)
+
+
+def test_expanding_after_count_fills_file_lines(app, tree):
+    model = FileTreeModel()
+    try:
+        model.set_source([tree], ['py'])
+        root = model.index(0, 0)
+        display(model, root, 1)
+        wait_until(app, lambda: display(model, root, 1) == '4')
+        assert display(model, root, 2) == '26'
+
+        # 统计完成后才展开：目录与文件的计数直接取自已统计的结果
+        model.fetchMore(root)
+        main = child_by_name(model, root, 'main.py')
+        assert display(model, main, 2) == '3'
+        pkg = child_by_name(model, root, 'pkg')
+        assert (display(model, pkg, 1), display(model, pkg, 2)) == ('2', '12')
+        model.fetchMore(pkg)
+        assert display(model, child_by_name(model, pkg, 'a.py'), 2) == '5'
+        assert model.rowCount(root) == 3
+    finally:
+        model.close()
+
+
+def test_toggling_exclude_recounts_ancestors(app, tree):
+    model = FileTreeModel()
+    changes = []
+    model.excludes_changed.connect(changes.append)
+    try:
+        model.set_source([tree], ['py'], [os.path.join(tree, 'vendor')])
+        root = model.index(0, 0)
+        display(model, root, 1)
+        wait_until(app, lambda: display(model, root, 1) == '3')
+        assert display(model, root, 2) == '15'
+
+        model.fetchMore(root)
+        pkg = child_by_name(model, root, 'pkg')
+        model.setData(pkg, QtCore.Qt.Unchecked, QtCore.Qt.CheckStateRole)
+        assert changes[-1] == sorted([os.path.join(tree, 'pkg'), os.path.join(tree, 'vendor')])
+        assert display(model, pkg, 1) == ''
+        wait_until(app, lambda: display(model, root, 1) == '1')
+        assert display(model, root, 2) == '3'
+
+        model.set_excludes([])
+        wait_until(app, lambda: display(model, root, 1) == '4')
+        assert display(model, root, 2) == '26'
+        assert display(model, child_by_name(model, root, 'vendor'), 2) == '11'
+    finally:
+        model.close()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import os
+
+from core import GenerationCache
+
+
+def rewrite(path, data, mtime_ns):
+    """原地改写文件内容（目录修改时间不变），并设置新的修改时间。"""
+    with open(path, 'wb') as fp:
+        fp.write(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def collect(cache, root):
+    return cache.collect_code_files([root], ['py'], [])
+
+
+def test_cached_file_list_tracks_in_place_content_changes(tmp_path):
+    root = str(tmp_path)
+    script = os.path.join(root, 'tool')
+    module = os.path.join(root, 'mod.py')
+    rewrite(script, b'echo plain\n', 1000000000)
+    rewrite(module, b'a = 1\n', 1000000000)
+    cache = GenerationCache()
+    assert collect(cache, root) == [module]
+
+    # 无后缀文件加上 shebang 后被收录
+    rewrite(script, b'#!/usr/bin/env python3\nprint(1)\n', 2000000000)
+    assert sorted(collect(cache, root)) == sorted([module, script])
+
+    # 代码文件变为二进制后不再收录
+    rewrite(module, b'a = 1\x00\n', 3000000000)
+    assert collect(cache, root) == [script]
+
+
+def test_cached_file_list_reused_when_unchanged(tmp_path):
+    root = str(tmp_path)
+    rewrite(os.path.join(root, 'mod.py'), b'a = 1\n', 1000000000)
+    cache = GenerationCache()
+    first = collect(cache, root)
+    entry = list(cache._indexes.values())[0]
+    assert collect(cache, root) == first
+    assert list(cache._indexes.values())[0] is entry
+
+
+def test_cached_lines_follow_file_changes(tmp_path):
+    path = os.path.join(str(tmp_path), 'mod.py')
+    rewrite(path, b'a = 1\n', 1000000000)
+    cache = GenerationCache()
+    lines, _, _ = cache.read_code_lines(path, 'utf-8', True, True, ['#'])
+    assert lines == ['a = 1']
+    rewrite(path, b'b = 22\n', 2000000000)
+    lines, _, _ = cache.read_code_lines(path, 'utf-8', True, True, ['#'])
+    assert lines == ['b = 22']
+    assert cache.info()['misses'] == 2
+
+
+def test_cancelled_scan_not_cached(tmp_path):
+    root = str(tmp_path)
+    for name in ('a.py', 'b.py'):
+        rewrite(os.path.join(root, name), b'a = 1\n', 1000000000)
+    cache = GenerationCache()
+    partial = cache.collect_code_files([root], ['py'], [], should_stop=lambda: True)
+    assert partial == []
+    # 取消时的不完整结果不会在下次生成时被当作缓存返回
+    assert sorted(collect(cache, root)) == [os.path.join(root, 'a.py'), os.path.join(root, 'b.py')]
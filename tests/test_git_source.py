@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from git_source import GitSource
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason='git is not installed')
+
+
+def git(repo, *args):
+    subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com'] + list(args),
+        cwd=repo, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+
+
+@pytest.fixture
+def repo(tmp_path):
+    root = str(tmp_path)
+    git(root, 'init', '-q')
+    os.makedirs(os.path.join(root, 'pkg'))
+    with open(os.path.join(root, 'pkg', 'mod.py'), 'w') as fp:
+        fp.write('VERSION = 1\n')
+    with open(os.path.join(root, 'notes.txt'), 'w') as fp:
+        fp.write('notes\n')
+    git(root, 'add', '.')
+    git(root, 'commit', '-q', '-m', 'first')
+    git(root, 'tag', 'v1')
+    with open(os.path.join(root, 'pkg', 'mod.py'), 'w') as fp:
+        fp.write('VERSION = 2\n')
+    with open(os.path.join(root, 'untracked.py'), 'w') as fp:
+        fp.write('x = 1\n')
+    return root
+
+
+def test_working_tree_lists_tracked_files_only(repo):
+    source = GitSource(['py'])
+    files = source.discover([repo], [])
+    assert files == [os.path.join(repo, 'pkg', 'mod.py')]
+    assert source.decode(files[0]) == 'VERSION = 2\n'
+    assert source.discover([repo], [os.path.join(repo, 'pkg')]) == []
+
+
+def test_revision_reads_committed_content(repo):
+    source = GitSource(['py'], revision='v1')
+    try:
+        files = source.discover([os.path.join(repo, 'pkg')], [])
+        assert files == [os.path.join(repo, 'pkg', 'mod.py')]
+        assert source.decode(files[0]) == 'VERSION = 1\n'
+        assert source.decode(files[0]) == 'VERSION = 1\n'
+    finally:
+        source.close()
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import os
+
+from core import iter_gitignore_excludes, read_gitignore_excludes
+
+
+def test_static_gitignore_entries_resolved(tmp_path):
+    root = str(tmp_path)
+    for name in ('build', 'docs', os.path.join('sub', 'out')):
+        os.makedirs(os.path.join(root, name))
+    with open(os.path.join(root, '.gitignore'), 'w') as fp:
+        fp.write('# comment\n/build/\n*.pyc\n!docs\nmissing\ndocs\n')
+    with open(os.path.join(root, 'sub', '.gitignore'), 'w') as fp:
+        fp.write('out\n')
+
+    assert sorted(read_gitignore_excludes([root])) == sorted([
+        os.path.join(root, 'build'), os.path.join(root, 'docs'), os.path.join(root, 'sub', 'out')
+    ])
+    assert sorted(directory for directory, _ in iter_gitignore_excludes([root])) == sorted([
+        root, os.path.join(root, 'build'), os.path.join(root, 'docs'),
+        os.path.join(root, 'sub'), os.path.join(root, 'sub', 'out')
+    ])
+    assert list(iter_gitignore_excludes([root], should_stop=lambda: True)) == []
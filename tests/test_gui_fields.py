@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import types
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('qfluentwidgets')
+
+from gui import GeneratorWindow  # noqa: E402
+
+
+class FakeEdit(object):
+    """记录读取次数的输入框替身。"""
+    def __init__(self, text):
+        self.value = text
+        self.reads = 0
+
+    def text(self):
+        self.reads += 1
+        return self.value
+
+    toPlainText = text
+
+
+def fake_window():
+    scheduled = []
+    window = types.SimpleNamespace(
+        field_items={},
+        indirs_edit=FakeEdit('src\nlib'),
+        exts_edit=FakeEdit('.py, js'),
+        comment_chars_edit=FakeEdit('#;//'),
+        excludes_edit=FakeEdit(''),
+        scheduled=scheduled,
+        schedule_summary=lambda: scheduled.append(1)
+    )
+    return window
+
+
+def test_field_items_parsed_once_until_invalidated():
+    window = fake_window()
+    assert GeneratorWindow.get_field_items(window, 'exts') == ['py', 'js']
+    assert GeneratorWindow.get_field_items(window, 'exts') == ['py', 'js']
+    assert window.exts_edit.reads == 1
+    assert GeneratorWindow.get_field_items(window, 'comment_chars') == ['#', '//']
+
+    window.exts_edit.value = 'ts'
+    GeneratorWindow.invalidate_field(window, 'exts')
+    assert window.scheduled == [1]
+    assert GeneratorWindow.get_field_items(window, 'exts') == ['ts']
+    assert GeneratorWindow.get_field_items(window, 'comment_chars') == ['#', '//']
+    assert window.comment_chars_edit.reads == 1
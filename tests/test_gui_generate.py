@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import types
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('qfluentwidgets')
+
+from core import GenerationCache  # noqa: E402
+from gui import GeneratorWindow, run_generate  # noqa: E402
+
+
+def fake_window():
+    return types.SimpleNamespace(
+        generation_cache=GenerationCache(),
+        generation_pipeline=None,
+        generation_pipeline_options=None
+    )
+
+
+def test_pipeline_reused_until_config_changes(generate_options, tmp_path):
+    window = fake_window()
+    config = generate_options(str(tmp_path / 'a.docx'))
+    first = GeneratorWindow.get_generation_pipeline(window, config)
+    assert first.cache is window.generation_cache
+
+    # 标题、目录与输出文件每次随 run 传入，不需要重建
+    config = dict(config, title='另一个标题', outfile=str(tmp_path / 'b.docx'))
+    assert GeneratorWindow.get_generation_pipeline(window, config) is first
+    result = run_generate(first, config)
+    assert result['mode'] == 'generate'
+    assert result['file_count'] == 6
+    assert (tmp_path / 'b.docx').exists()
+
+    closed = []
+    first.close = lambda: closed.append(1)
+    config = dict(config, font_size=12)
+    second = GeneratorWindow.get_generation_pipeline(window, config)
+    assert second is not first
+    assert second.font_size == config['font_size']
+    assert closed == [1]
+
+
+def test_cancelled_generation_writes_nothing(generate_options, tmp_path):
+    window = fake_window()
+    config = generate_options(str(tmp_path / 'code.docx'))
+    pipeline = GeneratorWindow.get_generation_pipeline(window, config)
+    result = run_generate(pipeline, config, should_stop=lambda: True)
+    assert result['cancelled']
+    assert not (tmp_path / 'code.docx').exists()
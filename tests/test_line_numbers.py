@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import zipfile
+
+import pytest
+
+pytest.importorskip('docx')
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def line_number_types(outfile):
+    from xml.etree import ElementTree
+    with zipfile.ZipFile(outfile) as package:
+        root = ElementTree.fromstring(package.read('word/document.xml'))
+    return [element.attrib for element in root.iter(W + 'lnNumType')]
+
+
+def test_line_numbers_written_to_sections(generate, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    generate(outfile, line_numbers=True, line_number_start=10, line_number_restart='continuous')
+    assert line_number_types(outfile) == [{W + 'countBy': '1', W + 'start': '9', W + 'restart': 'continuous'}]
+
+
+def test_line_numbers_off_by_default(generate, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    generate(outfile)
+    assert line_number_types(outfile) == []
+
+
+def test_line_numbers_reject_unknown_restart(generate, tmp_path):
+    with pytest.raises(ValueError):
+        generate(str(tmp_path / 'code.docx'), line_numbers=True, line_number_restart='chapter')
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import zipfile
+import zlib
+
+import pytest
+
+from package_writer import CHUNK_SIZE, COMPRESSION_LEVELS, ZipPackageWriter, deflate
+
+
+def large_blob():
+    return b''.join(b'<w:p><w:r><w:t>line %d</w:t></w:r></w:p>' % i for i in range(3 * CHUNK_SIZE // 30))
+
+
+@pytest.mark.parametrize('compression', sorted(COMPRESSION_LEVELS))
+def test_zip_round_trip(tmp_path, compression):
+    path = str(tmp_path / 'package.zip')
+    members = [('[Content_Types].xml', b'<Types/>'), ('word/document.xml', large_blob()), ('中文/名称.xml', b'x')]
+    with ZipPackageWriter(path, compression=compression, jobs=4, comment=b'note') as writer:
+        writer.write(*members[0])
+        writer.write_async(*members[1])
+        writer.write(*members[2])
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        assert archive.comment == b'note'
+        assert sorted(archive.namelist()) == sorted(name for name, _ in members)
+        for name, data in members:
+            assert archive.read(name) == data
+        expected = zipfile.ZIP_STORED if compression == 'store' else zipfile.ZIP_DEFLATED
+        assert all(info.compress_type == expected for info in archive.infolist())
+
+
+def test_zip_written_to_unseekable_stream(unseekable_stream):
+    stream = unseekable_stream
+    with ZipPackageWriter(stream, jobs=2, date_time=(2020, 5, 17, 12, 30, 10)) as writer:
+        writer.write_async('big.xml', large_blob())
+        writer.write('small.xml', b'abc')
+    with zipfile.ZipFile(io.BytesIO(stream.buffer.getvalue())) as archive:
+        assert archive.read('big.xml') == large_blob()
+        assert archive.getinfo('small.xml').date_time == (2020, 5, 17, 12, 30, 10)
+
+
+def test_chunked_deflate_is_one_stream():
+    from concurrent.futures import ThreadPoolExecutor
+    data = os.urandom(1000) * 300
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        payload, crc = deflate(data, 6, executor, chunk_size=4096)
+    assert crc == zlib.crc32(data)
+    assert zlib.decompress(payload, -15) == data
+
+
+def test_unknown_compression_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ZipPackageWriter(str(tmp_path / 'x.zip'), compression='ultra')
+
+
+def test_compressed_docx_opens_in_python_docx(generate, tmp_path):
+    docx = pytest.importorskip('docx')
+    outfile = str(tmp_path / 'code.docx')
+    generate(outfile, compression='max')
+    with zipfile.ZipFile(outfile) as archive:
+        assert archive.testzip() is None
+    assert 'print("源码", os.getcwd())' in [paragraph.text for paragraph in docx.Document(outfile).paragraphs]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from core import PageCounter, PageLayout, estimate_pages, parse_page_setup
+
+
+def test_wide_characters_take_full_width():
+    layout = PageLayout(font_size=10)
+    assert layout.text_width('ab') == 10.0
+    assert layout.text_width('中文') == 20.0
+    assert layout.text_width('\tx') == 36.0 + 5.0
+
+
+def test_long_lines_wrap():
+    layout = PageLayout(font_size=10, page_size=(200.0, 800.0), margins=(0.0, 0.0, 0.0, 0.0))
+    assert layout.wrapped_lines('') == 1
+    assert layout.wrapped_lines('a' * 40) == 1
+    assert layout.wrapped_lines('a' * 41) == 2
+    assert layout.wrapped_lines('中' * 41) == 3
+
+
+def test_paragraphs_split_across_pages():
+    layout = PageLayout(
+        line_spacing=10.0, space_after=0.0,
+        page_size=(600.0, 100.0), margins=(0.0, 0.0, 0.0, 0.0)
+    )
+    counter = PageCounter(layout)
+    counter.extend([6, 6])
+    assert counter.pages == 2
+    assert counter.fractional_pages == 1.2
+    assert estimate_pages(['x'] * 21, layout) == 3
+    assert estimate_pages([], layout) == 0
+
+
+def test_parse_page_setup_reads_last_section():
+    xml = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+        '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/>'
+        '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800"/></w:sectPr>'
+        '</w:body></w:document>'
+    ).encode('utf-8')
+    page_size, margins = parse_page_setup(xml)
+    assert page_size == (595.3, 841.9)
+    assert margins == (72.0, 90.0, 72.0, 90.0)
+    assert parse_page_setup(b'not xml') == parse_page_setup(None)
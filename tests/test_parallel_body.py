@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import zipfile
+
+import pytest
+
+pytest.importorskip('docx')
+
+from core import split_render_slices  # noqa: E402
+
+
+def test_split_render_slices_keeps_order():
+    files = ['f{}'.format(i) for i in range(10)]
+    slices = split_render_slices(files, 4)
+    assert sum(slices, []) == files
+    assert all(slices)
+    assert split_render_slices([], 4) == []
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parallel_body_matches_sequential(generate, tmp_path, jobs):
+    sequential = str(tmp_path / 'sequential.docx')
+    parallel = str(tmp_path / 'parallel.docx')
+    generate(sequential, reproducible=True)
+    result = generate(parallel, reproducible=True, parallel_render=True, jobs=jobs)
+    assert result['file_count'] == 6
+    assert result['stats']['counters']['files'] == 6
+    with zipfile.ZipFile(sequential) as expected, zipfile.ZipFile(parallel) as actual:
+        assert actual.namelist() == expected.namelist()
+        for name in expected.namelist():
+            assert actual.read(name) == expected.read(name), name
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from core import CodeDocPipeline
+
+
+def test_failed_pdf_generation_removes_part_file(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'a.py').write_text('a = 1\n', encoding='utf-8')
+    (src / 'b.py').write_text('b = 2\n', encoding='utf-8')
+    outfile = str(tmp_path / 'code.pdf')
+
+    def decoder(file):
+        if file.endswith('b.py'):
+            raise RuntimeError('decode failed')
+        with open(file, encoding='utf-8') as fp:
+            return fp.read()
+
+    pipeline = CodeDocPipeline(exts=['py'], decoder=decoder)
+    with pytest.raises(RuntimeError):
+        pipeline.run('标题', [str(src)], outfile=outfile)
+    assert os.listdir(str(tmp_path)) == ['src']
+
+
+def test_pdf_generation_writes_complete_file(tmp_path):
+    src = tmp_path / 'src'
+    src.mkdir()
+    (src / 'a.py').write_text('a = 1\n', encoding='utf-8')
+    outfile = str(tmp_path / 'code.pdf')
+    result = CodeDocPipeline(exts=['py']).run('标题', [str(src)], outfile=outfile)
+    assert result['file_count'] == 1
+    assert not os.path.exists(outfile + '.part')
+    with open(outfile, 'rb') as fp:
+        data = fp.read()
+    assert data.startswith(b'%PDF-1.4') and data.rstrip().endswith(b'%%EOF')
+
+
+class AsciiFont(object):
+    """只包含 ASCII 字符的字体替身：字形编号为码位，其余字符为 0。"""
+    name = 'AsciiOnly'
+
+    def glyph_id(self, char):
+        return ord(char) if ord(char) < 0x80 else 0
+
+
+def test_missing_glyphs_kept_out_of_to_unicode():
+    from pdf_writer import PdfCodeWriter
+    writer = PdfCodeWriter(font_size=10)
+    writer.font = AsciiFont()
+    try:
+        assert writer._show_text('ab') == '<00610062> Tj'
+        assert writer._show_text('中文aé') == '[<0000> 0 <0000> 0 <0061> <0000> 500] TJ'
+        assert 0 not in writer.used_glyphs
+        assert writer.missing_chars == {'中', '文', 'é'}
+        cmap = writer._to_unicode_cmap()
+        assert '<0000>' not in cmap.split('endcodespacerange')[1]
+        assert '<0061> <0061>' in cmap
+    finally:
+        writer.discard()
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from core import CodeDocPipeline
+
+
+class RecordingWriter(object):
+    """记录写入内容的 writer，替代 CodeWriter。"""
+    def __init__(self, pipeline, profiler=None):
+        self.pipeline = pipeline
+        self.profiler = profiler
+        self.title = None
+        self.lines = []
+        self.saved_to = None
+
+    def write_header(self, title):
+        self.title = title
+
+    def write_file(self, file):
+        lines, _, _ = self.pipeline.read_lines(file, None, True, True, None, self.profiler)
+        self.lines.extend(lines)
+
+    def save(self, outfile):
+        self.saved_to = outfile
+
+
+def test_stages_replaced_through_constructor(tmp_path):
+    sources = {'a': 'one\n\ntwo\n', 'b': 'three\n'}
+    writers = []
+
+    def writer_factory(pipeline, outfile, output_format, profiler):
+        writers.append(RecordingWriter(pipeline, profiler))
+        return writers[-1]
+
+    pipeline = CodeDocPipeline(
+        discoverer=lambda indirs, excludes, should_stop: sorted(sources),
+        decoder=sources.get,
+        line_filter=lambda content, file: [file + ':' + line for line in content.splitlines() if line],
+        writer_factory=writer_factory
+    )
+    outfile = str(tmp_path / 'out.docx')
+    result = pipeline.run('标题', [str(tmp_path)], [], outfile)
+    assert result['file_count'] == 2
+    assert writers[0].title == '标题'
+    assert writers[0].lines == ['a:one', 'a:two', 'b:three']
+    assert writers[0].saved_to == outfile
+    assert set(result['stats']['timings']) >= {'collect', 'decode', 'filter'}
+
+    sources['c'] = 'four\n'
+    assert pipeline.run('标题', [str(tmp_path)], [], outfile)['file_count'] == 3
+    assert writers[1].lines[-1] == 'c:four'
+
+
+def test_stages_overridden_by_subclass(tmp_path):
+    (tmp_path / 'm.py').write_text('x = 1\n# note\n', encoding='utf-8')
+
+    class UpperPipeline(CodeDocPipeline):
+        def filter(self, content, file):
+            return [line.upper() for line in super().filter(content, file)]
+
+        def create_writer(self, outfile, output_format, profiler):
+            self.writer = RecordingWriter(self)
+            return self.writer
+
+    pipeline = UpperPipeline(exts=['py'])
+    pipeline.run('t', [str(tmp_path)], [], str(tmp_path / 'out.docx'))
+    assert pipeline.writer.lines == ['X = 1']
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import zipfile
+
+import pytest
+
+from package_writer import REPRODUCIBLE_DATE_TIME, reproducible_date_time
+
+docx = pytest.importorskip('docx')
+
+from core import read_input_digest  # noqa: E402
+
+
+def read(path):
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+def test_output_is_byte_identical(generate, source, tmp_path):
+    first = str(tmp_path / 'first.docx')
+    second = str(tmp_path / 'second.docx')
+    generate(first, reproducible=True)
+    time.sleep(1.1)
+    os.utime(os.path.join(source, 'main.py'))
+    generate(second, reproducible=True)
+    assert read(first) == read(second)
+
+    with zipfile.ZipFile(first) as archive:
+        names = archive.namelist()
+        assert names == sorted(names, key=lambda name: name.encode('utf-8'))
+        assert all(info.date_time == REPRODUCIBLE_DATE_TIME for info in archive.infolist())
+    properties = docx.Document(first).core_properties
+    assert properties.created == properties.modified
+    assert properties.revision == 1
+
+
+def test_source_date_epoch(generate, tmp_path, monkeypatch):
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '1700000000')
+    assert reproducible_date_time() == (2023, 11, 14, 22, 13, 20)
+    outfile = str(tmp_path / 'epoch.docx')
+    generate(outfile, reproducible=True)
+    with zipfile.ZipFile(outfile) as archive:
+        assert archive.infolist()[0].date_time == (2023, 11, 14, 22, 13, 20)
+    assert docx.Document(outfile).core_properties.modified.year == 2023
+
+
+def test_input_digest_recorded_and_content_sensitive(generate, source, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    generate(outfile, reproducible=True, skip_unchanged=True)
+    digest = read_input_digest(outfile)
+    assert digest and len(digest) == 64
+    assert generate(outfile, reproducible=True, skip_unchanged=True)['skipped'] is True
+
+    with open(os.path.join(source, 'pkg', '__init__.py'), 'w', encoding='utf-8') as fp:
+        fp.write('VALUE = 2\n')
+    result = generate(outfile, reproducible=True, skip_unchanged=True)
+    assert not result.get('skipped')
+    assert read_input_digest(outfile) != digest
+    assert read_input_digest(str(tmp_path / 'missing.docx')) is None
+
+
+def test_rename_changing_language_invalidates_digest(generate, tmp_path):
+    src = tmp_path / 'renamed'
+    src.mkdir()
+    (src / 'm.py').write_text('x = 1  # keep?\n"""doc"""\ny = 2\n', encoding='utf-8')
+    outfile = str(tmp_path / 'code.docx')
+
+    def paragraphs():
+        return [paragraph.text for paragraph in docx.Document(outfile).paragraphs if paragraph.text]
+
+    generate(outfile, indirs=[str(src)], exts=['py', 'txt'], skip_unchanged=True)
+    assert paragraphs() == ['x = 1', 'y = 2']
+    os.rename(str(src / 'm.py'), str(src / 'm.txt'))
+    result = generate(outfile, indirs=[str(src)], exts=['py', 'txt'], skip_unchanged=True)
+    assert not result.get('skipped')
+    assert paragraphs() == ['x = 1  # keep?', '"""doc"""', 'y = 2']
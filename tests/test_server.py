@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import http.client
+import json
+import threading
+import zipfile
+
+import pytest
+
+from server import create_server, request_document
+
+
+@pytest.fixture(scope='module')
+def server():
+    instance = create_server(port=0)
+    thread = threading.Thread(target=instance.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield instance
+    instance.shutdown()
+    instance.server_close()
+    thread.join()
+
+
+def post(server, payload):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=30)
+    try:
+        connection.request('POST', '/generate', body=json.dumps(payload).encode('utf-8'))
+        response = connection.getresponse()
+        return response.status, json.loads(response.read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def health(server):
+    connection = http.client.HTTPConnection(*server.server_address[:2], timeout=30)
+    try:
+        connection.request('GET', '/health')
+        return json.loads(connection.getresponse().read().decode('utf-8'))
+    finally:
+        connection.close()
+
+
+def test_generate_over_loopback(server, source, tmp_path):
+    docx = pytest.importorskip('docx')
+    host, port = server.server_address[:2]
+    before = health(server)
+    job = {'indirs': [source], 'exts': ['py'], 'title': '服务'}
+    for name in ('first.docx', 'second.docx'):
+        result = request_document(job, str(tmp_path / name), host=host, port=port, timeout=30)
+        assert result['file_count'] == 6
+        with zipfile.ZipFile(str(tmp_path / name)) as archive:
+            assert archive.testzip() is None
+    assert 'VALUE = 1' in [paragraph.text for paragraph in docx.Document(str(tmp_path / 'second.docx')).paragraphs]
+
+    status = health(server)
+    assert status['completed'] - before['completed'] == 2
+    assert status['cache']['hits'] - before['cache']['hits'] == 6
+
+
+@pytest.mark.parametrize('payload', [
+    {'indirs': 5},
+    {'exts': ['py', 3]},
+    {'font_size': 'abc'},
+    {'font_size': True},
+    {'line_number_start': 1.5},
+    {'bogus': 1},
+    [],
+])
+def test_invalid_jobs_rejected(server, payload):
+    status, body = post(server, payload)
+    assert status == 400
+    assert body['error']
+
+
+def test_client_reports_service_error(server, tmp_path):
+    host, port = server.server_address[:2]
+    with pytest.raises(RuntimeError, match='400'):
+        request_document({'indirs': [str(tmp_path / 'missing')]}, str(tmp_path / 'x.docx'), host=host, port=port)
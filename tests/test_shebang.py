@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from core import collect_code_files, detect_language, detect_shebang_language
+
+
+@pytest.mark.parametrize('head, expected', [
+    (b'#!/usr/bin/env python3\n', 'python'),
+    (b'#!/usr/bin/python3.11 -u\n', 'python'),
+    ('#!/bin/bash\necho\n', 'shellscript'),
+    (b'#!/usr/bin/env -S NODE_OPTIONS=--x node\n', 'javascript'),
+    (b'#! /usr/bin/perl -w\n', 'perl'),
+    (b'#!/usr/bin/env\n', ''),
+    (b'#!/usr/bin/awk -f\n', ''),
+    (b'print(1)\n', ''),
+    ('', ''),
+])
+def test_detect_shebang_language(head, expected):
+    assert detect_shebang_language(head) == expected
+
+
+def test_extensionless_scripts_included_by_language(tmp_path):
+    (tmp_path / 'tool').write_bytes(b'#!/usr/bin/env python3\nprint(1)\n')
+    (tmp_path / 'deploy').write_bytes(b'#!/bin/sh\necho hi\n')
+    (tmp_path / 'notes').write_bytes(b'plain text\n')
+    (tmp_path / 'run.txt').write_bytes(b'#!/usr/bin/env python3\n')
+
+    files = collect_code_files([str(tmp_path)], ['py'], [])
+    assert files == [str(tmp_path / 'tool')]
+    files = collect_code_files([str(tmp_path)], ['py', 'sh'], [])
+    assert sorted(files) == [str(tmp_path / 'deploy'), str(tmp_path / 'tool')]
+    assert detect_language(str(tmp_path / 'tool'), '#!/usr/bin/env python3\n') == 'python'
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from core import StageProfiler, format_stage_summary
+
+
+def test_merge_accumulates_worker_stats():
+    profiler = StageProfiler()
+    profiler.add('render', 0.5)
+    profiler.count('files', 2)
+    worker = StageProfiler()
+    worker.add('render', 0.25)
+    worker.add('decode', 0.25)
+    worker.count('files')
+    profiler.merge(worker.as_dict())
+
+    stats = profiler.as_dict()
+    assert stats['timings'] == {'render': 0.75, 'decode': 0.25}
+    assert stats['calls'] == {'render': 2, 'decode': 1}
+    assert stats['counters'] == {'files': 3}
+
+
+def test_stage_context_records_on_error():
+    profiler = StageProfiler()
+    try:
+        with profiler.stage('save'):
+            raise ValueError()
+    except ValueError:
+        pass
+    assert profiler.calls == {'save': 1}
+
+
+def test_format_stage_summary_follows_stage_order():
+    profiler = StageProfiler()
+    profiler.add('custom', 1.0)
+    profiler.add('save', 1.0)
+    profiler.add('collect', 2.0)
+    profiler.count('lines', 10)
+    lines = format_stage_summary(profiler.as_dict())
+    assert lines[0].startswith('扫描文件：2.000s（50.0%，1 次）')
+    assert lines[1].startswith('保存文档')
+    assert lines[2].startswith('custom')
+    assert lines[3] == '写入行数：10'
+    assert format_stage_summary(None) == []
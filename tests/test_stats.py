@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from core import collect_code_stats, format_stats_table
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def test_stats_grouped_by_matched_rule(tmp_path):
+    write(tmp_path / 'Dockerfile', 'FROM python\nRUN true\n')
+    write(tmp_path / 'bin' / 'tool', '#!/usr/bin/env python3\nprint(1)\n')
+    write(tmp_path / 'bin' / 'run', '#!/bin/bash\necho hi\n')
+    write(tmp_path / 'types' / 'x.d.ts', 'export type A = 1;\n')
+    write(tmp_path / 'y.ts', 'let a = 1;\n')
+    write(tmp_path / 'z.py', 'a = 1\n')
+
+    stats = collect_code_stats([str(tmp_path)], ['py', 'sh', 'ts', 'd.ts', '=Dockerfile'], jobs=1)
+    by_ext = stats['by_ext']
+    assert sorted(by_ext) == ['#!python', '#!shellscript', '=dockerfile', 'd.ts', 'py', 'ts']
+    assert all(bucket['files'] == 1 for bucket in by_ext.values())
+    assert by_ext['#!python']['language'] == 'python'
+    assert by_ext['#!shellscript']['language'] == 'shellscript'
+    assert by_ext['d.ts']['language'] == 'typescript'
+    assert '' not in by_ext
+    assert stats['totals']['files'] == 6
+    keys = dict((item['path'], item['ext']) for item in stats['files'])
+    assert keys[str(tmp_path / 'types' / 'x.d.ts')] == 'd.ts'
+
+
+def test_stats_totals_and_directories(tmp_path):
+    write(tmp_path / 'a.py', '# comment\n\nx = 1\ny = 2\n')
+    write(tmp_path / 'pkg' / 'b.py', 'z = 3\n')
+
+    stats = collect_code_stats([str(tmp_path)], ['py'], jobs=1)
+    totals = stats['totals']
+    assert stats['file_count'] == 2
+    assert totals['raw_lines'] == 5
+    assert totals['lines'] == 3
+    assert totals['bytes'] == len('# comment\n\nx = 1\ny = 2\n') + len('z = 3\n')
+    assert totals['page_count'] == 1
+    assert stats['by_dir'][str(tmp_path)]['lines'] == 2
+    assert stats['by_dir'][str(tmp_path / 'pkg')]['lines'] == 1
+    table = format_stats_table(stats)
+    assert table[-1].split() == ['total', '2', '5', '3', str(totals['bytes']), str(totals['pages'])]
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import io
+import zipfile
+
+import pytest
+
+pytest.importorskip('docx')
+
+
+@pytest.mark.parametrize('compression', [None, 'fast'])
+def test_generate_to_unseekable_stream(generate, unseekable_stream, compression):
+    result = generate(unseekable_stream, compression=compression)
+    assert result['file_count'] == 6
+    with zipfile.ZipFile(io.BytesIO(unseekable_stream.buffer.getvalue())) as archive:
+        assert 'print("源码", os.getcwd())' in archive.read('word/document.xml').decode('utf-8')
+
+
+def test_cli_writes_docx_to_stdout(source):
+    pytest.importorskip('click')
+    from click.testing import CliRunner
+    from cli import main
+    result = CliRunner().invoke(main, ['-i', source, '-e', 'py', '-o', '-'])
+    assert result.exit_code == 0, result.output
+    with zipfile.ZipFile(io.BytesIO(result.stdout_bytes)) as archive:
+        assert 'word/document.xml' in archive.namelist()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import zipfile
+
+import pytest
+
+from core import create_document, load_template
+
+DOCUMENT_XML = (
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+    '<w:sectPr><w:pgSz w:w="{}" w:h="16838"/></w:sectPr></w:body></w:document>'
+)
+
+
+def write_template(path, width, mtime_ns):
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('word/document.xml', DOCUMENT_XML.format(width))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_template_parsed_once_until_modified(tmp_path):
+    path = str(tmp_path / 'template.docx')
+    write_template(path, 11906, 1000000000)
+    template = load_template(path)
+    assert load_template(path) is template
+    assert template.page_size == (595.3, 841.9)
+
+    write_template(path, 12240, 2000000000)
+    reloaded = load_template(path)
+    assert reloaded is not template
+    assert reloaded.page_size[0] == 612.0
+
+
+def test_create_document_returns_independent_copies():
+    docx = pytest.importorskip('docx')
+    template = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+    first = create_document(template, docx.Document)
+    first.add_paragraph('only in first')
+    second = create_document(template, docx.Document)
+    assert [p.text for p in second.paragraphs if p.text] == []
+
+
+def test_prototype_parsed_once_across_threads():
+    docx = pytest.importorskip('docx')
+    template = load_template(os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx'))
+    template._prototype = None
+    calls = []
+    start = threading.Barrier(8)
+
+    def parse(stream):
+        calls.append(1)
+        return docx.Document(stream)
+
+    def worker():
+        start.wait()
+        template.new_document(parse)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
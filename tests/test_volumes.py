@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import os
+import zipfile
+
+import pytest
+
+from core import CodeFinder, PageCounter, PageLayout, plan_volumes, volume_path
+
+
+def test_plan_volumes_by_dir_one_volume_per_group(tmp_path):
+    root = str(tmp_path)
+    files = [
+        os.path.join(root, 'b', 'z.py'),
+        os.path.join(root, 'a', 'x.py'),
+        os.path.join(root, 'main.py'),
+        os.path.join(root, 'a', 'deep', 'y.py'),
+        os.path.join(root, 'setup.py'),
+        os.path.join(root, 'a', 'w.py'),
+    ]
+    volumes = plan_volumes(files, 'dir', indirs=[root])
+    # 直接文件一册在前，顶层目录按名称各一册，册内保持输入顺序
+    assert volumes == [
+        [files[2], files[4]],
+        [files[1], files[3], files[5]],
+        [files[0]],
+    ]
+
+
+def test_dir_volumes_follow_single_document_order(tmp_path):
+    root = tmp_path / 'src'
+    names = ['m{}.py'.format(i) for i in range(7)] + ['s2/a.py', 's1/b.py', 's1/sub/c.py', 's3/d.py', 's1/a.py']
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('x = 1\n', encoding='utf-8')
+    root = str(root)
+    files = CodeFinder(['py']).find(root)
+    volumes = plan_volumes(files, 'dir', indirs=[root])
+    assert [len(volume) for volume in volumes] == [7, 3, 1, 1]
+    assert sum(volumes, []) == files
+    assert files[:7] == [os.path.join(root, 'm{}.py'.format(i)) for i in range(7)]
+    assert volumes[1] == [os.path.join(root, *name.split('/')) for name in ('s1/a.py', 's1/b.py', 's1/sub/c.py')]
+
+
+def test_plan_volumes_by_lines():
+    files = ['f{}'.format(i) for i in range(5)]
+    items = [{'lines': lines} for lines in (3, 3, 3, 10, 1)]
+    volumes = plan_volumes(files, 'lines', 6, items=items)
+    assert volumes == [['f0', 'f1'], ['f2'], ['f3'], ['f4']]
+
+
+def test_plan_volumes_by_pages_respects_limit():
+    layout = PageLayout()
+    files = ['f{}'.format(i) for i in range(40)]
+    items = [{'wraps': b'\x01' * (17 * (i % 5 + 1))} for i in range(40)]
+    volumes = plan_volumes(files, 'pages', 3, items=items, layout=layout)
+    assert sum(volumes, []) == files
+    assert len(volumes) > 1
+    wraps = dict(zip(files, items))
+    for volume in volumes:
+        counter = PageCounter(layout)
+        for file in volume:
+            counter.extend(wraps[file]['wraps'])
+        assert counter.pages <= 3 or len(volume) == 1
+
+
+def test_plan_volumes_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        plan_volumes(['f'], 'size', 1)
+    with pytest.raises(ValueError):
+        plan_volumes(['f'], 'lines', None, items=[{'lines': 1}])
+
+
+def test_generate_volumes_skips_unchanged_volumes(generate, source, tmp_path):
+    pytest.importorskip('docx')
+    outfile = str(tmp_path / 'out' / 'code.docx')
+    os.makedirs(os.path.dirname(outfile))
+
+    first = generate(outfile, volume_by='dir', jobs=1, skip_unchanged=True)
+    assert [volume['skipped'] for volume in first['volumes']] == [False, False, False]
+    assert not first.get('skipped')
+    second = generate(outfile, volume_by='dir', jobs=1, skip_unchanged=True)
+    assert second['skipped'] is True
+    with open(os.path.join(source, 'lib', 'mod.py'), 'w', encoding='utf-8') as fp:
+        fp.write('VALUE = "changed"\n')
+    third = generate(outfile, volume_by='dir', jobs=1, skip_unchanged=True)
+    skipped = dict((volume['outfile'], volume['skipped']) for volume in third['volumes'])
+    assert sorted(skipped.values()) == [False, True, True]
+    changed = [outfile for outfile, value in skipped.items() if not value][0]
+    with zipfile.ZipFile(changed) as package:
+        assert 'changed' in package.read('word/document.xml').decode('utf-8')
+
+
+def test_generate_volumes_removes_stale_volumes(generate, source, tmp_path):
+    outfile = str(tmp_path / 'code.docx')
+    extra = os.path.join(source, 'zeta')
+    os.mkdir(extra)
+    with open(os.path.join(extra, 'z.py'), 'w') as fp:
+        fp.write('Z = 1\n')
+    first = generate(outfile, volume_by='dir', jobs=1)
+    assert len(first['volumes']) == 4
+    assert first['removed'] == []
+
+    os.remove(os.path.join(extra, 'z.py'))
+    second = generate(outfile, volume_by='dir', jobs=1)
+    assert len(second['volumes']) == 3
+    assert second['removed'] == [volume_path(outfile, 4)]
+    assert not os.path.exists(volume_path(outfile, 4))
+    assert all(os.path.exists(volume['outfile']) for volume in second['volumes'])